@@ -9,6 +9,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from utils import load_config, load_data, get_model
+from plotting import plot_observations
 
 
 def visualize_all_models():
@@ -30,8 +31,8 @@ def visualize_all_models():
     fig, ax = plt.subplots(figsize=(14, 8))
     
     # Observations
-    ax.scatter(df["CAA"], df["CAE"], s=40, alpha=0.7, color='black', 
-               label="Observations", zorder=5)
+    plot_observations(ax, df["CAA"], df["CAE"], s=40, alpha=0.7, color='black',
+                      label="Observations", zorder=5)
     
     # Grid de prédictions
     t_grid = np.linspace(df["t"].min(), (target - origin).days, 420)
@@ -0,0 +1,218 @@
+"""
+Entraînement hors mémoire sur une archive de fichiers CSV (éventuellement compressés)
+Chaque morceau de fichier est réduit en statistiques par jour de CAA (effectif, somme et
+somme des carrés des délais), fusionnables entre morceaux, fichiers et processus ;
+les sommes cumulées et matrices de Gram des modèles linéaires s'en déduisent exactement
+"""
+
+import os
+import io
+import sys
+import glob
+import time
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, src_dir)
+
+from utils import load_config, get_model
+from models import dates
+from models.prefix_stats import PrefixStats
+from models.profiling import span
+
+
+# Fichiers compressés : lecture séquentielle obligatoire (pas de découpage en plages d'octets)
+COMPRESSED = ('.gz', '.bz2', '.xz', '.zip', '.zst')
+
+
+class ArchiveStats:
+    """Statistiques suffisantes par jour de CAA, fusionnables (somme par jour).
+
+    La mémoire est bornée par le nombre de jours distincts, pas par le nombre de lignes.
+    """
+
+    def __init__(self, day=None, count=None, sum_y=None, sum_y2=None, n_pending=0):
+        self.day = np.zeros(0, dtype=np.int64) if day is None else np.asarray(day, dtype=np.int64)
+        self.count = np.zeros(0) if count is None else np.asarray(count, dtype=float)
+        self.sum_y = np.zeros(0) if sum_y is None else np.asarray(sum_y, dtype=float)
+        self.sum_y2 = np.zeros(0) if sum_y2 is None else np.asarray(sum_y2, dtype=float)
+        self.n_pending = int(n_pending)
+
+    @classmethod
+    def from_frame(cls, chunk):
+        """Réduire un morceau brut (colonnes CAA, CAE au format jj/mm/aaaa)."""
+        caa, has_caa = _day_numbers(chunk["CAA"])
+        cae, has_cae = _day_numbers(chunk["CAE"])
+        done = has_caa & has_cae
+        day = caa[done]
+        y = (cae[done] - day).astype(float)
+        stats = cls(n_pending=int((has_caa & ~has_cae).sum()))
+        return stats.merge(cls(day, np.ones(len(y)), y, y**2))
+
+    @classmethod
+    def merge_all(cls, parts):
+        """Fusion d'un nombre quelconque de statistiques (un seul tri)."""
+        parts = list(parts)
+        day = np.concatenate([p.day for p in parts] or [np.zeros(0, dtype=np.int64)])
+        keys, inverse = np.unique(day, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        def total(attr):
+            values = np.concatenate([getattr(p, attr) for p in parts] or [np.zeros(0)])
+            return np.bincount(inverse, weights=values, minlength=len(keys))
+
+        return cls(keys, total('count'), total('sum_y'), total('sum_y2'),
+                   sum(p.n_pending for p in parts))
+
+    def merge(self, other):
+        return self.merge_all([self, other])
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def n_rows(self):
+        return int(self.count.sum())
+
+    @property
+    def origin(self):
+        """Première date CAA (Timestamp), origine de t."""
+        return pd.Timestamp(dates.EPOCH + self.day[0])
+
+    def prefix_stats(self, degree=1):
+        """Sommes cumulées par jour (t = jours depuis l'origine), pour les fits `fit_stats`."""
+        if len(self) == 0:
+            raise ValueError("Archive vide : aucune demande avec CAE")
+        t = (self.day - self.day[0]).astype(float)
+        return PrefixStats(t, self.count, self.sum_y, self.sum_y2, degree=degree)
+
+    def to_frame(self):
+        """Table par jour : CAA, t, n, moyenne et écart-type du délai."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.sum_y / self.count
+            var = np.maximum(self.sum_y2 / self.count - mean**2, 0.0)
+        return pd.DataFrame({
+            'CAA': pd.DatetimeIndex(dates.EPOCH + self.day),
+            't': (self.day - self.day[0]).astype(float),
+            'n': self.count.astype(np.int64),
+            'delay_mean': mean,
+            'delay_std': np.sqrt(var)
+        })
+
+
+def _day_numbers(column):
+    """Numéros de jour d'une colonne de dates texte et masque des valeurs présentes.
+
+    Les dates se répètent beaucoup : seules les valeurs distinctes sont analysées.
+    """
+    codes, uniques = pd.factorize(column)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), dayfirst=True)
+    valid = np.append(parsed.notna().to_numpy(), False)
+    days = np.append(dates.day_number(parsed.fillna(pd.Timestamp(0)).to_numpy()), 0)
+    return days[codes], valid[codes]
+
+
+def _byte_range(path, start, stop):
+    """Octets des lignes qui commencent dans [start, stop), précédés de l'en-tête."""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        if start > len(header):
+            f.seek(start - 1)
+            f.readline()  # fin de la ligne à cheval : elle appartient à la plage précédente
+        pos = f.tell()
+        data = f.read(max(stop - pos, 0))
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+    return header + data
+
+
+def read_stats(task, chunksize=500_000):
+    """Statistiques d'une tâche (fichier entier ou plage d'octets), lue par morceaux."""
+    path, start, stop = task
+    source = path if stop is None else io.BytesIO(_byte_range(path, start, stop))
+    parts = []
+    for chunk in pd.read_csv(source, usecols=["CAA", "CAE"], dtype=str, chunksize=chunksize):
+        parts.append(ArchiveStats.from_frame(chunk))
+        if len(parts) >= 16:
+            parts = [ArchiveStats.merge_all(parts)]
+    return ArchiveStats.merge_all(parts)
+
+
+def plan_tasks(paths, split_bytes=64 << 20):
+    """Tâches (chemin, début, fin) : fichiers non compressés découpés en plages d'octets."""
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith(COMPRESSED) or size <= split_bytes:
+            tasks.append((path, 0, None))
+        else:
+            edges = np.append(np.arange(0, size, split_bytes), size)
+            tasks.extend((path, int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]))
+    return tasks
+
+
+def scan_archive(paths, chunksize=500_000, n_jobs=None, split_bytes=64 << 20):
+    """Réduire tous les fichiers en statistiques par jour, en parallèle sur les tâches."""
+    tasks = plan_tasks(paths, split_bytes)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    reader = partial(read_stats, chunksize=chunksize)
+    with span("scan_archive", tasks=len(tasks)):
+        if n_jobs == 1 or len(tasks) < 2:
+            parts = [reader(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+                parts = list(pool.map(reader, tasks))
+    return ArchiveStats.merge_all(parts)
+
+
+def fit_archive(model, archive):
+    """Entraîner un modèle linéaire (méthode `fit_stats`) sur l'archive réduite.
+
+    Returns:
+        origin : date CAA d'origine de t
+    """
+    if not hasattr(model, 'fit_stats'):
+        raise ValueError(f"{type(model).__name__} ne s'entraîne pas sur statistiques (fit_stats requis)")
+    origin = archive.origin
+    model.fit_stats(archive.prefix_stats(degree=getattr(model, 'degree', 1)))
+    if getattr(model, 'breakpoint', None) is not None:
+        model.break_date = origin + pd.Timedelta(days=model.params['t_break'])
+    return origin
+
+
+def main():
+    """Réduire l'archive (config `archive_glob`, défaut : data_path) et prédire la date cible."""
+    root = os.path.join(os.path.dirname(__file__), '..')
+    config = load_config(os.path.join(root, 'config', 'config.json'))
+    pattern = config.get('archive_glob') or config['data_path']
+    paths = sorted(glob.glob(os.path.join(root, pattern)))
+    if not paths:
+        raise FileNotFoundError(f"Aucun fichier pour {pattern}")
+
+    model_kwargs = {}
+    if config['model'] == 'piecewise_linear':
+        model_kwargs['min_samples'] = config.get('breakpoint_min_samples', 8)
+    elif config['model'] == 'polynomial_regression':
+        model_kwargs['degree'] = config.get('polynomial_degree', 3)
+    model = get_model(config['model'], confidence_level=config['confidence_level'], **model_kwargs)
+
+    print(f"🗄️  Lecture de l'archive ({len(paths)} fichier(s))...")
+    start = time.perf_counter()
+    archive = scan_archive(paths)
+    print(f"   {archive.n_rows} demandes, {archive.n_pending} en attente, "
+          f"{len(archive)} jours de CAA ({time.perf_counter() - start:.1f}s)")
+
+    origin = fit_archive(model, archive)
+    target_date = pd.to_datetime(config['target_date'], dayfirst=True)
+    pred = model.predict(target_date, origin)
+    print(f"   {config['model']} : délai {pred['pred_delay']:.0f} jours, "
+          f"CAE {pred['pred_cae'].strftime('%d/%m/%Y')} "
+          f"[{pred['lo_cae'].strftime('%d/%m/%Y')} – {pred['hi_cae'].strftime('%d/%m/%Y')}]")
+
+
+if __name__ == "__main__":
+    main()
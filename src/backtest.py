@@ -0,0 +1,236 @@
+"""
+Backtest historique — rejoue chaque date CAA passée comme date de coupure
+Fit sur les données jusqu'à la coupure, prédiction des CAE des demandeurs suivants
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, src_dir)
+
+from utils import MODELS, load_config, load_data, get_model, data_hash
+from models.prefix_stats import PrefixStats
+from models.sketch import TDigest
+from shared_dataset import SharedDataset
+
+
+# Tous les modèles du registre (utils.MODELS)
+ALL_MODELS = list(MODELS)
+
+# Modèles linéaires : fit par statistiques cumulées au lieu d'un refit complet
+PREFIX_MODELS = ('piecewise_linear', 'polynomial_regression')
+
+
+def _score(model, t_test, y_test, origin):
+    """MAE (jours), couverture de l'intervalle et esquisse des résidus hors échantillon."""
+    grid = model.get_grid_predictions(t_test, origin)
+    residuals = y_test - grid['delay_central']
+    covered = (y_test >= grid['pi_lo']) & (y_test <= grid['pi_hi'])
+    return float(np.abs(residuals).mean()), float(covered.mean()), TDigest().update(residuals).to_dict()
+
+
+def _make_model(model_name, confidence_level, model_kwargs):
+    """Créer le modèle et appliquer ses paramètres spécifiques."""
+    model = get_model(model_name, confidence_level=confidence_level)
+    for key, value in model_kwargs.items():
+        setattr(model, key, value)
+    return model
+
+
+def _run_chunk(model_name, confidence_level, model_kwargs, data, cutoffs):
+    """Worker : refit complet du modèle à chaque date de coupure.
+
+    `data` est un DataFrame ou un `SharedDataset` (rattaché par nom, sans copie).
+    """
+    origin = data["CAA"].min()
+    t_arr = data["t"].to_numpy()
+    y = data["delay_days"].to_numpy().astype(float)
+
+    rows = []
+    for cutoff in cutoffs:
+        end = int(np.searchsorted(t_arr, cutoff, side='right'))
+        model = _make_model(model_name, confidence_level, model_kwargs)
+        start = time.perf_counter()
+        try:
+            model.fit(data.head(end))
+            fit_s = time.perf_counter() - start
+            mae, coverage, residuals = _score(model, t_arr[end:], y[end:], origin)
+        except (ValueError, np.linalg.LinAlgError):
+            fit_s, mae, coverage, residuals = time.perf_counter() - start, np.nan, np.nan, None
+        rows.append(_row(cutoff, end, len(t_arr) - end, mae, coverage, fit_s, residuals))
+    return rows
+
+
+def _row(cutoff, n_train, n_test, mae, coverage, fit_s, residuals=None):
+    return {
+        'cutoff': float(cutoff),
+        'n_train': int(n_train),
+        'n_test': int(n_test),
+        'mae_days': mae,
+        'coverage': coverage,
+        'fit_ms': fit_s * 1000,
+        'residuals': residuals  # t-digest sérialisé (fusionnable entre coupures et processus)
+    }
+
+
+class BacktestRunner:
+    """Rejoue l'historique pour chaque modèle et mesure précision et coût."""
+
+    def __init__(self, model_names=None, confidence_level=0.95, min_train=20,
+                 n_jobs=None, cache_dir=None, model_kwargs=None):
+        self.model_names = model_names or ALL_MODELS
+        self.confidence_level = confidence_level
+        self.min_train = min_train
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.model_kwargs = model_kwargs or {}
+        self.residual_sketches = {}  # modèle -> TDigest des résidus hors échantillon
+
+    def cutoffs(self, df):
+        """Dates de coupure : chaque jour CAA distinct avec assez d'historique et des observations après."""
+        t_arr = df["t"].to_numpy()
+        days = np.unique(t_arr)
+        n_before = np.searchsorted(t_arr, days, side='right')
+        return days[(n_before >= self.min_train) & (n_before < len(t_arr))]
+
+    def _cache_path(self, model_name, digest):
+        kwargs = json.dumps(self.model_kwargs.get(model_name, {}), sort_keys=True)
+        key = hashlib.sha256(f"{digest}|{self.confidence_level}|{kwargs}".encode()).hexdigest()[:20]
+        return os.path.join(self.cache_dir, model_name, f"{key}.json")
+
+    def _load_cache(self, path):
+        if self.cache_dir is None or not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_cache(self, path, cached):
+        if self.cache_dir is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cached, f)
+        os.replace(tmp, path)
+
+    def _run_prefix(self, model_name, df, cutoffs):
+        """Modèles linéaires : une seule passe de sommes cumulées pour toutes les coupures."""
+        kwargs = self.model_kwargs.get(model_name, {})
+        origin = df["CAA"].min()
+        t_arr = df["t"].to_numpy()
+        y = df["delay_days"].to_numpy().astype(float)
+        degree = kwargs.get('degree', 3) if model_name == 'polynomial_regression' else 1
+        stats = PrefixStats.from_arrays(t_arr, y, degree=degree)
+
+        rows = []
+        for cutoff in cutoffs:
+            end = int(np.searchsorted(t_arr, cutoff, side='right'))
+            model = _make_model(model_name, self.confidence_level, kwargs)
+            start = time.perf_counter()
+            try:
+                model.fit_stats(stats, end)
+                fit_s = time.perf_counter() - start
+                mae, coverage, residuals = _score(model, t_arr[end:], y[end:], origin)
+            except (ValueError, np.linalg.LinAlgError):
+                fit_s, mae, coverage, residuals = time.perf_counter() - start, np.nan, np.nan, None
+            rows.append(_row(cutoff, end, len(t_arr) - end, mae, coverage, fit_s, residuals))
+        return rows
+
+    def _run_pool(self, model_name, df, cutoffs):
+        """Autres modèles : coupures réparties sur un pool de processus (données partagées)."""
+        kwargs = self.model_kwargs.get(model_name, {})
+        if self.n_jobs == 1 or len(cutoffs) < 2:
+            return _run_chunk(model_name, self.confidence_level, kwargs, df, cutoffs)
+
+        chunks = [c for c in np.array_split(cutoffs, min(self.n_jobs, len(cutoffs))) if len(c)]
+        with SharedDataset.from_frame(df) as data, ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [pool.submit(_run_chunk, model_name, self.confidence_level, kwargs, data, c)
+                       for c in chunks]
+            return [row for fut in futures for row in fut.result()]
+
+    def run(self, df):
+        """Lancer le backtest. Retourne un DataFrame (une ligne par modèle et coupure)."""
+        digest = data_hash(df)
+        origin = df["CAA"].min()
+        all_cutoffs = self.cutoffs(df)
+
+        results = []
+        for model_name in self.model_names:
+            path = self._cache_path(model_name, digest) if self.cache_dir else None
+            cached = self._load_cache(path)
+            todo = np.array([c for c in all_cutoffs if repr(float(c)) not in cached])
+
+            if len(todo):
+                if model_name in PREFIX_MODELS:
+                    rows = self._run_prefix(model_name, df, todo)
+                else:
+                    rows = self._run_pool(model_name, df, todo)
+                for row in rows:
+                    cached[repr(row['cutoff'])] = row
+                self._save_cache(path, cached)
+
+            self.residual_sketches[model_name] = TDigest.merge_all(
+                TDigest.from_dict(cached[repr(float(c))]['residuals']) for c in all_cutoffs
+                if cached[repr(float(c))].get('residuals') is not None
+            )
+            for c in all_cutoffs:
+                row = dict(cached[repr(float(c))])
+                row.pop('residuals', None)
+                row['model'] = model_name
+                row['cutoff_date'] = origin + pd.to_timedelta(row['cutoff'], unit="D")
+                results.append(row)
+
+        columns = ['model', 'cutoff_date', 'cutoff', 'n_train', 'n_test', 'mae_days', 'coverage', 'fit_ms']
+        return pd.DataFrame(results, columns=columns)
+
+    def summary(self, results):
+        """Résumé précision/coût par modèle."""
+        summary = results.groupby('model', sort=False).agg(
+            cutoffs=('cutoff', 'size'),
+            mae_days=('mae_days', 'mean'),
+            coverage=('coverage', 'mean'),
+            fit_ms=('fit_ms', 'mean')
+        )
+        summary['coverage_gap'] = summary['coverage'] - self.confidence_level
+        
+        # Intervalle empirique au niveau nominal : quantiles des résidus hors échantillon
+        probs = [(1 - self.confidence_level) / 2, (1 + self.confidence_level) / 2]
+        bounds = {name: sketch.quantile(probs) for name, sketch in self.residual_sketches.items()}
+        summary['resid_lo'] = [bounds.get(name, [np.nan] * 2)[0] for name in summary.index]
+        summary['resid_hi'] = [bounds.get(name, [np.nan] * 2)[1] for name in summary.index]
+        return summary.sort_values('mae_days')
+
+
+def main():
+    """Backtest de tous les modèles avec la configuration du projet."""
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+    config = load_config(config_path)
+    data_path = os.path.join(os.path.dirname(__file__), '..', config['data_path'])
+    df, origin = load_data(data_path)
+
+    cache_dir = os.path.join(os.path.dirname(__file__), '..', 'output', 'backtests')
+    runner = BacktestRunner(
+        confidence_level=config['confidence_level'],
+        cache_dir=cache_dir,
+        model_kwargs={
+            'piecewise_linear': {'min_samples': config.get('breakpoint_min_samples', 8)},
+            'polynomial_regression': {'degree': config.get('polynomial_degree', 3)}
+        }
+    )
+
+    print("🔁 Backtest historique...")
+    results = runner.run(df)
+    print(f"   {results['cutoff'].nunique()} dates de coupure × {len(runner.model_names)} modèles\n")
+    print(runner.summary(results).to_string(float_format=lambda x: f"{x:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
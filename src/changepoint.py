@@ -0,0 +1,228 @@
+"""
+Détection de ruptures en ligne sur le flux (CAA, délai)
+CUSUM et détection bayésienne (run length tronqué), refit du modèle uniquement sur alerte
+"""
+
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import scipy.stats as st
+from scipy.special import logsumexp
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, src_dir)
+
+from utils import load_config, load_data, get_model
+
+
+class CusumDetector:
+    """CUSUM bilatéral sur des résidus standardisés.
+
+    Les sommes cumulées S+ et S- accumulent les écarts au-delà de `drift` ; une alerte
+    est levée lorsque l'une dépasse `threshold`. Mémoire constante.
+    """
+
+    name = 'cusum'
+
+    def __init__(self, threshold=5.0, drift=0.5):
+        self.threshold = threshold
+        self.drift = drift
+        self.reset()
+
+    def reset(self):
+        self.pos = 0.0
+        self.neg = 0.0
+        self.statistic = 0.0
+
+    def update(self, z):
+        """Intégrer un résidu standardisé. Retourne True en cas de rupture."""
+        self.pos = max(0.0, self.pos + z - self.drift)
+        self.neg = max(0.0, self.neg - z - self.drift)
+        self.statistic = max(self.pos, self.neg)
+        return self.statistic > self.threshold
+
+
+class BayesianChangePointDetector:
+    """Détection bayésienne en ligne (Adams & MacKay) avec modèle Normal-Gamma.
+
+    La loi a posteriori de la longueur de run (temps depuis la dernière rupture) est
+    tronquée à `max_run_length` : la masse au-delà est repliée dans le dernier état,
+    ce qui borne mémoire et coût par observation. Une alerte est levée lorsque la
+    probabilité d'un run de longueur <= `lag` dépasse `threshold`.
+    """
+
+    name = 'bayesian'
+
+    def __init__(self, hazard=1/250, max_run_length=300, lag=5, threshold=0.5,
+                 mu0=0.0, kappa0=1.0, alpha0=1.0, beta0=1.0):
+        self.hazard = hazard
+        self.max_run_length = max_run_length
+        self.lag = lag
+        self.threshold = threshold
+        self.prior = (mu0, kappa0, alpha0, beta0)
+        self.reset()
+
+    def reset(self):
+        mu0, kappa0, alpha0, beta0 = self.prior
+        self.log_r = np.zeros(1)
+        self.mu = np.array([mu0])
+        self.kappa = np.array([kappa0])
+        self.alpha = np.array([alpha0])
+        self.beta = np.array([beta0])
+        self.n_seen = 0
+        self.statistic = 0.0
+
+    def update(self, x):
+        """Intégrer une observation. Retourne True en cas de rupture."""
+        # Prédictive de Student pour chaque longueur de run
+        scale = np.sqrt(self.beta * (self.kappa + 1) / (self.alpha * self.kappa))
+        log_pred = st.t.logpdf(x, 2 * self.alpha, loc=self.mu, scale=scale)
+
+        log_joint = self.log_r + log_pred
+        log_growth = log_joint + np.log1p(-self.hazard)
+        log_cp = logsumexp(log_joint) + np.log(self.hazard)
+        log_r = np.append(log_cp, log_growth)
+
+        # Mise à jour conjuguée, nouvel état a priori en tête
+        mu0, kappa0, alpha0, beta0 = self.prior
+        beta = self.beta + self.kappa * (x - self.mu)**2 / (2 * (self.kappa + 1))
+        mu = np.append(mu0, (self.kappa * self.mu + x) / (self.kappa + 1))
+        kappa = np.append(kappa0, self.kappa + 1)
+        alpha = np.append(alpha0, self.alpha + 0.5)
+        beta = np.append(beta0, beta)
+
+        # Troncature : la queue est repliée dans le dernier état conservé
+        if len(log_r) > self.max_run_length + 1:
+            log_r[-2] = np.logaddexp(log_r[-2], log_r[-1])
+            log_r, mu, kappa, alpha, beta = (a[:-1] for a in (log_r, mu, kappa, alpha, beta))
+
+        self.log_r = log_r - logsumexp(log_r)
+        self.mu, self.kappa, self.alpha, self.beta = mu, kappa, alpha, beta
+        self.n_seen += 1
+
+        # Pendant le rodage, tous les runs sont courts : pas d'alerte
+        self.statistic = float(np.exp(logsumexp(self.log_r[:self.lag + 1])))
+        return self.n_seen > 2 * self.lag and self.statistic > self.threshold
+
+    def run_length(self):
+        """Longueur de run la plus probable."""
+        return int(np.argmax(self.log_r))
+
+
+DETECTORS = {
+    'cusum': CusumDetector,
+    'bayesian': BayesianChangePointDetector,
+}
+
+
+class ChangePointMonitor:
+    """Surveille les résidus du modèle configuré et ne le réentraîne que sur rupture.
+
+    Chaque observation est comparée à la prédiction courante ; le résidu est standardisé
+    par la demi-largeur de l'intervalle et transmis au détecteur. Seules les `window`
+    dernières observations sont conservées pour le refit. Les modèles disposant de
+    `update` (RLS, tendance locale) sont mis à jour entre deux refits.
+    """
+
+    def __init__(self, model_name, confidence_level=0.95, detector='bayesian',
+                 window=500, model_kwargs=None, on_alert=None):
+        self.model_name = model_name
+        self.confidence_level = confidence_level
+        self.detector = DETECTORS[detector]() if isinstance(detector, str) else detector
+        self.model_kwargs = model_kwargs or {}
+        self.on_alert = on_alert
+        self.history = deque(maxlen=window)
+        self.z = st.norm.ppf(0.5 + confidence_level/2)
+        self.model = None
+        self.origin = None
+        self.alerts = []
+        self.n_refits = 0
+
+    def _make_model(self):
+        model = get_model(self.model_name, confidence_level=self.confidence_level)
+        for key, value in self.model_kwargs.items():
+            setattr(model, key, value)
+        return model
+
+    def _refit(self):
+        t_arr = np.array([t for t, _ in self.history])
+        df = pd.DataFrame({
+            'CAA': self.origin + pd.to_timedelta(t_arr, unit="D"),
+            't': t_arr,
+            'delay_days': np.array([y for _, y in self.history])
+        })
+        self.model = self._make_model()
+        self.model.fit(df)
+        self.n_refits += 1
+
+    def fit(self, df):
+        """Fit initial sur l'historique (les `window` dernières observations sont gardées)."""
+        self.origin = df["CAA"].min()
+        self.history.extend(zip(df["t"].to_numpy(dtype=float), df["delay_days"].to_numpy(dtype=float)))
+        self._refit()
+        self.detector.reset()
+        return self
+
+    def observe(self, caa, delay_days):
+        """Intégrer une observation. Retourne l'alerte (dict) ou None."""
+        t = float((pd.Timestamp(caa) - self.origin).days)
+        pred = self.model.predict(pd.Timestamp(caa), self.origin)
+        half = (pred['hi_delay'] - pred['lo_delay']) / 2
+        z = (float(delay_days) - pred['pred_delay']) / (half / self.z if half > 0 else 1.0)
+
+        self.history.append((t, float(delay_days)))
+        alert = None
+        if self.detector.update(z):
+            alert = {
+                'CAA': pd.Timestamp(caa),
+                'delay_days': float(delay_days),
+                'residual_z': z,
+                'statistic': self.detector.statistic,
+                'detector': self.detector.name
+            }
+            self.alerts.append(alert)
+            self._refit()
+            self.detector.reset()
+            if self.on_alert is not None:
+                self.on_alert(alert, self.model)
+        elif hasattr(self.model, 'update'):
+            self.model.update(t, delay_days)
+        return alert
+
+
+def main():
+    """Rejoue l'historique comme un flux : fit sur le début, surveillance de la suite."""
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+    config = load_config(config_path)
+    data_path = os.path.join(os.path.dirname(__file__), '..', config['data_path'])
+    df, origin = load_data(data_path)
+
+    model_kwargs = {}
+    if config['model'] == 'piecewise_linear':
+        model_kwargs['min_samples'] = config.get('breakpoint_min_samples', 8)
+    elif config['model'] == 'polynomial_regression':
+        model_kwargs['degree'] = config.get('polynomial_degree', 3)
+
+    min_train = config.get('changepoint_min_train', 20)
+    monitor = ChangePointMonitor(
+        config['model'],
+        confidence_level=config['confidence_level'],
+        detector=config.get('changepoint_detector', 'bayesian'),
+        model_kwargs=model_kwargs
+    ).fit(df.iloc[:min_train])
+
+    print(f"📡 Surveillance des ruptures ({monitor.detector.name}, modèle {config['model']})...")
+    for caa, delay in zip(df["CAA"].iloc[min_train:], df["delay_days"].iloc[min_train:]):
+        alert = monitor.observe(caa, delay)
+        if alert is not None:
+            print(f"   ⚠️  Rupture au {alert['CAA'].strftime('%d/%m/%Y')} "
+                  f"(résidu {alert['residual_z']:+.2f}σ, statistique {alert['statistic']:.2f})")
+    print(f"   {len(df) - min_train} observations, {len(monitor.alerts)} alerte(s), "
+          f"{monitor.n_refits} fit(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,49 @@
 """
 Export professionnel des résultats de prédiction
-Format TXT avec horodatage — Stockage dans le dossier output/predictions/
+Stockage SQLite (output/predictions/results.db) — rapport TXT optionnel rendu depuis la base
+Export structuré par lots (JSON Lines, CSV, Parquet) dans un fichier par jour
 """
 
 import os
+import queue
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from models.profiling import instrument
+from results_store import ResultsStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet optionnel
+    pa = None
+    pq = None
+
+
+PROJECT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 
 class ResultsExporter:
-    """Export professionnel des résultats de prédiction (TXT uniquement)."""
+    """Export professionnel des résultats de prédiction (base SQLite + TXT optionnel)."""
     
-    def __init__(self, model_name, config, df, origin, target, prediction):
+    def __init__(self, model_name, config, df, origin, target, prediction, influential=None):
         self.model_name = model_name
         self.config = config
         self.df = df
         self.origin = origin
         self.target = target
         self.pred = prediction
+        self.influential = influential  # observations les plus influentes (voir models.influence)
         self.timestamp = datetime.now()
         
-        # Créer structure de dossiers
-        self.export_dir = os.path.join("output", "predictions")
+        # Créer structure de dossiers (relative au projet, pas au répertoire courant)
+        self.export_dir = os.path.join(PROJECT_DIR, "output", "predictions")
         os.makedirs(self.export_dir, exist_ok=True)
+        self.db_path = os.path.join(PROJECT_DIR, config.get('results_db', os.path.join("output", "predictions", "results.db")))
     
     def _format_delay(self, days):
         """Convertir les jours en format lisible (jours, mois et jours)."""
@@ -36,15 +58,38 @@ class ResultsExporter:
         else:
             return f"{total_days} jours ({months} mois et {remaining_days} jours)"
     
-    def _get_filename(self):
-        """Générer nom de fichier horodaté (format: prediction_YYYY-MM-DD_HHMMSS.txt)."""
+    def _get_filename(self, run_id=None):
+        """Générer nom de fichier horodaté (format: prediction_YYYY-MM-DD_HHMMSS[_runN].txt)."""
         date_str = self.timestamp.strftime("%Y-%m-%d")
         time_str = self.timestamp.strftime("%H%M%S")
-        return os.path.join(self.export_dir, f"prediction_{date_str}_{time_str}.txt")
+        suffix = f"_run{run_id}" if run_id is not None else ""
+        return os.path.join(self.export_dir, f"prediction_{date_str}_{time_str}{suffix}.txt")
+    
+    def _record(self):
+        """Ligne équivalente à celle stockée en base, construite depuis la prédiction courante."""
+        return {
+            'created_at': self.timestamp.isoformat(),
+            'model': self.model_name,
+            'confidence_level': self.config.get('confidence_level', 0.95),
+            'n_obs': len(self.df),
+            'caa_min': self.df['CAA'].min().strftime('%Y-%m-%d'),
+            'caa_max': self.df['CAA'].max().strftime('%Y-%m-%d'),
+            'target_date': self.target.strftime('%Y-%m-%d'),
+            'pred_delay': self.pred['pred_delay'],
+            'pred_cae': self.pred['pred_cae'].strftime('%Y-%m-%d'),
+            'lo_cae': self.pred['lo_cae'].strftime('%Y-%m-%d'),
+            'hi_cae': self.pred['hi_cae'].strftime('%Y-%m-%d'),
+        }
     
-    def export_txt(self):
-        """Exporter en format texte structuré et professionnel."""
-        filename = self._get_filename()
+    def render_txt(self, record):
+        """Rendre une ligne stockée en rapport texte structuré."""
+        def fr(iso):
+            return datetime.strptime(iso, '%Y-%m-%d').strftime('%d/%m/%Y')
+        
+        created_at = datetime.fromisoformat(record['created_at'])
+        width = (datetime.strptime(record['hi_cae'], '%Y-%m-%d')
+                 - datetime.strptime(record['lo_cae'], '%Y-%m-%d')).days
+        level = f"{record['confidence_level'] * 100:g}%"
         
         content = []
         content.append("=" * 80)
@@ -54,38 +99,274 @@ class ResultsExporter:
         
         content.append("INFORMATIONS GENERALES")
         content.append("-" * 80)
-        content.append(f"Date et heure : {self.timestamp.strftime('%d/%m/%Y %H:%M:%S')}")
-        content.append(f"Modele utilise : {self.model_name}")
-        content.append(f"Niveau de confiance : 95%")
+        content.append(f"Date et heure : {created_at.strftime('%d/%m/%Y %H:%M:%S')}")
+        content.append(f"Modele utilise : {record['model']}")
+        content.append(f"Niveau de confiance : {level}")
         content.append("")
         
         content.append("DONNEES D'ENTRAINEMENT")
         content.append("-" * 80)
-        content.append(f"Nombre d'observations : {len(self.df)}")
-        content.append(f"Periode couverte : {self.df['CAA'].min().strftime('%d/%m/%Y')} a {self.df['CAA'].max().strftime('%d/%m/%Y')}")
+        content.append(f"Nombre d'observations : {record['n_obs']}")
+        content.append(f"Periode couverte : {fr(record['caa_min'])} a {fr(record['caa_max'])}")
         content.append("")
         
         content.append("RESULTAT DE PREDICTION")
         content.append("-" * 80)
-        content.append(f"Date CAA cible : {self.target.strftime('%d/%m/%Y')}")
-        content.append(f"Date CAE predite : {self.pred['pred_cae'].strftime('%d/%m/%Y')}")
-        content.append(f"Delai estime : {self._format_delay(self.pred['pred_delay'])}")
+        content.append(f"Date CAA cible : {fr(record['target_date'])}")
+        content.append(f"Date CAE predite : {fr(record['pred_cae'])}")
+        content.append(f"Delai estime : {self._format_delay(record['pred_delay'])}")
         content.append("")
         
-        content.append("INTERVALLE DE CONFIANCE (95%)")
+        content.append(f"INTERVALLE DE CONFIANCE ({level})")
         content.append("-" * 80)
-        content.append(f"Limite inferieure : {self.pred['lo_cae'].strftime('%d/%m/%Y')}")
-        content.append(f"Limite superieure : {self.pred['hi_cae'].strftime('%d/%m/%Y')}")
-        content.append(f"Largeur de l'intervalle : {(self.pred['hi_cae'] - self.pred['lo_cae']).days} jours")
+        content.append(f"Limite inferieure : {fr(record['lo_cae'])}")
+        content.append(f"Limite superieure : {fr(record['hi_cae'])}")
+        content.append(f"Largeur de l'intervalle : {width} jours")
         content.append("")
         
+        if self.influential is not None and len(self.influential):
+            content.append("OBSERVATIONS INFLUENTES")
+            content.append("-" * 80)
+            content.append("Effet = variation du delai predit si l'observation est retiree ; * : Cook > 4/n")
+            content.append(f"{'Date CAA':<12}{'Delai':>8}{'Levier':>10}{'Cook':>10}{'Effet':>12}")
+            for row in self.influential.itertuples():
+                content.append(f"{row.CAA.strftime('%d/%m/%Y'):<12}{row.delay_days:>8.0f}{row.leverage:>10.3f}"
+                               f"{row.cooks_distance:>10.3f}{row.delta_pred:>+10.1f} j{' *' if row.flag else ''}")
+            content.append("")
+        
         content.append("=" * 80)
+        return "\n".join(content)
+    
+    def export_txt(self, record=None, run_id=None):
+        """Exporter en format texte structuré (depuis une ligne stockée si fournie)."""
+        filename = self._get_filename(run_id)
+        content = self.render_txt(record or self._record())
         
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write("\n".join(content))
+            f.write(content)
         
         return filename
     
+    def export_structured(self, run_id=None):
+        """Ajouter la prédiction aux fichiers structurés listés dans `export_formats`."""
+        paths = []
+        for fmt in self.config.get('export_formats', []):
+            with get_writer(fmt, self.export_dir) as writer:
+                writer.write(self.model_name, [self.target], [self.pred['pred_delay']],
+                             [self.pred['lo_delay']], [self.pred['hi_delay']],
+                             self.config.get('confidence_level', 0.95), run_id=run_id)
+            paths.extend(writer.paths)
+        return paths
+    
+    @instrument("ResultsExporter.export")
     def export(self):
-        """Exporter (raccourci — utilise export_txt)."""
-        return self.export_txt()
+        """Exporter : base SQLite, fichiers structurés, puis rapport TXT si `export_txt` (défaut) est actif."""
+        with ResultsStore(self.db_path) as store:
+            run_id = store.record_run(self.model_name, self.config, self.df, self.target, self.pred)
+            self.export_structured(run_id)
+            if not self.config.get('export_txt', True):
+                return self.db_path
+            record = store.get_prediction(run_id)
+        return self.export_txt(record, run_id)
+
+
+class StructuredWriter(ABC):
+    """Écriture structurée par lots : tampon en mémoire, vidage asynchrone, un fichier par jour.
+    
+    `write` accepte des tableaux entiers de prédictions et ne fait que les mettre en tampon ;
+    le formatage et l'écriture (en ajout) se font dans un thread dédié dès que `buffer_rows`
+    lignes sont accumulées, ou à `flush`/`close`.
+    """
+    
+    extension = None
+    columns = ['run_id', 'model', 'confidence_level', 'target_date', 'pred_delay',
+               'lo_delay', 'hi_delay', 'pred_cae', 'lo_cae', 'hi_cae']
+    
+    def __init__(self, directory, prefix="predictions", buffer_rows=100_000):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer_rows = buffer_rows
+        self.paths = []
+        os.makedirs(directory, exist_ok=True)
+        
+        self._buffer = []
+        self._buffered = 0
+        self._day = None
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _path(self, day):
+        return os.path.join(self.directory, f"{self.prefix}_{day}.{self.extension}")
+    
+    def write(self, model_name, targets, pred_delay, lo_delay, hi_delay, confidence_level, run_id=None):
+        """Mettre en tampon un lot de prédictions (tableaux alignés sur `targets`)."""
+        if self._error is not None:
+            raise self._error
+        target_days = pd.DatetimeIndex(targets).values.astype('datetime64[D]')
+        n = len(target_days)
+        delays = [np.asarray(d, dtype=float).reshape(n) for d in (pred_delay, lo_delay, hi_delay)]
+        
+        # Changement de jour : vider le tampon vers le fichier de la veille
+        day = datetime.now().strftime('%Y-%m-%d')
+        if self._day is not None and day != self._day:
+            self.flush(wait=False)
+        self._day = day
+        
+        self._buffer.append((model_name, confidence_level, run_id, target_days, delays))
+        self._buffered += n
+        if self._buffered >= self.buffer_rows:
+            self.flush(wait=False)
+    
+    def flush(self, wait=True):
+        """Envoyer le tampon au thread d'écriture (wait=True : attendre l'écriture)."""
+        if self._buffer:
+            path = self._path(self._day)
+            if path not in self.paths:
+                self.paths.append(path)
+            self._queue.put((path, self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        if wait:
+            self._queue.join()
+            if self._error is not None:
+                raise self._error
+    
+    def close(self):
+        """Vider le tampon, attendre l'écriture et arrêter le thread."""
+        self.flush(wait=True)
+        self._queue.put(None)
+        self._thread.join()
+        self._close_file()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+        return False
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, batches = item
+                if self._error is None:
+                    self._append(path, self._frame(batches))
+            except Exception as exc:
+                self._error = exc
+            finally:
+                self._queue.task_done()
+    
+    def _frame(self, batches):
+        """Assembler les lots en un DataFrame colonne par colonne (sans boucle par ligne)."""
+        sizes = [len(b[3]) for b in batches]
+        target_days = np.concatenate([b[3] for b in batches])
+        pred, lo, hi = (np.concatenate([b[4][k] for b in batches]) for k in range(3))
+        
+        def iso(days):
+            # Formatage des dates distinctes uniquement (beaucoup de répétitions)
+            unique, inverse = np.unique(days, return_inverse=True)
+            return unique.astype(str)[inverse.reshape(-1)]
+        
+        def cae(delay):
+            return iso(target_days + np.floor(delay).astype('timedelta64[D]'))
+        
+        return pd.DataFrame({
+            'run_id': np.repeat([b[2] if b[2] is not None else -1 for b in batches], sizes),
+            'model': np.repeat([b[0] for b in batches], sizes),
+            'confidence_level': np.repeat([float(b[1]) for b in batches], sizes),
+            'target_date': iso(target_days),
+            'pred_delay': pred,
+            'lo_delay': lo,
+            'hi_delay': hi,
+            'pred_cae': cae(pred),
+            'lo_cae': cae(lo),
+            'hi_cae': cae(hi),
+        }, columns=self.columns)
+    
+    @abstractmethod
+    def _append(self, path, frame):
+        """Ajouter un DataFrame au fichier `path` (appelé dans le thread d'écriture)."""
+        pass
+    
+    def _close_file(self):
+        pass
+
+
+class JSONLinesWriter(StructuredWriter):
+    """Export JSON Lines (une prédiction par ligne)."""
+    
+    extension = "jsonl"
+    
+    def _append(self, path, frame):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(frame.to_json(orient='records', lines=True, force_ascii=False).rstrip("\n") + "\n")
+
+
+class CSVWriter(StructuredWriter):
+    """Export CSV (en-tête écrit à la création du fichier)."""
+    
+    extension = "csv"
+    
+    def _append(self, path, frame):
+        header = not os.path.exists(path) or os.path.getsize(path) == 0
+        frame.to_csv(path, mode='a', header=header, index=False)
+
+
+class ParquetWriter(StructuredWriter):
+    """Export Parquet (un row group par vidage ; nécessite pyarrow).
+    
+    Un fichier Parquet ne se complète pas après fermeture : chaque ouverture de
+    writer crée donc un nouveau fichier du jour, suffixé si nécessaire.
+    """
+    
+    extension = "parquet"
+    
+    def __init__(self, directory, prefix="predictions", buffer_rows=100_000):
+        if pq is None:
+            raise ImportError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+        self._writer = None
+        self._writer_path = None
+        self._day_paths = {}
+        super().__init__(directory, prefix, buffer_rows)
+    
+    def _path(self, day):
+        if day not in self._day_paths:
+            path = super()._path(day)
+            index = 1
+            while os.path.exists(path):
+                path = os.path.join(self.directory, f"{self.prefix}_{day}_{index}.{self.extension}")
+                index += 1
+            self._day_paths[day] = path
+        return self._day_paths[day]
+    
+    def _append(self, path, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer_path != path:
+            self._close_file()
+            self._writer = pq.ParquetWriter(path, table.schema)
+            self._writer_path = path
+        self._writer.write_table(table)
+    
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {
+    'jsonl': JSONLinesWriter,
+    'csv': CSVWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def get_writer(fmt, directory, **kwargs):
+    """Factory des writers structurés ('jsonl', 'csv', 'parquet')."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Format inconnu: {fmt}. Choix: {list(WRITERS.keys())}")
+    return WRITERS[fmt](directory, **kwargs)
@@ -5,6 +5,7 @@ Naturalisation CAE Prediction v1.0
 
 import os
 import sys
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -16,87 +17,55 @@ sys.path.insert(0, src_dir)
 
 from utils import load_config, load_data, get_model, format_result
 from exporter import ResultsExporter
+from plotting import plot_observations, DENSITY_THRESHOLD
+from models import profiling, dates
+from models.influence import top_influential
 
 
-def main():
-    """Pipeline principal de prédiction."""
-    
-    # Charger configuration
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
-    config = load_config(config_path)
-    
-    # Charger données
-    print("📊 Chargement des données...")
-    data_path = os.path.join(os.path.dirname(__file__), '..', config['data_path'])
-    df, origin = load_data(data_path)
-    print(f"   {len(df)} observations de {df['CAA'].min().strftime('%d/%m/%Y')} à {df['CAA'].max().strftime('%d/%m/%Y')}")
-    
-    # Initialiser et entraîner le modèle
-    print(f"🤖 Initialisation du modèle: {config['model']}")
-    model = get_model(
-        config['model'],
-        confidence_level=config['confidence_level']
-    )
-    
-    # Ajouter paramètres spécifiques
-    if config['model'] == 'piecewise_linear':
-        model.min_samples = config.get('breakpoint_min_samples', 8)
-    elif config['model'] == 'polynomial_regression':
-        model.degree = config.get('polynomial_degree', 3)
-    
-    print("   Entraînement en cours...")
-    model.fit(df)
-    
-    # Prédiction pour la date cible
-    target = pd.to_datetime(config['target_date'], dayfirst=True)
-    print(f"🎯 Prédiction pour CAA = {target.strftime('%d/%m/%Y')}")
-    
-    pred = model.predict(target, origin)
-    result = format_result(pred, target)
-    
-    print(f"\n   Prédiction ponctuelle: {result['pred_cae']}")
-    print(f"   Délai estimé: {result['pred_delay_days']} jours")
-    print(f"   Intervalle {config['confidence_level']*100:.0f}%: [{result['pi_lower']} ; {result['pi_upper']}]")
-    
-    # Afficher le modèle sélectionné si adaptive
-    if config['model'] == 'adaptive_ensemble':
-        best_model = model.params['best_model']
-        print(f"   Meilleur modèle sélectionné: {best_model}")
-    
-    # Grille de prédictions pour visualisation
-    print("\n📈 Génération des prédictions de visualisation...")
-    t_grid = np.linspace(df["t"].min(), (target - origin).days, 420)
-    grid_pred = model.get_grid_predictions(t_grid, origin)
-    
+def parse_args(argv=None):
+    """Arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Prédiction de la date CAE à partir de la date CAA")
+    parser.add_argument('--profile', action='store_true',
+                        help="Mesurer le temps de chaque étape et afficher un tableau récapitulatif")
+    parser.add_argument('--profile-trace', metavar='PATH',
+                        help="Écrire les spans au format JSON Lines (implique --profile)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Ajouter le pic mémoire (tracemalloc) à chaque span")
+    return parser.parse_args(argv)
+
+
+@profiling.instrument("render_figure")
+def plot_forecast(df, target, pred, grid_pred, config, output_path):
+    """Tracer observations, courbe du modèle et intervalle, puis sauvegarder le PNG."""
     date_grid = grid_pred['date_grid']
     delay_central = grid_pred['delay_central']
     pi_lo = grid_pred['pi_lo']
     pi_hi = grid_pred['pi_hi']
     
-    # Conversion en dates
-    cae_central = date_grid + pd.to_timedelta(delay_central, unit="D")
-    cae_lo = date_grid + pd.to_timedelta(pi_lo, unit="D")
-    cae_hi = date_grid + pd.to_timedelta(pi_hi, unit="D")
+    # Conversion unique de la grille en jours matplotlib ; CAE = CAA + délai, en jours
+    x_day = dates.day_float(date_grid) + mdates.date2num(dates.EPOCH)
+    cae_central = x_day + delay_central
     
-    # Validation et conversion pour plot
-    valid = ~pd.isna(cae_lo) & ~pd.isna(cae_hi)
-    x_num = mdates.date2num(date_grid[valid].to_pydatetime())
-    lo_num = mdates.date2num(cae_lo[valid].to_pydatetime())
-    hi_num = mdates.date2num(cae_hi[valid].to_pydatetime())
+    # Validation pour plot
+    valid = np.isfinite(pi_lo) & np.isfinite(pi_hi)
+    x_num = x_day[valid]
+    lo_num = (x_day + pi_lo)[valid]
+    hi_num = (x_day + pi_hi)[valid]
     
-    # === VISUALIZATION ===
-    print("🎨 Création du graphique...")
     fig, ax = plt.subplots(figsize=(12.8, 7.3))
     
     # Observations
-    ax.scatter(df["CAA"], df["CAE"], s=32, alpha=0.9, label="Observations (CAA→CAE)")
+    done = df["CAE"].notna()
+    plot_observations(ax, df.loc[done, "CAA"], df.loc[done, "CAE"],
+                      threshold=config.get('plot_density_threshold', DENSITY_THRESHOLD),
+                      s=32, alpha=0.9, label="Observations (CAA→CAE)")
     
     # Intervalle de prédiction (bande)
     ax.fill_between(x_num, lo_num, hi_num, color="#ff69b4", alpha=0.18,
                     label=f"Intervalle prédictif {config['confidence_level']*100:.0f}%")
     
     # Modèle central (courbe)
-    ax.plot(date_grid, cae_central, color="red", linewidth=2.4,
+    ax.plot(x_day, cae_central, color="red", linewidth=2.4,
             label=f"Modèle: {config['model'].replace('_', ' ').title()}")
     
     # Ligne cible (date CAA)
@@ -142,18 +111,125 @@ def main():
     fig.tight_layout()
     
     # Sauvegarder le graphique
+    plt.savefig(output_path, dpi=240)
+
+
+def main(argv=None):
+    """Pipeline principal de prédiction."""
+    args = parse_args(argv)
+    if args.profile or args.profile_trace or args.profile_memory:
+        profiling.enable(memory=args.profile_memory)
+    
+    # Charger configuration
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+    config = load_config(config_path)
+    
+    # Charger données
+    print("📊 Chargement des données...")
+    data_path = os.path.join(os.path.dirname(__file__), '..', config['data_path'])
+    # Le modèle de survie exploite aussi les demandes en attente (censurées)
+    df, origin = load_data(data_path, keep_pending=config['model'] == 'survival')
+    print(f"   {len(df)} observations de {df['CAA'].min().strftime('%d/%m/%Y')} à {df['CAA'].max().strftime('%d/%m/%Y')}")
+    
+    # Initialiser et entraîner le modèle
+    print(f"🤖 Initialisation du modèle: {config['model']}")
+    model = get_model(
+        config['model'],
+        confidence_level=config['confidence_level']
+    )
+    
+    # Ajouter paramètres spécifiques
+    if config['model'] == 'piecewise_linear':
+        model.min_samples = config.get('breakpoint_min_samples', 8)
+    elif config['model'] == 'polynomial_regression':
+        model.degree = config.get('polynomial_degree', 3)
+    elif config['model'] == 'recursive_least_squares':
+        model.forgetting = config.get('rls_forgetting', 0.98)
+    elif config['model'] == 'voting_ensemble':
+        model.min_samples = config.get('breakpoint_min_samples', 8)
+        model.weights = config.get('voting_weights', model.weights)
+        model.learn_weights = config.get('voting_learn_weights', False)
+    
+    if config.get('ensemble_members') and hasattr(model, 'members'):
+        model.members = config['ensemble_members']
+    
+    # Intervalles empiriques : quantiles des résidus (esquisse t-digest) au lieu de la loi du modèle
+    model.intervals = config.get('intervals', 'parametric')
+    
+    print("   Entraînement en cours...")
+    model.fit(df)
+    
+    # Prédiction pour la date cible
+    target = pd.to_datetime(config['target_date'], dayfirst=True)
+    print(f"🎯 Prédiction pour CAA = {target.strftime('%d/%m/%Y')}")
+    
+    pred = model.predict(target, origin)
+    result = format_result(pred, target)
+    
+    print(f"\n   Prédiction ponctuelle: {result['pred_cae']}")
+    print(f"   Délai estimé: {result['pred_delay_days']} jours")
+    kind = " (empirique)" if model.intervals == 'empirical' and model.residual_sketch is not None and model.residual_sketch.count else ""
+    print(f"   Intervalle {config['confidence_level']*100:.0f}%{kind}: [{result['pi_lower']} ; {result['pi_upper']}]")
+    
+    if config['model'] == 'voting_ensemble' and model.learn_weights:
+        weights = ", ".join(f"{name} {w:.2f}" for name, w in model.weights.items())
+        print(f"   Poids appris: {weights}")
+    
+    # Afficher le modèle sélectionné si adaptive
+    if config['model'] == 'adaptive_ensemble':
+        best_model = model.params['best_model']
+        print(f"   Meilleur modèle sélectionné: {best_model}")
+    
+    # Question inverse : CAA au plus tard pour une CAE avant l'échéance
+    if config.get('cae_deadline'):
+        deadline = pd.to_datetime(config['cae_deadline'], dayfirst=True)
+        print(f"\n⏳ CAE avant le {deadline.strftime('%d/%m/%Y')} : CAA au plus tard le")
+        for bound, label in (('central', 'estimation centrale'), ('upper', 'borne haute (prudent)')):
+            caa = model.inverse_predict([deadline], origin, bound=bound)['caa'][0]
+            when = caa.strftime('%d/%m/%Y') if not pd.isna(caa) else "aucune date"
+            print(f"   {label}: {when}")
+    
+    # Observations dont le retrait déplacerait le plus la prédiction (forme close, sans refit)
+    influential = None
+    if config.get('influence_top', 5) > 0 and model.supports_influence:
+        influence = model.influence(df, target, origin)
+        influential = top_influential(df, influence, config.get('influence_top', 5))
+        top = influential.iloc[0]
+        print(f"\n🔍 Observation la plus influente : CAA {top['CAA'].strftime('%d/%m/%Y')} "
+              f"(effet {top['delta_pred']:+.1f} jours si retirée, Cook {top['cooks_distance']:.2f})")
+        if influence.get('unsupported'):
+            print(f"   Membres tenus fixes : {', '.join(influence['unsupported'])}")
+    
+    # Grille de prédictions pour visualisation
+    print("\n📈 Génération des prédictions de visualisation...")
+    t_grid = np.linspace(df["t"].min(), (target - origin).days, 420)
+    grid_pred = model.get_grid_predictions(t_grid, origin)
+    
+    # === VISUALIZATION ===
+    print("🎨 Création du graphique...")
     output_dir = os.path.join(os.path.dirname(__file__), '..', 'output', 'artifacts')
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, config.get('output_filename', 'forecast.png'))
-    plt.savefig(output_path, dpi=240)
+    plot_forecast(df, target, pred, grid_pred, config, output_path)
     print(f"💾 Graphique sauvegardé: {output_path}")
     
     # Exporter résultats
     print("\n📤 Export des résultats...")
-    exporter = ResultsExporter(config['model'], config, df, origin, target, pred)
+    exporter = ResultsExporter(config['model'], config, df, origin, target, pred, influential)
     txt_file = exporter.export()
     print(f"   ✓ Export : {txt_file}")
     
+    if profiling.is_enabled():
+        print("\n⏱️  Profiling")
+        print(profiling.summary_table())
+        report = model.memory_report()
+        largest = sorted((k for k in report if k != 'total'), key=report.get, reverse=True)[:3]
+        print(f"   Mémoire du modèle ajusté : {report['total'] / 1024:.1f} Ko "
+              f"({', '.join(f'{k} {report[k] / 1024:.1f}' for k in largest)})")
+        if args.profile_trace:
+            profiling.write_jsonl(args.profile_trace)
+            print(f"   ✓ Trace : {args.profile_trace}")
+    
     plt.show()
 
 
@@ -5,6 +5,14 @@ from .polynomial_regression import PolynomialRegressionModel
 from .voting_ensemble import VotingEnsembleModel
 from .stacking_ensemble import StackingEnsembleModel
 from .adaptive_ensemble import AdaptiveEnsembleModel
+from .recursive_least_squares import RecursiveLeastSquaresModel
+from .kalman_trend import LocalLinearTrendModel
+from .survival import SurvivalModel
+from .sparse_gp import SparseGPModel
+from .robust_piecewise import RobustPiecewiseLinearModel
+from .queue_simulation import QueueSimulationModel
+from .local_linear import LocalLinearModel
+from .queue_position import QueuePositionModel
 
 __all__ = [
     'PiecewiseLinearModel',
@@ -13,5 +21,13 @@ __all__ = [
     'PolynomialRegressionModel',
     'VotingEnsembleModel',
     'StackingEnsembleModel',
-    'AdaptiveEnsembleModel'
+    'AdaptiveEnsembleModel',
+    'RecursiveLeastSquaresModel',
+    'LocalLinearTrendModel',
+    'SurvivalModel',
+    'SparseGPModel',
+    'RobustPiecewiseLinearModel',
+    'QueueSimulationModel',
+    'LocalLinearModel',
+    'QueuePositionModel'
 ]
@@ -4,10 +4,16 @@ from .base import BaseModel
 
 
 class AdaptiveEnsembleModel(BaseModel):
-    """Ensemble adaptatif : sélectionne le meilleur modèle selon performance."""
+    """Ensemble adaptatif : sélectionne le meilleur modèle selon performance.
     
-    def __init__(self, confidence_level=0.95):
+    `members` choisit les membres parmi model_classes (défaut : piecewise, spline, quantile).
+    """
+    
+    _cache_attrs = ('members',)
+    
+    def __init__(self, confidence_level=0.95, members=None):
         super().__init__(confidence_level)
+        self.members = list(members or ('piecewise_linear', 'spline_cubic', 'quantile_regression'))
         self.models = {}
         self.model_scores = {}
         self.best_model = None
@@ -15,11 +21,13 @@ class AdaptiveEnsembleModel(BaseModel):
         from .piecewise_linear import PiecewiseLinearModel
         from .spline_cubic import SplineCubicModel
         from .quantile_regression import QuantileRegressionModel
+        from .queue_position import QueuePositionModel
         
         self.model_classes = {
             'piecewise_linear': PiecewiseLinearModel,
             'spline_cubic': SplineCubicModel,
-            'quantile_regression': QuantileRegressionModel
+            'quantile_regression': QuantileRegressionModel,
+            'queue_position': QueuePositionModel
         }
     
     def _evaluate_model(self, model, y_true, t_arr):
@@ -38,14 +46,18 @@ class AdaptiveEnsembleModel(BaseModel):
         rmse = np.sqrt(np.mean(np.array(errors)**2))
         return rmse, errors
     
+    def _members(self):
+        return self.models.values()
+    
     def fit(self, df):
         """Entraîner tous les modèles et évaluer."""
         y_true = df["delay_days"].to_numpy().astype(float)
         t_arr = df["t"].to_numpy().astype(float)
         
         # Entraîner et évaluer tous les modèles
-        for name, cls in self.model_classes.items():
-            model = cls(self.confidence_level)
+        for name in self.members:
+            model = self.model_classes[name](self.confidence_level)
+            model.keep_data = self.keep_data
             if name == 'piecewise_linear':
                 model.min_samples = 8
             model.fit(df)
@@ -53,16 +65,14 @@ class AdaptiveEnsembleModel(BaseModel):
             
             # Évaluer
             rmse, errors = self._evaluate_model(model, y_true, t_arr)
-            self.model_scores[name] = {
-                'rmse': rmse,
-                'errors': errors
-            }
+            self.model_scores[name] = {'rmse': rmse}
+            if self.keep_data:
+                self.model_scores[name]['errors'] = errors
         
         # Sélectionner le meilleur
         self.best_model = min(self.model_scores, key=lambda x: self.model_scores[x]['rmse'])
         
         self.params['best_model'] = self.best_model
-        self.params['all_models'] = self.models
     
     def predict(self, target_date, origin):
         """Utiliser la prédiction du meilleur modèle."""
@@ -70,22 +80,17 @@ class AdaptiveEnsembleModel(BaseModel):
         return best.predict(target_date, origin)
     
     def get_grid_predictions(self, t_grid, origin):
-        """Grille avec le meilleur modèle + alternatives."""
-        best = self.models[self.best_model]
-        grid_best = best.get_grid_predictions(t_grid, origin)
-        
-        # Intervalle : enveloppe de tous les modèles pour robustesse
-        all_grids = [grid_best['delay_central']]
-        for name, model in self.models.items():
-            if name != self.best_model:
-                grid = model.get_grid_predictions(t_grid, origin)
-                all_grids.append(grid['delay_central'])
-        
-        all_grids = np.array(all_grids)
-        
-        return {
-            'delay_central': grid_best['delay_central'],
-            'pi_lo': np.percentile(all_grids, 2.5, axis=0),    # 2.5% quantile
-            'pi_hi': np.percentile(all_grids, 97.5, axis=0),   # 97.5% quantile
-            'date_grid': grid_best['date_grid']
-        }
+        """Grille du meilleur modèle, comme predict (bornes de `_interval_curve`)."""
+        return self.models[self.best_model].get_grid_predictions(t_grid, origin)
+    
+    @property
+    def supports_influence(self):
+        return self.best_model is not None and self.models[self.best_model].supports_influence
+    
+    def influence(self, df, target_date, origin):
+        """Influence du meilleur modèle, comme predict (sélection fixée)."""
+        return self.models[self.best_model].influence(df, target_date, origin)
+    
+    def _interval_curve(self, t, levels):
+        """Intervalles du meilleur modèle, comme predict."""
+        return self.models[self.best_model]._interval_curve(t, levels)
@@ -1,15 +1,237 @@
+import sys
+import functools
 from abc import ABC, abstractmethod
 import pandas as pd
 import numpy as np
+import scipy.stats as st
+from . import profiling, dates, memo
+from .sketch import TDigest
+
+
+# Probabilités tabulées par les modèles à quantiles empiriques : intervalles à tout niveau
+# (interpolés entre deux probabilités voisines, bornés à [0.0025, 0.9975])
+QUANTILE_GRID = np.linspace(0.0025, 0.9975, 399)
+
+
+def check_levels(levels):
+    """Niveaux de confiance en tableau 1-D, chacun dans ]0, 1[."""
+    levels = np.atleast_1d(np.asarray(levels, dtype=float))
+    if levels.ndim != 1 or np.any((levels <= 0) | (levels >= 1)):
+        raise ValueError(f"Niveaux de confiance invalides: {levels}. Attendu: valeurs dans ]0, 1[")
+    return levels
+
+
+def interval_probs(levels):
+    """Probabilités des bornes basse et haute des intervalles centrés de chaque niveau."""
+    levels = np.asarray(levels, dtype=float)
+    return (1 - levels) / 2, (1 + levels) / 2
+
+
+def critical_values(levels, dof=np.inf):
+    """Valeurs critiques de Student (loi normale si dof infini), une par niveau."""
+    return st.t.ppf(0.5 + np.asarray(levels, dtype=float) / 2, dof)
+
+
+def _recording(func):
+    """fit/update : en mode empirique, résidus ajoutés à l'esquisse du modèle.
+
+    fit(df) repart d'une esquisse vide (résidus d'ajustement des délais complets : les
+    lignes censurées, `event` = 0, sous-estimeraient les bornes) ; update(t, y) y ajoute
+    l'erreur de prévision à un pas, calculée avant la mise à jour. Sans fit préalable
+    (esquisse absente), update est appelé tel quel et l'esquisse démarre vide après lui.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.intervals != 'empirical':
+            return func(self, *args, **kwargs)
+        if func.__name__ == 'fit':
+            result = func(self, *args, **kwargs)
+            df = args[0] if args else kwargs['df']
+            if "event" in getattr(df, "columns", ()):
+                df = df[df["event"] > 0]
+            t = df["t"].to_numpy().astype(float)
+            y = df["delay_days"].to_numpy().astype(float)
+            self.residual_sketch = TDigest().update(y - self._central(t))
+            return result
+        if self.residual_sketch is None:
+            result = func(self, *args, **kwargs)
+            self.residual_sketch = TDigest()
+            return result
+        t = args[0] if args else kwargs['t']
+        y = args[1] if len(args) > 1 else kwargs['delay_days']
+        prior = float(self._central([t])[0])
+        result = func(self, *args, **kwargs)
+        self.residual_sketch.update(float(y) - prior)
+        return result
+    wrapper.__recording__ = True
+    return wrapper
+
+
+def _empirical(func):
+    """predict/get_grid_predictions : en mode empirique, bornes = central + quantiles des résidus.
+
+    Tant que l'esquisse est vide, les bornes du modèle sont gardées.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        result = func(self, *args, **kwargs)
+        sketch = self.residual_sketch
+        if self.intervals != 'empirical' or sketch is None or not sketch.count:
+            return result
+        q_lo, q_hi = sketch.quantile(interval_probs(self.confidence_level))
+        if 'delay_central' in result:
+            result['pi_lo'] = result['delay_central'] + q_lo
+            result['pi_hi'] = result['delay_central'] + q_hi
+        else:
+            target_date = args[0] if args else kwargs['target_date']
+            result['lo_delay'] = result['pred_delay'] + q_lo
+            result['hi_delay'] = result['pred_delay'] + q_hi
+            result['lo_cae'], result['hi_cae'] = dates.cae_dates(
+                target_date, (result['lo_delay'], result['hi_delay']))
+        return result
+    wrapper.__empirical__ = True
+    return wrapper
+
+
+def _deep_nbytes(value, seen):
+    """Taille approximative d'un objet : tableaux, conteneurs et objets parcourus une fois."""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, type) or callable(value) and not hasattr(value, '__dict__'):
+        return 0
+    if isinstance(value, np.ndarray):
+        # Une vue retient tout son tableau de base (ex. colonne d'un DataFrame)
+        return value.nbytes if value.base is None else _deep_nbytes(value.base, seen)
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_deep_nbytes(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(_deep_nbytes(v, seen) for v in value)
+    slots = [name for cls in type(value).__mro__ for name in getattr(cls, '__slots__', ())]
+    if hasattr(value, '__dict__') or slots:
+        fields = [getattr(value, name, None) for name in slots]
+        size = sum(_deep_nbytes(field, seen) for field in fields)
+        if hasattr(value, '__dict__'):
+            size += _deep_nbytes(vars(value), seen)
+        return sys.getsizeof(value) + size
+    return sys.getsizeof(value)
 
 
 class BaseModel(ABC):
     """Classe abstraite pour tous les modèles de prédiction."""
     
+    # Méthodes entourées automatiquement d'un span de profiling
+    _instrumented = ('fit', 'predict', 'get_grid_predictions')
+    
+    # Conserver les données d'entraînement dans params (diagnostic) ; sinon, seul l'état
+    # nécessaire à la prédiction est gardé
+    keep_data = False
+    
+    # Intervalles 'parametric' (loi supposée du modèle) ou 'empirical' : quantiles des
+    # résidus, résumés pendant fit/update par une esquisse t-digest de taille bornée
+    intervals = 'parametric'
+    
+    # Méthodes mises en cache, et méthodes qui modifient l'état ajusté (invalident le cache)
+    _memoized = ('predict', 'get_grid_predictions')
+    _invalidating = ('fit', 'fit_stats', 'set_solution', 'update', 'reset')
+    
+    # Hyperparamètres modifiables après fit : leurs valeurs courantes entrent dans la clé du cache
+    _cache_attrs = ()
+    
+    # Diagnostic d'influence en forme close disponible (voir `influence`)
+    supports_influence = False
+    
+    # Méthodes qui alimentent l'esquisse des résidus, et dont les bornes peuvent en venir
+    _recorded = ('fit', 'update')
+    _bounded = ('predict', 'get_grid_predictions')
+    
+    # Borne de l'inverse -> (clé de la grille, signe de la demi-largeur)
+    _bounds = {'central': ('delay_central', 0), 'lower': ('pi_lo', -1), 'upper': ('pi_hi', 1)}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls._instrumented:
+            method = cls.__dict__.get(name)
+            if method is not None and not hasattr(method, '__wrapped_span__'):
+                setattr(cls, name, profiling.instrument(f"{cls.__name__}.{name}")(method))
+        for name in cls._bounded:
+            method = cls.__dict__.get(name)
+            if method is not None and not hasattr(method, '__empirical__'):
+                setattr(cls, name, _empirical(method))
+        for name in cls._recorded:
+            method = cls.__dict__.get(name)
+            if method is not None and not hasattr(method, '__recording__'):
+                setattr(cls, name, _recording(method))
+        for name in cls._memoized:
+            method = cls.__dict__.get(name)
+            if method is not None and not hasattr(method, '__memoized__'):
+                setattr(cls, name, memo.memoize(f"{cls.__name__}.{name}")(method))
+        for name in cls._invalidating:
+            method = cls.__dict__.get(name)
+            if method is not None and not hasattr(method, '__invalidating__'):
+                setattr(cls, name, memo.invalidating(method))
+    
     def __init__(self, confidence_level=0.95):
-        self.confidence_level = confidence_level
+        self._confidence_level = confidence_level
         self.model = None
         self.params = {}
+        self.residual_sketch = None
+    
+    @property
+    def confidence_level(self):
+        return self._confidence_level
+    
+    @confidence_level.setter
+    def confidence_level(self, value):
+        """Changer le niveau ne demande pas de refit ; il est propagé aux membres."""
+        self._confidence_level = value
+        for member in self._members():
+            member.confidence_level = value
+    
+    def _keep(self, **arrays):
+        """Ranger des données d'entraînement dans params, seulement si keep_data."""
+        if self.keep_data:
+            self.params.update(arrays)
+    
+    def memory_report(self):
+        """Octets retenus par attribut (params détaillés, membres d'ensemble inclus).
+        
+        Returns:
+            dict nom -> octets, avec la clé 'total'
+        """
+        seen = set()
+        report = {}
+        for name, value in vars(self).items():
+            if name == 'params':
+                for key, item in value.items():
+                    report[f"params['{key}']"] = _deep_nbytes(item, seen)
+            else:
+                report[name] = _deep_nbytes(value, seen)
+        report['total'] = sum(report.values())
+        return report
+    
+    def _members(self):
+        """Modèles membres (ensembles) : leurs fits invalident aussi le cache de l'ensemble."""
+        return ()
+    
+    def _cache_stamp(self):
+        """Tampon du cache : dernier fit, niveau, hyperparamètres courants, et ceux des membres."""
+        stamp = getattr(self, '_fit_stamp', None)
+        if stamp is None:
+            return None
+        stamp = (stamp, self.confidence_level, self.intervals,
+                 tuple(memo.freeze(getattr(self, name, None)) for name in self._cache_attrs))
+        members = tuple(self._members())
+        if not members:
+            return stamp
+        return (stamp,) + tuple(m._cache_stamp() for m in members)
+    
+    @property
+    def tcrit(self):
+        """Valeur critique au niveau courant, depuis les degrés de liberté du fit (`dof`)."""
+        return critical_values(self.confidence_level, self.dof)
     
     @abstractmethod
     def fit(self, df):
@@ -33,3 +255,195 @@ class BaseModel(ABC):
             dict avec keys: 'delay_central', 'pi_lo', 'pi_hi'
         """
         pass
+    
+    @memo.memoize("predict_intervals")
+    @profiling.instrument("predict_intervals")
+    def predict_intervals(self, target_date, origin, levels):
+        """Intervalles de prédiction pour plusieurs niveaux de confiance, sans refit.
+        
+        Les bornes sont celles de `get_grid_intervals` à la date cible.
+        
+        Returns:
+            dict avec keys: 'levels', 'pred_delay', 'pred_cae', 'lo_delay', 'hi_delay',
+            'lo_cae', 'hi_cae' (bornes : une par niveau)
+        """
+        levels = check_levels(levels)
+        t0 = dates.offset(target_date, origin)
+        curve = self._bounds_curve(np.array([t0]), levels)
+        pred_delay = float(curve['delay_central'][0])
+        lo_delay = curve['pi_lo'][:, 0]
+        hi_delay = curve['pi_hi'][:, 0]
+        day = dates.day_number(target_date)
+        
+        return {
+            'levels': levels,
+            'pred_delay': pred_delay,
+            'pred_cae': dates.cae_dates(target_date, (pred_delay,))[0],
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay,
+            'lo_cae': pd.DatetimeIndex(dates.shift(day, lo_delay)),
+            'hi_cae': pd.DatetimeIndex(dates.shift(day, hi_delay))
+        }
+    
+    @memo.memoize("get_grid_intervals")
+    @profiling.instrument("get_grid_intervals")
+    def get_grid_intervals(self, t_grid, origin, levels):
+        """Intervalles sur une grille pour plusieurs niveaux de confiance, en un appel vectorisé.
+        
+        L'état ajusté ne dépend pas du niveau : un seul fit sert tout un graphique en éventail.
+        
+        Returns:
+            dict avec keys: 'levels', 'delay_central', 'pi_lo', 'pi_hi' (niveaux × grille), 'date_grid'
+        """
+        levels = check_levels(levels)
+        t_grid = np.asarray(t_grid, dtype=float)
+        curve = self._bounds_curve(t_grid, levels)
+        return {
+            'levels': levels,
+            'delay_central': curve['delay_central'],
+            'pi_lo': curve['pi_lo'],
+            'pi_hi': curve['pi_hi'],
+            'date_grid': dates.date_grid(origin, t_grid)
+        }
+    
+    def _bounds_curve(self, t, levels):
+        """Courbe d'intervalles du modèle, bornes empiriques (esquisse des résidus) si demandé."""
+        curve = self._interval_curve(t, levels)
+        sketch = self.residual_sketch
+        if self.intervals == 'empirical' and sketch is not None and sketch.count:
+            q_lo, q_hi = (sketch.quantile(p) for p in interval_probs(levels))
+            curve['pi_lo'] = curve['delay_central'][np.newaxis, :] + q_lo[:, np.newaxis]
+            curve['pi_hi'] = curve['delay_central'][np.newaxis, :] + q_hi[:, np.newaxis]
+        return curve
+    
+    def _central(self, t):
+        """Délai central en chaque t."""
+        return self._interval_curve(np.atleast_1d(np.asarray(t, dtype=float)), np.array([0.5]))['delay_central']
+    
+    def _interval_curve(self, t, levels):
+        """Délai central (grille) et bornes (niveaux × grille).
+        
+        Par défaut : central ± valeur critique × écart-type de prédiction (voir `_spread`).
+        """
+        central, se, dof = self._spread(t)
+        half = critical_values(levels, dof)[:, np.newaxis] * se[np.newaxis, :]
+        return {'delay_central': central, 'pi_lo': central - half, 'pi_hi': central + half}
+    
+    def _spread(self, t):
+        """Délai central, écart-type de prédiction et degrés de liberté en chaque t."""
+        raise NotImplementedError(f"{type(self).__name__} ne fournit pas d'intervalles multi-niveaux")
+    
+    def influence(self, df, target_date, origin):
+        """Influence de chaque observation de df (données du fit) sur la prédiction cible.
+        
+        Forme close (matrice chapeau, Sherman–Morrison), sans refit : voir models.influence.
+        Disponible si `supports_influence`.
+        
+        Returns:
+            dict avec keys: 'leverage', 'cooks_distance', 'delta_pred' (tableaux alignés
+            sur les lignes de df ; delta_pred = prédiction sans la ligne - prédiction)
+        """
+        raise NotImplementedError(f"{type(self).__name__} ne fournit pas de diagnostic d'influence")
+    
+    def inverse_predict(self, deadlines, origin, bound='central', t_range=None, n_grid=512, tol=1e-3):
+        """Dernière date CAA dont la CAE (centrale, borne basse ou haute) tombe avant chaque échéance.
+        
+        Résout CAA + délai(CAA) = échéance : en forme close pour les modèles linéaires,
+        sinon par encadrement sur une grille puis bissection vectorisée (une évaluation
+        de grille par itération pour toutes les échéances).
+        
+        Args:
+            deadlines: date(s) CAE limite
+            bound: 'central', 'lower' ou 'upper'
+            t_range: (t_min, t_max) de recherche en jours depuis l'origine
+                (défaut : origine -> échéance) ; chaque recherche s'arrête à son échéance
+        
+        Returns:
+            dict avec keys: 'caa' (DatetimeIndex, NaT si aucune solution), 't'
+        """
+        if bound not in self._bounds:
+            raise ValueError(f"Borne inconnue: {bound}. Choix: {list(self._bounds)}")
+        target = np.atleast_1d(dates.day_number(deadlines) - dates.day_number(origin)).astype(float)
+        
+        t = self._inverse_closed_form(target, bound)
+        t[t > target] = np.nan  # CAA postérieure à l'échéance : délai négatif
+        todo = np.isnan(t)
+        if todo.any():
+            t[todo] = self._inverse_grid(target[todo], origin, bound, t_range, n_grid, tol)
+        
+        caa = pd.DatetimeIndex(dates.shift(dates.day_number(origin), np.floor(t)))
+        return {'caa': caa, 't': t}
+    
+    def _inverse_form(self, bound):
+        """Délai de la borne sous la forme a + b·t + s·c·sqrt(q0 + q1·t + q2·t²).
+        
+        Returns:
+            dict avec keys: 'a', 'b', 'c', 'q', 't_min' ; None si le modèle n'est pas linéaire
+        """
+        return None
+    
+    def _inverse_closed_form(self, target, bound):
+        """Solutions exactes pour un délai linéaire (NaN si indisponible ou hors domaine)."""
+        t = np.full(len(target), np.nan)
+        form = self._inverse_form(bound)
+        if form is None:
+            return t
+        
+        k = 1 + form['b']  # pente de la CAE en fonction de la CAA
+        r = target - form['a']
+        sign = self._bounds[bound][1]
+        if sign == 0 or form['c'] == 0:
+            if k > 0:
+                t = r / k
+        else:
+            # (r - k·t)² = c²·q(t), racine du bon côté : signe(r - k·t) = signe de la borne
+            c2 = form['c']**2
+            q0, q1, q2 = form['q']
+            A = k**2 - c2 * q2
+            if k <= 0 or A <= 0:
+                return t  # borne non monotone : recherche sur la grille
+            B = -2 * r * k - c2 * q1
+            C = r**2 - c2 * q0
+            disc = B**2 - 4 * A * C
+            with np.errstate(invalid='ignore'):
+                roots = (-B[:, np.newaxis] + np.array([-1.0, 1.0]) * np.sqrt(disc)[:, np.newaxis]) / (2 * A)
+            valid = np.isfinite(roots) & (sign * (r[:, np.newaxis] - k * roots) >= -1e-9)
+            t = np.where(valid, roots, -np.inf).max(axis=1)
+            t[~np.isfinite(t)] = np.nan
+        
+        t[t < form.get('t_min', -np.inf)] = np.nan
+        return t
+    
+    def _inverse_grid(self, target, origin, bound, t_range, n_grid, tol):
+        """Encadrement sur une grille propre à chaque échéance (bornée par elle), puis
+        bissection ; une évaluation par étape pour toutes les échéances.
+        
+        NaN si la CAE n'est jamais sous l'échéance, ou l'est encore à la fin de la grille
+        (solution non encadrée).
+        """
+        key = self._bounds[bound][0]
+        t_min, t_max = t_range if t_range is not None else (0.0, np.inf)
+        t_max = np.minimum(t_max, target)
+        
+        def cae(t):
+            return t + self.get_grid_predictions(t, origin)[key]
+        
+        # Grille n_grid × échéances, de t_min à la borne de chaque échéance
+        grid = t_min + np.linspace(0.0, 1.0, n_grid)[:, np.newaxis] * (t_max - t_min)[np.newaxis, :]
+        below = cae(grid.ravel()).reshape(grid.shape) <= target[np.newaxis, :]
+        
+        # Dernier point de grille sous l'échéance, suivi d'un point au-dessus
+        last = n_grid - 1 - np.argmax(below[::-1], axis=0)
+        t = np.full(len(target), np.nan)
+        bracket = below.any(axis=0) & (last < n_grid - 1) & (t_max > t_min)
+        cols = np.flatnonzero(bracket)
+        lo = grid[last[bracket], cols]
+        hi = grid[last[bracket] + 1, cols]
+        goal = target[bracket]
+        while len(goal) and np.max(hi - lo) > tol:
+            mid = (lo + hi) / 2
+            ok = cae(mid) <= goal
+            lo = np.where(ok, mid, lo)
+            hi = np.where(ok, hi, mid)
+        t[bracket] = lo
+        return t
@@ -0,0 +1,52 @@
+"""
+Arithmétique de dates vectorisée partagée par les modèles et le tracé
+Les calculs se font en numéros de jour (int64 depuis 1970-01-01) et en datetime64 ;
+la conversion vers pandas n'a lieu qu'une fois, à la frontière de l'API
+"""
+
+import numpy as np
+import pandas as pd
+
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+NS_PER_DAY = 86_400 * 10**9
+
+
+def day_number(date):
+    """Numéro de jour (int64 depuis 1970-01-01) d'une date ou d'un tableau de dates."""
+    if isinstance(date, pd.Timestamp):
+        return date.value // NS_PER_DAY
+    days = np.asarray(date, dtype='datetime64[D]').astype(np.int64)
+    return int(days) if days.ndim == 0 else days
+
+
+def offset(target_date, origin):
+    """Nombre de jours entre l'origine et la date cible (float, comme la colonne t)."""
+    return float(day_number(target_date) - day_number(origin))
+
+
+def shift(day, delays):
+    """Jour + délai(s) arrondis au jour inférieur, en datetime64[D] (NaT si non fini)."""
+    delays = np.asarray(delays, dtype=float)
+    finite = np.isfinite(delays)
+    out = np.full(delays.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+    out[finite] = EPOCH + (day + np.floor(delays[finite]).astype(np.int64))
+    return out if out.ndim else out[()]
+
+
+def cae_dates(target_date, delays):
+    """Dates CAE (Timestamps) pour un tuple de délais depuis la date CAA cible."""
+    days = shift(day_number(target_date), delays)
+    return tuple(pd.Timestamp(d) for d in days)
+
+
+def date_grid(origin, t_grid):
+    """Dates de la grille (DatetimeIndex), t_grid fractionnaire conservé à la seconde."""
+    seconds = np.round((day_number(origin) + np.asarray(t_grid, dtype=float)) * 86_400)
+    return pd.DatetimeIndex(np.datetime64(0, 's') + seconds.astype(np.int64))
+
+
+def day_float(dates):
+    """Dates (datetime64, DatetimeIndex) en jours fractionnaires depuis 1970-01-01."""
+    seconds = np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+    return seconds / 86_400
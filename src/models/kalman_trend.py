@@ -0,0 +1,286 @@
+import numpy as np
+import scipy.stats as st
+from scipy.optimize import minimize
+from .base import BaseModel
+from . import dates
+
+
+class LocalLinearTrendModel(BaseModel):
+    """Modèle espace d'état « tendance locale linéaire » estimé par filtre de Kalman.
+
+    État = (niveau, pente) du délai. Entre deux jours CAA séparés de Δ jours, la transition
+    est celle d'une marche aléatoire intégrée en temps continu :
+        niveau' = niveau + Δ·pente + η,   pente' = pente + ζ
+        Q(Δ) = q_level·[[Δ, 0], [0, 0]] + q_slope·[[Δ³/3, Δ²/2], [Δ²/2, Δ]]
+    et chaque observation vaut niveau + ε, ε ~ N(0, sigma2_obs). Week-ends et jours
+    fériés (écarts irréguliers) sont ainsi pris en compte exactement.
+
+    Les observations d'un même jour sont regroupées (moyenne, variance sigma2_obs/k) :
+    filtre et lissage sont en O(nombre de jours). Les variances sont estimées par
+    maximum de vraisemblance avec gradient analytique (récursions de sensibilité).
+    L'intervalle s'élargit naturellement avec l'horizon d'extrapolation.
+    """
+
+    _cache_attrs = ('diffuse',)
+
+    def __init__(self, confidence_level=0.95, diffuse=1e6):
+        super().__init__(confidence_level)
+        self.diffuse = diffuse
+        self.variances = None  # (sigma2_obs, q_level, q_slope)
+        # Jours et états lissés (niveau, pente) par jour, dans des tampons à capacité doublée
+        # (ajout en O(1) amorti) : seules les `_size` premières lignes sont valides
+        self._days = None
+        self._means = None
+        self._covs = None
+        self._size = 0
+        self.last_mean = None  # état filtré au dernier jour (base des ajouts)
+        self.last_cov = None
+        self.loglik = None
+
+    @staticmethod
+    def _noise(gap):
+        """Matrices unitaires de bruit d'état (niveau, pente) pour un écart de `gap` jours."""
+        Q_level = np.array([[gap, 0.0], [0.0, 0.0]])
+        Q_slope = np.array([[gap**3 / 3, gap**2 / 2], [gap**2 / 2, gap]])
+        return Q_level, Q_slope
+
+    @staticmethod
+    def _aggregate(t_arr, y):
+        """Regrouper les observations par jour : effectif, moyenne, somme des carrés intra-jour."""
+        days, inverse, counts = np.unique(t_arr, return_inverse=True, return_counts=True)
+        sums = np.bincount(inverse, weights=y)
+        means = sums / counts
+        ss_within = np.bincount(inverse, weights=(y - means[inverse])**2)
+        return days, counts.astype(float), means, ss_within
+
+    def _filter(self, theta, days, counts, means, ss_within, grad=True, keep=False):
+        """Filtre de Kalman sur les jours : log-vraisemblance, gradient en theta = log(variances).
+
+        Les deux premiers jours (initialisation diffuse) sont exclus de la vraisemblance.
+        """
+        H, q_level, q_slope = np.exp(theta)
+        N = len(days)
+        a = np.array([means[0], 0.0])
+        P = np.eye(2) * self.diffuse
+        da = np.zeros((3, 2))
+        dP = np.zeros((3, 2, 2))
+        dH = np.array([H, 0.0, 0.0])
+
+        loglik = 0.0
+        dloglik = np.zeros(3)
+        if keep:
+            a_f, P_f = np.empty((N, 2)), np.empty((N, 2, 2))
+            a_p, P_p = np.empty((N, 2)), np.empty((N, 2, 2))
+
+        for i in range(N):
+            # Prédiction (transition mise à l'échelle de l'écart en jours)
+            if i > 0:
+                gap = days[i] - days[i - 1]
+                T = np.array([[1.0, gap], [0.0, 1.0]])
+                Q_level, Q_slope = self._noise(gap)
+                a = T @ a
+                P = T @ P @ T.T + q_level * Q_level + q_slope * Q_slope
+                if grad:
+                    da = da @ T.T
+                    dP = T @ dP @ T.T
+                    dP[1] += q_level * Q_level
+                    dP[2] += q_slope * Q_slope
+            if keep:
+                a_p[i], P_p[i] = a, P
+
+            # Mise à jour avec la moyenne du jour (variance H / k)
+            k = counts[i]
+            v = means[i] - a[0]
+            F = P[0, 0] + H / k
+            PZ = P[:, 0].copy()
+            K = PZ / F
+            a = a + K * v
+            P = P - np.outer(PZ, PZ) / F
+
+            if i >= 2:
+                loglik -= 0.5 * (np.log(2 * np.pi * F) + v**2 / F)
+                # Observations multiples du même jour : terme intra-jour exact
+                loglik -= 0.5 * ((k - 1) * np.log(2 * np.pi * H) + np.log(k) + ss_within[i] / H)
+
+            if grad:
+                dv = -da[:, 0]
+                dF = dP[:, 0, 0] + dH / k
+                dPZ = dP[:, :, 0]
+                dK = dPZ / F - PZ[np.newaxis, :] * (dF / F**2)[:, np.newaxis]
+                if i >= 2:
+                    dloglik -= 0.5 * (dF / F + 2 * v * dv / F - v**2 * dF / F**2)
+                    dloglik[0] -= 0.5 * ((k - 1) - ss_within[i] / H)
+                da = da + dK * v + K[np.newaxis, :] * dv[:, np.newaxis]
+                outer = np.einsum('ji,k->jik', dPZ, PZ) + np.einsum('i,jk->jik', PZ, dPZ)
+                dP = dP - outer / F + np.outer(PZ, PZ)[np.newaxis] * (dF / F**2)[:, np.newaxis, np.newaxis]
+
+            if keep:
+                a_f[i], P_f[i] = a, P
+
+        if keep:
+            return loglik, dloglik, (a_f, P_f, a_p, P_p)
+        return loglik, dloglik
+
+    def _smooth(self, days, a_f, P_f, a_p, P_p):
+        """Lissage de Rauch–Tung–Striebel (sens rétrograde)."""
+        N = len(days)
+        a_s, P_s = a_f.copy(), P_f.copy()
+        for i in range(N - 2, -1, -1):
+            gap = days[i + 1] - days[i]
+            T = np.array([[1.0, gap], [0.0, 1.0]])
+            J = P_f[i] @ T.T @ np.linalg.inv(P_p[i + 1])
+            a_s[i] = a_f[i] + J @ (a_s[i + 1] - a_p[i + 1])
+            P_s[i] = P_f[i] + J @ (P_s[i + 1] - P_p[i + 1]) @ J.T
+        return a_s, P_s
+
+    def fit(self, df):
+        """Estimer les variances (MV, gradient analytique), filtrer puis lisser."""
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        days, counts, means, ss_within = self._aggregate(t_arr, y)
+        if len(days) < 3:
+            raise ValueError("Au moins 3 jours CAA distincts sont nécessaires")
+
+        # Point de départ : variance résiduelle d'une tendance linéaire
+        resid = y - np.polyval(np.polyfit(t_arr, y, 1), t_arr)
+        s2 = max(np.var(resid), 1e-3)
+        theta0 = np.log([s2, s2 / 10, s2 / 1e4])
+
+        def objective(theta):
+            ll, dll = self._filter(theta, days, counts, means, ss_within)
+            return -ll, -dll
+
+        result = minimize(objective, theta0, jac=True, method='L-BFGS-B',
+                          bounds=[(np.log(s2) - 20, np.log(s2) + 10)] * 3)
+        theta = result.x
+        self.variances = np.exp(theta)
+
+        loglik, _, (a_f, P_f, a_p, P_p) = self._filter(
+            theta, days, counts, means, ss_within, grad=False, keep=True)
+        a_s, P_s = self._smooth(days, a_f, P_f, a_p, P_p)
+
+        self.loglik = loglik
+        self._days, self._means, self._covs = days, a_s, P_s
+        self._size = len(days)
+        self.last_mean = a_f[-1].copy()  # copies : ne pas retenir tout le filtre
+        self.last_cov = P_f[-1].copy()
+        self.params['n'] = len(t_arr)
+
+    @property
+    def days(self):
+        return None if self._days is None else self._days[:self._size]
+
+    @property
+    def state_mean(self):
+        """États lissés par jour (niveau, pente) ; filtrés pour les jours ajoutés par update."""
+        return None if self._means is None else self._means[:self._size]
+
+    @property
+    def state_cov(self):
+        return None if self._covs is None else self._covs[:self._size]
+
+    def _append_day(self, t, a, P):
+        """Ajouter un jour à l'historique, en doublant la capacité des tampons si besoin."""
+        if self._size == len(self._days):
+            capacity = 2 * len(self._days)
+            self._days = np.resize(self._days, capacity)
+            self._means = np.resize(self._means, (capacity, 2))
+            self._covs = np.resize(self._covs, (capacity, 2, 2))
+        self._days[self._size] = t
+        self._means[self._size] = a
+        self._covs[self._size] = P
+        self._size += 1
+
+    def update(self, t, delay_days):
+        """Ajouter une observation : une étape de filtre en O(1) amorti, sans relancer le lissage.
+
+        Les variances restent celles du dernier fit ; l'historique lissé est conservé tel quel
+        et l'état filtré courant sert aux prévisions au-delà de la dernière observation.
+        """
+        H, q_level, q_slope = self.variances
+        t = float(t)
+        gap = t - self.days[-1]
+        if gap < 0:
+            raise ValueError("Les observations doivent être ajoutées dans l'ordre chronologique")
+
+        a, P = self.last_mean, self.last_cov
+        if gap > 0:
+            T = np.array([[1.0, gap], [0.0, 1.0]])
+            Q_level, Q_slope = self._noise(gap)
+            a = T @ a
+            P = T @ P @ T.T + q_level * Q_level + q_slope * Q_slope
+
+        v = float(delay_days) - a[0]
+        F = P[0, 0] + H
+        PZ = P[:, 0].copy()
+        a = a + PZ / F * v
+        P = P - np.outer(PZ, PZ) / F
+
+        self.last_mean, self.last_cov = a, P
+        if gap > 0:
+            self._append_day(t, a, P)
+        else:
+            self._means[self._size - 1], self._covs[self._size - 1] = a, P
+        self.params['n'] += 1
+
+    def _forecast(self, t_grid):
+        """Moyenne et variance prédictive d'une nouvelle observation en chaque t (vectorisé).
+
+        Dans l'historique : état lissé du jour précédent propagé de l'écart ; au-delà :
+        état filtré courant propagé jusqu'à l'horizon.
+        """
+        H, q_level, q_slope = self.variances
+        t_grid = np.asarray(t_grid, dtype=float)
+        idx = np.clip(np.searchsorted(self.days, t_grid, side='right') - 1, 0, len(self.days) - 1)
+        gap = t_grid - self.days[idx]
+
+        means = self.state_mean[idx].copy()
+        covs = self.state_cov[idx].copy()
+        last = idx == len(self.days) - 1
+        means[last] = self.last_mean
+        covs[last] = self.last_cov
+
+        level = means[:, 0] + gap * means[:, 1]
+        var_level = covs[:, 0, 0] + 2 * gap * covs[:, 0, 1] + gap**2 * covs[:, 1, 1]
+        var_level += np.abs(gap) * q_level + np.abs(gap)**3 / 3 * q_slope
+        return level, var_level + H
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible."""
+        t0 = dates.offset(target_date, origin)
+        level, var = self._forecast(np.array([t0]))
+
+        pred_delay = float(level[0])
+        z = st.norm.ppf(0.5 + self.confidence_level/2)
+        half = z * float(np.sqrt(var[0]))
+        lo_delay = pred_delay - half
+        hi_delay = pred_delay + half
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def _spread(self, t):
+        """Niveau prévu et écart-type prédictif (loi normale)."""
+        level, var = self._forecast(t)
+        return level, np.sqrt(var), np.inf
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        level, var = self._forecast(t_grid)
+        z = st.norm.ppf(0.5 + self.confidence_level/2)
+        half = z * np.sqrt(var)
+
+        return {
+            'delay_central': level,
+            'pi_lo': level - half,
+            'pi_hi': level + half,
+            'date_grid': date_grid
+        }
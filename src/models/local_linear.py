@@ -0,0 +1,166 @@
+import numpy as np
+from .base import BaseModel
+from .prefix_stats import PrefixStats
+from .profiling import span
+from . import dates
+
+
+class LocalLinearModel(BaseModel):
+    """Régression linéaire locale (type LOESS) sur fenêtre glissante, par sommes cumulées.
+
+    Poids `kernel='boxcar'` (uniformes sur [x - h, x + h]) ou `'triangular'`
+    (1 - |t - x|/h). De chaque côté de x, le poids est affine en t : les sommes pondérées
+    se déduisent des sommes cumulées de t^k (k <= 4) et t^k·y (k <= 2), et chaque fit local
+    coûte O(log n) (deux recherches dichotomiques). Le fit et une grille coûtent donc
+    O(n + grille) à log près, au lieu de O(n·grille).
+    La largeur h (jours) minimise le critère GCV si `bandwidth` n'est pas fixé ; la
+    variance d'une prédiction vient des mêmes sommes (poids équivalents Σ l_i²).
+    Hors des données, la droite locale du bord est prolongée.
+    """
+
+    _cache_attrs = ('bandwidth', 'kernel', 'n_bandwidths', 'min_points')
+
+    def __init__(self, confidence_level=0.95, bandwidth=None, kernel='triangular',
+                 n_bandwidths=25, min_points=5):
+        super().__init__(confidence_level)
+        self.bandwidth = bandwidth
+        self.kernel = kernel
+        self.n_bandwidths = n_bandwidths
+        self.min_points = min_points
+        self.stats = None
+        self.sigma = None
+        self.dof = None
+
+    def _local(self, center, x, h):
+        """Fits locaux centrés en `center`, évalués en `x` (vectorisé).
+
+        Returns:
+            (prédiction, Σ l_i² des poids équivalents, levier 1/W0 + d²/Suu)
+        """
+        stats = self.stats
+        u_c = (center - stats.shift) / stats.scale
+        u_x = (x - stats.shift) / stats.scale
+        i0 = np.searchsorted(stats.t, center - h, side='left')
+        im = np.searchsorted(stats.t, center, side='left')
+        i1 = np.searchsorted(stats.t, center + h, side='right')
+
+        # Poids affine c0 + c1·u de chaque côté de x (triangulaire) ; constant (boxcar)
+        r = stats.scale / h
+        if self.kernel == 'triangular':
+            sides = [(i0, im, 1 - r * u_c, r), (im, i1, 1 + r * u_c, -r)]
+        else:
+            sides = [(i0, i1, np.ones_like(u_c), 0.0)]
+
+        W = np.zeros((3, len(u_c)))
+        Wy = np.zeros((2, len(u_c)))
+        V = np.zeros((3, len(u_c)))
+        for i, j, c0, c1 in sides:
+            M = stats.S[:, j] - stats.S[:, i]
+            My = stats.Sy[:, j] - stats.Sy[:, i]
+            for k in range(3):
+                W[k] += c0 * M[k] + c1 * M[k + 1]
+                V[k] += c0**2 * M[k] + 2 * c0 * c1 * M[k + 1] + c1**2 * M[k + 2]
+            for k in range(2):
+                Wy[k] += c0 * My[k] + c1 * My[k + 1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u_mean = W[1] / W[0]
+            y_mean = Wy[0] / W[0]
+            Suu = np.maximum(W[2] - W[1] * u_mean, 0.0)
+            flat = Suu <= 1e-12 * np.maximum(W[0], 1)
+            Suu_safe = np.where(flat, 1.0, Suu)
+            b = np.where(flat, 0.0, (Wy[1] - u_mean * Wy[0]) / Suu_safe)
+            d = u_x - u_mean
+            pred = y_mean + b * d
+
+            # Σ l_i², l_i = w_i·(1/W0 + (u_i - ū)·d/Suu)
+            V1c = V[1] - u_mean * V[0]
+            V2c = V[2] - 2 * u_mean * V[1] + u_mean**2 * V[0]
+            slope_terms = np.where(flat, 0.0, 2 * d * V1c / (W[0] * Suu_safe) + d**2 * V2c / Suu_safe**2)
+            sum_l2 = V[0] / W[0]**2 + slope_terms
+            leverage = 1 / W[0] + np.where(flat, 0.0, d**2 / Suu_safe)
+        return pred, sum_l2, leverage
+
+    def _bandwidths(self, t):
+        """Largeurs candidates : de la plus petite garantissant des voisins à toute l'étendue."""
+        span_t = t[-1] - t[0] or 1.0
+        gaps = np.diff(np.unique(t))
+        h_min = max(span_t * self.min_points / len(t), gaps.max() if len(gaps) else 1.0)
+        return np.geomspace(h_min, max(span_t, h_min * 1.01), self.n_bandwidths)
+
+    def fit(self, df):
+        """Sommes cumulées, puis largeur de fenêtre par GCV."""
+        if self.kernel not in ('boxcar', 'triangular'):
+            raise ValueError(f"Noyau inconnu: {self.kernel}. Choix: ['boxcar', 'triangular']")
+        t = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        if len(t) < 3:
+            raise ValueError("Au moins 3 observations sont nécessaires")
+        order = np.argsort(t, kind='stable')
+        t, y = t[order], y[order]
+        self.stats = PrefixStats.from_arrays(t, y, degree=2)
+        n = len(t)
+
+        candidates = [self.bandwidth] if self.bandwidth is not None else self._bandwidths(t)
+        best = None
+        with span("gcv", candidates=len(candidates)):
+            for h in candidates:
+                pred, _, leverage = self._local(t, t, h)
+                rss = float(np.sum((y - pred)**2))
+                trace = float(np.sum(leverage))
+                gcv = n * rss / max(n - trace, 1e-9)**2
+                if best is None or gcv < best[0]:
+                    best = (gcv, h, rss, trace)
+
+        gcv, h, rss, trace = best
+        dof = max(n - trace, 1.0)
+        self.params['bandwidth'] = float(h)
+        self.params['gcv'] = gcv
+        self.params['edf'] = trace  # degrés de liberté effectifs tr(L)
+        self.params['n'] = n
+        self.params['t_range'] = (float(t[0]), float(t[-1]))
+        self.sigma = float(np.sqrt(rss / dof))
+        self.dof = dof
+        self._keep(t_arr=t, y=y)
+
+    def _spread(self, t):
+        """Délai central et écart-type de prédiction en chaque t."""
+        t = np.asarray(t, dtype=float)
+        center = np.clip(t, *self.params['t_range'])
+        pred, sum_l2, _ = self._local(center, t, self.params['bandwidth'])
+        return pred, self.sigma * np.sqrt(1 + sum_l2), self.dof
+    
+    def _curve(self, t):
+        """Délai central et demi-largeur de l'intervalle prédictif en chaque t."""
+        pred, se, _ = self._spread(t)
+        return pred, self.tcrit * se
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible."""
+        t0 = dates.offset(target_date, origin)
+        pred, half = self._curve([t0])
+        pred_delay = float(pred[0])
+        lo_delay = pred_delay - float(half[0])
+        hi_delay = pred_delay + float(half[0])
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        pred, half = self._curve(t_grid)
+
+        return {
+            'delay_central': pred,
+            'pi_lo': pred - half,
+            'pi_hi': pred + half,
+            'date_grid': date_grid
+        }
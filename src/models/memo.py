@@ -0,0 +1,210 @@
+"""
+Mémoïsation des prédictions (predict, get_grid_predictions)
+Clé : (tampon de fit du modèle et hyperparamètres courants, méthode, empreinte des
+arguments) — chaque fit ou mise à jour attribue un nouveau tampon, ce qui invalide les
+entrées du modèle sans les parcourir ; changer un hyperparamètre change aussi la clé.
+Un seul cache LRU par processus, borné en entrées et en octets, partagé par tous les
+modèles : un ensemble et ses membres y trouvent les mêmes résultats
+"""
+
+import os
+import hashlib
+import functools
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+_enabled = True
+_counter = itertools.count(1)
+
+
+class PredictionCache:
+    """LRU borné en nombre d'entrées et en octets."""
+
+    def __init__(self, max_entries=4096, max_bytes=32 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clé -> (valeur, octets)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = PredictionCache()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Désactiver la mémoïsation (le cache est vidé)."""
+    global _enabled
+    _enabled = False
+    _cache.clear()
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure(max_entries=None, max_bytes=None):
+    """Changer les bornes du cache (éviction immédiate si nécessaire)."""
+    if max_entries is not None:
+        _cache.max_entries = max_entries
+    if max_bytes is not None:
+        _cache.max_bytes = max_bytes
+    _cache._evict()
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    """Occupation et efficacité du cache."""
+    return {
+        'entries': len(_cache),
+        'bytes': _cache.nbytes,
+        'hits': _cache.hits,
+        'misses': _cache.misses
+    }
+
+
+def new_stamp():
+    """Tampon de fit unique (le pid distingue les modèles reçus d'un autre processus)."""
+    return (os.getpid(), next(_counter))
+
+
+def _nbytes(value):
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values()) + 64 * len(value)
+    if isinstance(value, (np.ndarray, pd.Index)):
+        return int(value.nbytes)
+    return 32
+
+
+def _feed(h, value):
+    """Ajouter une valeur à l'empreinte ; False si elle n'est pas hachable de façon fiable."""
+    if isinstance(value, (np.ndarray, pd.Index)):
+        array = np.ascontiguousarray(np.asarray(value))
+        if array.dtype == object:
+            return False
+        h.update(f"{array.dtype.str}{array.shape}".encode())
+        h.update(array.tobytes())
+    elif isinstance(value, (pd.Timestamp, np.datetime64)):
+        h.update(f"ts{pd.Timestamp(value).value}".encode())
+    elif value is None or isinstance(value, (bool, int, float, str, np.number)):
+        h.update(f"{type(value).__name__}{value!r}".encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"seq{len(value)}".encode())
+        return all(_feed(h, v) for v in value)
+    else:
+        return False
+    return True
+
+
+def digest(args, kwargs):
+    """Empreinte des arguments ; None si un argument n'est pas hachable de façon fiable."""
+    h = hashlib.blake2b(digest_size=16)
+    if not all(_feed(h, value) for value in args):
+        return None
+    for name, value in sorted(kwargs.items()):
+        h.update(f"kw{name}".encode())
+        if not _feed(h, value):
+            return None
+    return h.hexdigest()
+
+
+def freeze(value):
+    """Forme hachable d'un hyperparamètre (dict, liste, tableau) pour la clé du cache."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    return value
+
+
+def _copy(value):
+    """Copie des tableaux : un appelant qui modifie le résultat n'altère pas le cache."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+def memoize(name):
+    """Décorateur de méthode : résultat mis en cache par (tampon de fit, name, arguments)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            stamp = self._cache_stamp() if _enabled else None
+            if stamp is None:
+                return func(self, *args, **kwargs)
+            key = digest(args, kwargs)
+            if key is None:
+                return func(self, *args, **kwargs)
+            key = (stamp, name, key)
+            cached = _cache.get(key)
+            if cached is not None:
+                return _copy(cached)
+            result = func(self, *args, **kwargs)
+            _cache.put(key, _copy(result))
+            return result
+        wrapper.__memoized__ = name
+        return wrapper
+    return decorator
+
+
+def invalidating(func):
+    """Décorateur de méthode qui modifie l'état ajusté : nouveau tampon avant et après."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._fit_stamp = new_stamp()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._fit_stamp = new_stamp()
+    wrapper.__invalidating__ = True
+    return wrapper
@@ -1,13 +1,19 @@
 import numpy as np
 import pandas as pd
-import scipy.stats as st
 import math
 from .base import BaseModel
+from . import dates
+from .prefix_stats import PrefixStats
+from .influence import ols_influence
+from .profiling import span
 
 
 class PiecewiseLinearModel(BaseModel):
     """Régression piecewise linéaire avec détection automatique du point de rupture."""
     
+    _cache_attrs = ('min_samples',)
+    supports_influence = True
+    
     def __init__(self, confidence_level=0.95, min_samples=8):
         super().__init__(confidence_level)
         self.min_samples = min_samples
@@ -16,55 +22,77 @@ class PiecewiseLinearModel(BaseModel):
         self.c2 = None  # coefficients après rupture
         self.break_date = None
         self.sigma = None
-        self.tcrit = None
-    
-    def _fit_lin(self, x, y):
-        """Fit linéaire simple avec LSQ."""
-        A = np.vstack([np.ones(len(x)), x]).T
-        coef = np.linalg.lstsq(A, y, rcond=None)[0]
-        sse = np.sum((y - (A @ coef))**2)
-        return coef, sse
+        self.dof = None
     
     def fit(self, df):
         """Fit le modèle piecewise linéaire."""
         t_arr = df["t"].to_numpy()
         y = df["delay_days"].to_numpy().astype(float)
         
-        # Trouver le meilleur breakpoint
-        best = None
-        for bp in range(self.min_samples, len(df) - self.min_samples):
-            c1, sse1 = self._fit_lin(t_arr[:bp], y[:bp])
-            c2, sse2 = self._fit_lin(t_arr[bp:], y[bp:])
-            if best is None or (sse1 + sse2) < best[0]:
-                best = (sse1 + sse2, bp, c1, c2)
+        self.fit_stats(PrefixStats.from_arrays(t_arr, y))
+        self.break_date = pd.Timestamp(dates.shift(dates.day_number(df["CAA"].min()), t_arr[self.breakpoint]))
+        self._keep(t_arr=t_arr, y=y)
+    
+    def sse_profile(self, stats, end=None):
+        """SSE total pour chaque point de rupture candidat sur les entrées [0, end).
+        
+        Le profil ne dépend pas de min_samples : un seul calcul sert toutes ses valeurs.
+        """
+        end = len(stats) if end is None else end
+        bps = np.arange(1, end)
+        with span("breakpoint_scan", candidates=len(bps)):
+            seg1 = stats.linear(0, bps)
+            seg2 = stats.linear(bps, end)
+        return {
+            'end': end,
+            'bps': bps,
+            'n1': seg1['n'],
+            'n2': seg2['n'],
+            'sse': seg1['sse'] + seg2['sse'],
+            'seg1': seg1,
+            'seg2': seg2
+        }
+    
+    def fit_stats(self, stats, end=None, profile=None):
+        """Fit depuis des statistiques cumulées, sur les entrées [0, end).
+        
+        Le balayage des points de rupture est vectorisé : chaque candidat coûte O(1).
+        Un `profile` (voir sse_profile) déjà calculé pour le même `end` peut être fourni.
+        """
+        if profile is None:
+            profile = self.sse_profile(stats, end)
+        
+        # Trouver le meilleur breakpoint (effectifs min_samples de part et d'autre)
+        valid = np.flatnonzero((profile['n1'] >= self.min_samples) & (profile['n2'] > self.min_samples))
+        if len(valid) == 0:
+            raise ValueError(f"Pas assez d'observations pour min_samples={self.min_samples}")
         
-        _, self.breakpoint, self.c1, self.c2 = best
-        self.break_date = df.loc[self.breakpoint, "CAA"]
+        best = int(valid[np.argmin(profile['sse'][valid])])
+        bps, seg1, seg2 = profile['bps'], profile['seg1'], profile['seg2']
+        
+        self.breakpoint = int(bps[best])
+        self.c1 = np.array([seg1['a'][best], seg1['b'][best]])
+        self.c2 = np.array([seg2['a'][best], seg2['b'][best]])
+        self.break_date = None
         
         # Calcul de sigma pour l'intervalle de prédiction
-        x2 = t_arr[self.breakpoint:]
-        y2 = y[self.breakpoint:]
-        n = len(x2)
-        yhat2 = self.c2[0] + self.c2[1] * x2
-        res = y2 - yhat2
-        sigma2 = np.sum(res**2) / (n - 2)
+        n = seg2['n'][best]
+        sigma2 = seg2['sse'][best] / (n - 2)
         self.sigma = math.sqrt(sigma2)
-        self.tcrit = st.t.ppf(0.5 + self.confidence_level/2, n - 2)
+        self.dof = n - 2
         
         self.params['n'] = n
-        self.params['x_mean'] = x2.mean()
-        self.params['Sxx'] = np.sum((x2 - self.params['x_mean'])**2)
-        self.params['t_arr'] = t_arr
-        self.params['y'] = y
+        self.params['x_mean'] = seg2['t_mean'][best]
+        self.params['Sxx'] = seg2['Sxx'][best]
+        self.params['t_break'] = stats.t[self.breakpoint]
     
     def predict(self, target_date, origin):
         """Prédire pour une date CAA cible."""
-        t0 = float((target_date - origin).days)
+        t0 = dates.offset(target_date, origin)
         
         # Prédiction ponctuelle
         a2, b2 = self.c2
         pred_delay = a2 + b2 * t0
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
         
         # Intervalle de prédiction
         n = self.params['n']
@@ -75,8 +103,7 @@ class PiecewiseLinearModel(BaseModel):
         lo_delay = pred_delay - self.tcrit * se_pred
         hi_delay = pred_delay + self.tcrit * se_pred
         
-        lo_cae = target_date + pd.to_timedelta(lo_delay, unit="D")
-        hi_cae = target_date + pd.to_timedelta(hi_delay, unit="D")
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -87,24 +114,62 @@ class PiecewiseLinearModel(BaseModel):
             'hi_delay': hi_delay
         }
     
-    def get_grid_predictions(self, t_grid, origin):
-        """Prédictions sur une grille de temps."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
-        t_arr = self.params['t_arr']
+    def _inverse_form(self, bound):
+        """Segment final linéaire, intervalle en sqrt(1 + 1/n + (t - x_mean)²/Sxx)."""
+        n, x_mean, Sxx = self.params['n'], self.params['x_mean'], self.params['Sxx']
+        return {
+            'a': self.c2[0],
+            'b': self.c2[1],
+            'c': self.tcrit * self.sigma,
+            'q': (1 + 1/n + x_mean**2 / Sxx, -2 * x_mean / Sxx, 1 / Sxx),
+            't_min': self.params['t_break']
+        }
+    
+    def influence(self, df, target_date, origin):
+        """Influence de chaque ligne dans son segment, à point de rupture fixé.
         
-        # Segment central (piecewise)
+        La prédiction cible vient du segment final : retirer une ligne du premier
+        segment ne la change pas (delta_pred = 0), mais levier et distance de Cook
+        y sont calculés sur le fit du segment.
+        """
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        return self._segment_influence(t_arr, y, dates.offset(target_date, origin))
+    
+    def _segment_influence(self, t_arr, y, t0, weights=None):
+        """Influence dans chaque segment (moindres carrés pondérés si `weights`)."""
+        bp = self.breakpoint
+        root = np.ones(len(y)) if weights is None else np.sqrt(weights)
+        parts = [ols_influence(root[i:j, np.newaxis] * np.column_stack([np.ones(j - i), t_arr[i:j]]),
+                               root[i:j] * y[i:j], [1.0, t0])
+                 for i, j in ((0, bp), (bp, len(y)))]
+        parts[0]['delta_pred'] = np.zeros(bp)
+        out = {key: np.concatenate([part[key] for part in parts])
+               for key in ('leverage', 'residual', 'cooks_distance', 'delta_pred')}
+        out['residual'] = out['residual'] / root  # résidus bruts (non pondérés)
+        out['segment'] = np.repeat([1, 2], [bp, len(y) - bp])
+        out['pred'] = parts[1]['pred']
+        return out
+    
+    def _spread(self, t):
+        """Délai piecewise et écart-type de prédiction du segment final."""
         delay_central = np.where(
-            t_grid < t_arr[self.breakpoint],
-            self.c1[0] + self.c1[1] * t_grid,
-            self.c2[0] + self.c2[1] * t_grid
+            t < self.params['t_break'],
+            self.c1[0] + self.c1[1] * t,
+            self.c2[0] + self.c2[1] * t
         )
-        
-        # Intervalle sur le segment final
         n = self.params['n']
         x_mean = self.params['x_mean']
         Sxx = self.params['Sxx']
+        se = self.sigma * np.sqrt(1 + 1/n + (t - x_mean)**2 / Sxx)
+        return delay_central, se, self.dof
+    
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
         
-        se_grid = self.sigma * np.sqrt(1 + 1/n + (t_grid - x_mean)**2 / Sxx)
+        # Segment central (piecewise), intervalle sur le segment final
+        delay_central, se_grid, _ = self._spread(t_grid)
         pi_lo = delay_central - self.tcrit * se_grid
         pi_hi = delay_central + self.tcrit * se_grid
         
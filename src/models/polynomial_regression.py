@@ -1,20 +1,23 @@
 import numpy as np
-import pandas as pd
-import scipy.stats as st
 import math
 from .base import BaseModel
+from .influence import ols_influence
+from . import dates
 
 
 class PolynomialRegressionModel(BaseModel):
     """Régression polynomiale avec sélection automatique du degré optimal."""
     
+    _cache_attrs = ('degree',)
+    supports_influence = True
+    
     def __init__(self, confidence_level=0.95, degree=3):
         super().__init__(confidence_level)
         self.degree = degree
         self.poly_coef = None
         self.poly_fit = None
         self.sigma = None
-        self.tcrit = None
+        self.dof = None
     
     def fit(self, df):
         """Fit polynomial regression."""
@@ -35,34 +38,49 @@ class PolynomialRegressionModel(BaseModel):
         sigma2 = np.sum(residuals**2) / max(dof, 1)
         self.sigma = math.sqrt(sigma2)
         
-        # Valeur critique t
-        self.tcrit = st.t.ppf(0.5 + self.confidence_level/2, max(dof, 1))
+        self.dof = max(dof, 1)
         
-        self.params['t_arr'] = t_arr
-        self.params['y'] = y
         self.params['n'] = n
-        self.params['residuals'] = residuals
+        self._keep(t_arr=t_arr, y=y, residuals=residuals)
+        self.params['t_mean'] = t_arr.mean()
+        self.params['Sxx'] = np.sum((t_arr - t_arr.mean())**2)
+    
+    def fit_stats(self, stats, end=None):
+        """Fit depuis des statistiques cumulées (matrice de Gram), sur les entrées [0, end)."""
+        end = len(stats) if end is None else end
+        fit = stats.polynomial(0, end, self.degree)
+        self.set_solution(fit['poly'], fit['sse'], fit['n'], fit['t_mean'], fit['Sxx'])
+    
+    def set_solution(self, poly, sse, n, t_mean, Sxx):
+        """Installer une solution LSQ déjà calculée (polynôme en t, SSE et moments de t)."""
+        self.poly_fit = poly
+        self.poly_coef = poly.coeffs
+        
+        dof = n - (self.degree + 1)
+        self.sigma = math.sqrt(sse / max(dof, 1))
+        self.dof = max(dof, 1)
+        
+        self.params['n'] = n
+        self.params['t_mean'] = t_mean
+        self.params['Sxx'] = Sxx
     
     def predict(self, target_date, origin):
         """Prédire pour une date CAA cible."""
-        t0 = float((target_date - origin).days)
+        t0 = dates.offset(target_date, origin)
         
         # Prédiction ponctuelle
         pred_delay = float(self.poly_fit(t0))
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
         
         # Intervalle de prédiction (simplifié)
         n = self.params['n']
-        t_arr = self.params['t_arr']
-        t_mean = t_arr.mean()
+        t_mean = self.params['t_mean']
         
         # Terme de variance pour extrapolation
-        se_pred = self.sigma * math.sqrt(1 + 1/n + (t0 - t_mean)**2 / np.sum((t_arr - t_mean)**2))
+        se_pred = self.sigma * math.sqrt(1 + 1/n + (t0 - t_mean)**2 / self.params['Sxx'])
         lo_delay = pred_delay - self.tcrit * se_pred
         hi_delay = pred_delay + self.tcrit * se_pred
         
-        lo_cae = target_date + pd.to_timedelta(lo_delay, unit="D")
-        hi_cae = target_date + pd.to_timedelta(hi_delay, unit="D")
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -73,20 +91,43 @@ class PolynomialRegressionModel(BaseModel):
             'hi_delay': hi_delay
         }
     
+    def _inverse_form(self, bound):
+        """Forme close pour le degré 1 uniquement."""
+        if self.poly_fit.order > 1:
+            return None
+        a, b = self.poly_fit(0.0), self.poly_fit.deriv()(0.0)
+        n, t_mean, Sxx = self.params['n'], self.params['t_mean'], self.params['Sxx']
+        return {
+            'a': a,
+            'b': b,
+            'c': self.tcrit * self.sigma,
+            'q': (1 + 1/n + t_mean**2 / Sxx, -2 * t_mean / Sxx, 1 / Sxx)
+        }
+    
+    def influence(self, df, target_date, origin):
+        """Levier, distance de Cook et effet du retrait de chaque ligne sur la prédiction."""
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        t0 = dates.offset(target_date, origin)
+        # Base de Vandermonde en t centré réduit (même espace de fonctions que polyfit)
+        shift, scale = t_arr.mean(), t_arr.std() or 1.0
+        X = np.vander((t_arr - shift) / scale, self.degree + 1)
+        x0 = np.vander([(t0 - shift) / scale], self.degree + 1)[0]
+        return ols_influence(X, y, x0)
+    
+    def _spread(self, t):
+        """Polynôme et écart-type de prédiction (terme d'extrapolation en (t - t_mean)²)."""
+        n = self.params['n']
+        t_mean = self.params['t_mean']
+        se = self.sigma * np.sqrt(1 + 1/n + (t - t_mean)**2 / self.params['Sxx'])
+        return self.poly_fit(t), se, self.dof
+    
     def get_grid_predictions(self, t_grid, origin):
         """Prédictions sur une grille de temps."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
-        
-        # Prédictions polynomiales
-        delay_central = self.poly_fit(t_grid)
-        
-        # Intervalle de prédiction
-        n = self.params['n']
-        t_arr = self.params['t_arr']
-        t_mean = t_arr.mean()
-        t_var = np.sum((t_arr - t_mean)**2)
+        date_grid = dates.date_grid(origin, t_grid)
         
-        se_g = self.sigma * np.sqrt(1 + 1/n + (t_grid - t_mean)**2 / t_var)
+        # Prédictions polynomiales et intervalle de prédiction
+        delay_central, se_g, _ = self._spread(t_grid)
         pi_lo = delay_central - self.tcrit * se_g
         pi_hi = delay_central + self.tcrit * se_g
         
@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class PrefixStats:
+    """Sommes cumulées de t^k et t^k·y permettant un fit sur n'importe quel segment en O(1).
+
+    Chaque entrée porte un effectif (1 pour une observation brute, ou le nombre
+    d'observations d'un jour agrégé) ainsi que les sommes de y et de y².
+    Les puissances de t sont calculées sur t recentré/réduit pour rester bien conditionnées.
+    """
+
+    def __init__(self, t, count, sum_y, sum_y2, degree=1):
+        self.t = np.asarray(t, dtype=float)
+        self.degree = degree
+        count = np.asarray(count, dtype=float)
+        sum_y = np.asarray(sum_y, dtype=float)
+        sum_y2 = np.asarray(sum_y2, dtype=float)
+
+        # Changement de variable u = (t - shift) / scale
+        if len(self.t):
+            t_min, t_max = self.t.min(), self.t.max()
+        else:
+            t_min = t_max = 0.0
+        self.shift = (t_min + t_max) / 2
+        self.scale = (t_max - t_min) / 2 or 1.0
+        u = (self.t - self.shift) / self.scale
+
+        powers = u[np.newaxis, :] ** np.arange(2 * degree + 1)[:, np.newaxis]
+        zero = np.zeros((2 * degree + 1, 1))
+        self.S = np.hstack([zero, np.cumsum(powers * count, axis=1)])
+        self.Sy = np.hstack([zero[:degree + 1], np.cumsum(powers[:degree + 1] * sum_y, axis=1)])
+        self.Syy = np.concatenate([[0.0], np.cumsum(sum_y2)])
+
+    @classmethod
+    def from_arrays(cls, t, y, degree=1):
+        """Construire depuis des observations individuelles (effectif 1 par ligne)."""
+        y = np.asarray(y, dtype=float)
+        return cls(t, np.ones(len(y)), y, y**2, degree=degree)
+
+    def __len__(self):
+        return len(self.t)
+
+    def count(self, i, j):
+        """Nombre d'observations dans les entrées [i, j)."""
+        return self.S[0, j] - self.S[0, i]
+
+    def linear(self, i, j):
+        """Fit linéaire LSQ sur les entrées [i, j), vectorisé sur i et j.
+
+        Returns:
+            dict avec keys: 'a', 'b' (en unités de t), 'sse', 'n', 't_mean', 'Sxx'
+        """
+        n = self.S[0, j] - self.S[0, i]
+        su = self.S[1, j] - self.S[1, i]
+        suu = self.S[2, j] - self.S[2, i]
+        sy = self.Sy[0, j] - self.Sy[0, i]
+        suy = self.Sy[1, j] - self.Sy[1, i]
+        syy = self.Syy[j] - self.Syy[i]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u_mean = su / n
+            y_mean = sy / n
+            Suu = np.maximum(suu - su * u_mean, 0.0)
+            Suy = suy - su * y_mean
+            Syy_c = np.maximum(syy - sy * y_mean, 0.0)
+            # Segment dégénéré (t constant) : pente nulle comme lstsq en norme minimale
+            flat = Suu <= 1e-12 * np.maximum(n, 1)
+            b_u = np.where(flat, 0.0, Suy / np.where(flat, 1.0, Suu))
+            sse = np.maximum(Syy_c - b_u * Suy, 0.0)
+
+        a_u = y_mean - b_u * u_mean
+        b = b_u / self.scale
+        a = a_u - b * self.shift
+        return {
+            'a': a,
+            'b': b,
+            'sse': sse,
+            'n': n,
+            't_mean': self.shift + self.scale * u_mean,
+            'Sxx': Suu * self.scale**2
+        }
+
+    def polynomial(self, i, j, degree=None):
+        """Fit polynomial LSQ (équations normales en u) sur les entrées [i, j).
+
+        Returns:
+            dict avec keys: 'poly' (np.poly1d en t), 'sse', 'n', 't_mean', 'Sxx'
+        """
+        degree = self.degree if degree is None else degree
+        if degree > self.degree:
+            raise ValueError(f"Degré {degree} > degré des statistiques ({self.degree})")
+
+        m = self.S[:, j] - self.S[:, i]
+        idx = np.arange(degree + 1)
+        G = m[idx[:, np.newaxis] + idx[np.newaxis, :]]
+        g = self.Sy[:degree + 1, j] - self.Sy[:degree + 1, i]
+        syy = self.Syy[j] - self.Syy[i]
+
+        coef_u = np.linalg.lstsq(G, g, rcond=None)[0]
+        sse = max(syy - 2 * coef_u @ g + coef_u @ G @ coef_u, 0.0)
+
+        # Composition p(u(t)) pour revenir en unités de t
+        u_of_t = np.poly1d([1 / self.scale, -self.shift / self.scale])
+        poly = np.poly1d(coef_u[::-1])(u_of_t)
+
+        n = m[0]
+        u_mean = m[1] / n
+        return {
+            'poly': poly,
+            'sse': sse,
+            'n': n,
+            't_mean': self.shift + self.scale * u_mean,
+            'Sxx': max(m[2] - m[1] * u_mean, 0.0) * self.scale**2
+        }
@@ -0,0 +1,169 @@
+"""
+Instrumentation : spans de temps (et pic mémoire optionnel) imbriqués
+Désactivée par défaut — un span inactif ne coûte qu'un test de booléen
+"""
+
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+
+_enabled = False
+_trace_memory = False
+_records = []
+_local = threading.local()
+_next_id = [0]
+
+
+def enable(memory=False):
+    """Activer le profiling (memory=True : pic mémoire via tracemalloc)."""
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Désactiver le profiling."""
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Vider les spans enregistrés."""
+    del _records[:]
+
+
+def records():
+    """Spans terminés, dans l'ordre de fin."""
+    return list(_records)
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _NoopSpan:
+    """Span inactif partagé (aucune allocation quand le profiling est désactivé)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """Mesure d'une section : durée, profondeur, parent et pic mémoire."""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = _stack()
+        _next_id[0] += 1
+        self.id = _next_id[0]
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        self.peak = 0
+        if _trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.mem_start = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _stack().pop()
+
+        record = OrderedDict([
+            ('id', self.id),
+            ('parent', self.parent.id if self.parent is not None else None),
+            ('depth', self.depth),
+            ('name', self.name),
+            ('duration_ms', duration * 1000),
+        ])
+        if _trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            record['peak_kb'] = max(self.peak - self.mem_start, 0) / 1024
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        record.update(self.attrs)
+        _records.append(record)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager de mesure ; no-op partagé si le profiling est désactivé."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, **attrs)
+
+
+def instrument(name):
+    """Décorateur : entourer une fonction d'un span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        wrapper.__wrapped_span__ = name
+        return wrapper
+    return decorator
+
+
+def write_jsonl(path):
+    """Écrire les spans au format JSON Lines (un span par ligne)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in _records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def summary_table():
+    """Tableau récapitulatif : appels, temps total/moyen et pic mémoire par span."""
+    rows = OrderedDict()
+    for record in sorted(_records, key=lambda r: r['id']):
+        key = (record['depth'], record['name'])
+        row = rows.setdefault(key, {'calls': 0, 'total': 0.0, 'peak_kb': None})
+        row['calls'] += 1
+        row['total'] += record['duration_ms']
+        if 'peak_kb' in record:
+            row['peak_kb'] = max(row['peak_kb'] or 0.0, record['peak_kb'])
+
+    lines = [f"{'Span':<52} {'Appels':>7} {'Total (ms)':>11} {'Moy. (ms)':>10} {'Pic (KB)':>10}"]
+    lines.append("-" * len(lines[0]))
+    for (depth, name), row in rows.items():
+        label = ("  " * depth + name)[:52]
+        peak = f"{row['peak_kb']:.1f}" if row['peak_kb'] is not None else "-"
+        lines.append(f"{label:<52} {row['calls']:>7} {row['total']:>11.2f} "
+                     f"{row['total'] / row['calls']:>10.3f} {peak:>10}")
+    return "\n".join(lines)
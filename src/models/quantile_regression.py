@@ -1,19 +1,45 @@
 import numpy as np
-import pandas as pd
 import math
-from .base import BaseModel
+from .base import BaseModel, interval_probs
+from . import dates
 
 
 class QuantileRegressionModel(BaseModel):
-    """Régression quantile pour intervalles de prédiction asymétriques."""
+    """Régression quantile pour intervalles de prédiction asymétriques.
     
-    def __init__(self, confidence_level=0.95):
+    Une droite est ajustée par quantile : médiane et bornes du niveau courant et de
+    chaque niveau de `fan_levels`. Les bornes d'un autre niveau sont interpolées entre
+    les droites voisines (coefficients linéaires en la probabilité), sans refit.
+    """
+    
+    _cache_attrs = ('fan_levels',)
+    
+    def __init__(self, confidence_level=0.95, fan_levels=(0.5, 0.8, 0.95)):
         super().__init__(confidence_level)
+        self.fan_levels = fan_levels
         self.coef_median = None
-        self.coef_lower = None
-        self.coef_upper = None
-        self.lower_q = (1 - confidence_level) / 2
-        self.upper_q = 1 - self.lower_q
+        self.quantiles = None  # probabilités ajustées, croissantes
+        self.coefs = None  # une ligne (a, b) par probabilité
+    
+    @property
+    def lower_q(self):
+        return interval_probs(self.confidence_level)[0]
+    
+    @property
+    def upper_q(self):
+        return interval_probs(self.confidence_level)[1]
+    
+    @property
+    def coef_lower(self):
+        return self._coef_at(self.lower_q)
+    
+    @property
+    def coef_upper(self):
+        return self._coef_at(self.upper_q)
+    
+    def _coef_at(self, q):
+        """Coefficients (a, b) au(x) quantile(s) q, interpolés entre quantiles ajustés."""
+        return np.array([np.interp(q, self.quantiles, self.coefs[:, k]) for k in range(2)])
     
     def _fit_quantile(self, x, y, q):
         """Fit régression quantile pour quantile q."""
@@ -45,26 +71,24 @@ class QuantileRegressionModel(BaseModel):
         t_arr = df["t"].to_numpy()
         y = df["delay_days"].to_numpy().astype(float)
         
-        # Fit trois quantiles
-        self.coef_median = self._fit_quantile(t_arr, y, 0.5)
-        self.coef_lower = self._fit_quantile(t_arr, y, self.lower_q)
-        self.coef_upper = self._fit_quantile(t_arr, y, self.upper_q)
+        # Médiane et bornes de chaque niveau (niveau courant compris)
+        lo, hi = interval_probs(np.append(self.fan_levels, self.confidence_level))
+        self.quantiles = np.unique(np.concatenate([lo, [0.5], hi]))
+        self.coefs = np.array([self._fit_quantile(t_arr, y, q) for q in self.quantiles])
+        self.coef_median = self._coef_at(0.5)
         
-        self.params['t_arr'] = t_arr
-        self.params['y'] = y
+        self._keep(t_arr=t_arr, y=y)
     
     def predict(self, target_date, origin):
         """Prédire pour une date CAA cible."""
-        t0 = float((target_date - origin).days)
+        t0 = dates.offset(target_date, origin)
         
         # Prédictions pour les trois quantiles
         pred_delay = self.coef_median[0] + self.coef_median[1] * t0
         lo_delay = self.coef_lower[0] + self.coef_lower[1] * t0
         hi_delay = self.coef_upper[0] + self.coef_upper[1] * t0
         
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
-        lo_cae = target_date + pd.to_timedelta(lo_delay, unit="D")
-        hi_cae = target_date + pd.to_timedelta(hi_delay, unit="D")
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -75,9 +99,25 @@ class QuantileRegressionModel(BaseModel):
             'hi_delay': hi_delay
         }
     
+    def _inverse_form(self, bound):
+        """Chaque quantile est une droite : inversion directe."""
+        coef = {'central': self.coef_median, 'lower': self.coef_lower, 'upper': self.coef_upper}[bound]
+        return {'a': coef[0], 'b': coef[1], 'c': 0.0, 'q': None}
+    
+    def _interval_curve(self, t, levels):
+        """Médiane et droites des quantiles de chaque niveau (niveaux × grille)."""
+        lo, hi = interval_probs(levels)
+        a_lo, b_lo = self._coef_at(lo)
+        a_hi, b_hi = self._coef_at(hi)
+        return {
+            'delay_central': self.coef_median[0] + self.coef_median[1] * t,
+            'pi_lo': a_lo[:, np.newaxis] + b_lo[:, np.newaxis] * t[np.newaxis, :],
+            'pi_hi': a_hi[:, np.newaxis] + b_hi[:, np.newaxis] * t[np.newaxis, :]
+        }
+    
     def get_grid_predictions(self, t_grid, origin):
         """Prédictions sur une grille de temps."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
+        date_grid = dates.date_grid(origin, t_grid)
         
         # Prédictions pour les trois quantiles
         delay_central = self.coef_median[0] + self.coef_median[1] * t_grid
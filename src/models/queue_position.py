@@ -0,0 +1,156 @@
+import numpy as np
+import scipy.stats as st
+from .base import BaseModel, QUANTILE_GRID, interval_probs
+from . import dates
+
+
+class QueuePositionModel(BaseModel):
+    """File FIFO par rang : un dossier sort au rang où il a été déposé.
+
+    Les jours CAA et CAE sont gardés triés. Une requête compte les dossiers déposés avant
+    elle (recherche dichotomique, O(log n)) : sur l'historique, sa CAE est la CAE du même
+    rang ; au-delà, les dépôts postérieurs aux données sont estimés au débit d'arrivée
+    récent et la file s'écoule au débit de traitement récent (`window` derniers jours).
+    Seules les CAE que l'échantillon couvre entièrement sont gardées : au-delà de la
+    dernière CAA + le plus court délai observé, des dossiers déposés après les données
+    manquent encore, ce qui sous-estimerait le débit de traitement et décalerait les rangs.
+    Les bornes viennent de la variabilité des débits entre fenêtres de `block` jours
+    (dispersion au-delà du bruit de Poisson, moyennée sur les fenêtres que dure l'attente,
+    loi log-normale) et des écarts observés à l'ordre FIFO. Vectorisé : O(q log n) pour q requêtes.
+    """
+
+    _cache_attrs = ('window', 'block')
+
+    def __init__(self, confidence_level=0.95, window=90, block=14):
+        super().__init__(confidence_level)
+        self.window = window
+        self.block = block
+        self.caa = None
+        self.cae = None
+
+    def _block_counts(self, days, end):
+        """Nombre d'évènements par fenêtre de `block` jours, sur les `window` jours avant end
+        (au plus la durée couverte par days)."""
+        n_blocks = max(int(min(self.window, end - days[0]) // self.block), 1)
+        edges = end - self.block * np.arange(n_blocks, -1, -1)
+        return np.diff(np.searchsorted(days, edges, side='right'))
+
+    def fit(self, df):
+        """Jours CAA et CAE triés (CAE couvertes), débits récents par fenêtre, écarts à l'ordre FIFO."""
+        caa = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        if len(caa) < 2:
+            raise ValueError("Au moins 2 observations sont nécessaires")
+        order = np.argsort(caa, kind='stable')
+        self.caa = caa[order]
+        cae = np.sort(caa + y)
+        covered = max(np.searchsorted(cae, self.caa[-1] + y.min(), side='right'), 2)
+        self.cae = cae[:covered]
+
+        # CAE observée - CAE du même rang (rangs couverts) : nulle si la file est strictement FIFO
+        gap = (caa + y)[order] - cae
+        self.params['resid_q'] = np.quantile(gap[:covered], QUANTILE_GRID)  # tous niveaux
+        # Débits journaliers (+0.5 évènement, a priori de Jeffreys : jamais nuls) et carré du
+        # coefficient de variation entre fenêtres, hors bruit de Poisson (variance - moyenne)
+        # Débit de traitement sur les CAE complètes des deux côtés (après la première CAA + le
+        # plus long délai) ; fenêtre plus courte qu'un bloc : file stationnaire (débit d'arrivée)
+        steady = self.cae[self.cae >= self.caa[0] + y.max()]
+        if len(steady) < 2 or steady[-1] - steady[0] < self.block:
+            steady = self.caa
+        for kind, days in (('arrival', self.caa), ('service', steady)):
+            counts = self._block_counts(days, days[-1])
+            events = counts.sum() + 0.5
+            mean = events / len(counts)
+            extra = np.var(counts, ddof=1) - counts.mean() if len(counts) > 1 else 0.0
+            self.params[f'{kind}_rate'] = events / (len(counts) * self.block)
+            self.params[f'{kind}_events'] = float(events)
+            self.params[f'{kind}_cv2'] = float(max(extra, 0.0) / mean**2)
+            self.params[f'{kind}_blocks'] = len(counts)
+        self.params['n'] = len(y)
+
+    def _rank(self, t):
+        """Dossiers de l'historique déposés avant t (moitié des dépôts du même jour)."""
+        return (np.searchsorted(self.caa, t, side='left') + np.searchsorted(self.caa, t, side='right')) / 2
+
+    def _delay(self, t, rank, arrival, service):
+        """Délai d'un dépôt en t (débits diffusables contre t, ex. probabilités × t)."""
+        n = len(self.cae)
+        rank = rank + arrival * np.maximum(t - self.caa[-1], 0.0)
+        done = np.interp(rank, np.arange(n), self.cae)
+        late = self.cae[-1] + (rank - (n - 1)) / service
+        return np.maximum(np.where(rank > n - 1, late, done), t) - t
+
+    def _log_var(self, kind, span):
+        """Variance du log du débit moyen sur `span` jours (t).
+
+        Variabilité d'une fenêtre, réduite par le nombre de fenêtres couvertes, plus
+        l'incertitude sur le débit moyen estimé (fenêtres et bruit de Poisson).
+        """
+        k = np.maximum(span / self.block, 1.0)
+        cv2 = self.params[f'{kind}_cv2']
+        return cv2 * (1 / k + 1 / self.params[f'{kind}_blocks']) + 1 / self.params[f'{kind}_events']
+
+    def _rate_quantiles(self, probs, t, central):
+        """Débits d'arrivée et de traitement (probabilités × t) pour les bornes.
+
+        L'attente au-delà des données est proportionnelle à arrivée / traitement : le
+        quantile z du log de ce rapport est réparti entre les deux débits au prorata de
+        leurs variances.
+        """
+        var_a = self._log_var('arrival', t - self.caa[-1])
+        var_s = self._log_var('service', t + central - self.cae[-1])
+        z = st.norm.ppf(probs)[:, np.newaxis] / np.sqrt(var_a + var_s)[np.newaxis, :]
+        return (self.params['arrival_rate'] * np.exp(z * var_a),
+                self.params['service_rate'] * np.exp(-z * var_s))
+
+    def _quantiles(self, t, probs):
+        """Délai central (t) et bornes (probabilités × t).
+
+        Borne de probabilité p : quantile p du rapport arrivée / traitement (voir
+        _rate_quantiles), plus le quantile p des écarts à l'ordre FIFO.
+        """
+        t = np.asarray(t, dtype=float)
+        probs = np.asarray(probs, dtype=float)
+        rank = self._rank(t)
+        central = self._delay(t, rank, self.params['arrival_rate'], self.params['service_rate'])
+
+        arrival, service = self._rate_quantiles(probs, t, central)
+        resid = np.interp(probs, QUANTILE_GRID, self.params['resid_q'])[:, np.newaxis]
+        bounds = self._delay(t, rank, arrival, service) + resid
+        low = (probs < 0.5)[:, np.newaxis]
+        bounds = np.where(low, np.minimum(bounds, central), np.maximum(bounds, central))
+        return central, bounds
+
+    def _interval_curve(self, t, levels):
+        """Tous les niveaux en un appel (mêmes recherches dichotomiques)."""
+        lo, hi = interval_probs(levels)
+        central, bounds = self._quantiles(t, np.concatenate([lo, hi]))
+        return {'delay_central': central, 'pi_lo': bounds[:len(lo)], 'pi_hi': bounds[len(lo):]}
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible."""
+        t0 = dates.offset(target_date, origin)
+        central, bounds = self._quantiles([t0], interval_probs(self.confidence_level))
+        pred_delay, lo_delay, hi_delay = float(central[0]), float(bounds[0, 0]), float(bounds[1, 0])
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        central, bounds = self._quantiles(t_grid, interval_probs(self.confidence_level))
+
+        return {
+            'delay_central': central,
+            'pi_lo': bounds[0],
+            'pi_hi': bounds[1],
+            'date_grid': date_grid
+        }
@@ -0,0 +1,191 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .base import BaseModel, QUANTILE_GRID, interval_probs
+from . import dates
+
+
+# Fenêtre minimale (jours) sur laquelle le débit de traitement est mesuré ; en deçà, la file
+# est supposée stationnaire (débit de traitement = débit d'arrivée)
+MIN_RATE_DAYS = 14
+
+
+def simulate_delays(targets, params, n_scenarios, seed, capacity_sd=0.1, max_horizon=1460, block=1000):
+    """Délais simulés (scénarios × cibles) d'une file FIFO, pour des CAA postérieures aux données.
+
+    Chaque scénario tire un débit d'arrivée et une capacité (lois a posteriori Gamma, capacité
+    perturbée par un facteur log-normal), puis des arrivées et traitements journaliers de
+    Poisson. La file suit la récurrence de Lindley, vectorisée par sommes cumulées :
+    Q_t = X_t - min(0, min_{u<=t} X_u) avec X = cumsum(arrivées - traitements).
+    Un dossier déposé le jour T sort le premier jour où tous ceux arrivés avant T sont traités
+    (au plus tôt T, et après la fin des dossiers connus). Calcul par blocs de scénarios.
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    last_caa, t_c = params['last_caa'], params['t_c']
+    lam_window, mu_window = params['lam_window'], params['mu_window']
+    rng = np.random.default_rng(seed)
+
+    # Horizon : arrivées jusqu'à la cible la plus tardive, puis écoulement de la file attendue
+    lam_hat = params['lam_shape'] / lam_window
+    mu_hat = params['mu_shape'] / mu_window
+    queued = lam_hat * (targets.max() - last_caa)
+    drain = 1.5 * queued / mu_hat + 30 if mu_hat > 0 else max_horizon
+    horizon = int(min(max(targets.max(), t_c + drain) - last_caa, targets.max() - last_caa + max_horizon))
+    days = last_caa + 1 + np.arange(horizon)
+    serving = days > t_c
+
+    out = np.empty((n_scenarios, len(targets)))
+    for start in range(0, n_scenarios, block):
+        n = min(block, n_scenarios - start)
+        lam = rng.gamma(params['lam_shape'], 1 / lam_window, n)
+        mu = rng.gamma(params['mu_shape'], 1 / mu_window, n) * rng.lognormal(-capacity_sd**2 / 2, capacity_sd, n)
+        a = rng.poisson(lam[:, np.newaxis], (n, horizon)).astype(np.int32)
+        s = rng.poisson(mu[:, np.newaxis], (n, horizon)).astype(np.int32) * serving
+
+        # Départs cumulés D = A - Q (croissants)
+        arrived = np.cumsum(a, axis=1)
+        x = arrived - np.cumsum(s, axis=1)
+        low = np.minimum(np.minimum.accumulate(x, axis=1), 0)
+        departed = (arrived - x + low).astype(np.int64)
+
+        # Dossiers arrivés avant T (hors données), puis premier jour où ils sont tous traités
+        j = targets - last_caa - 2
+        ahead = np.where(j >= 0, arrived[:, np.clip(j, 0, None)], 0).astype(np.int64)
+        stride = int(max(departed.max(initial=0), ahead.max(initial=0))) + 1
+        offset = (np.arange(n, dtype=np.int64) * stride)[:, np.newaxis]
+        idx = np.searchsorted((departed + offset).ravel(), (ahead + offset).ravel()).reshape(n, -1)
+        idx = idx - np.arange(n)[:, np.newaxis] * horizon
+        exit_day = np.where(idx < horizon, last_caa + 1 + idx, last_caa + horizon).astype(float)
+        exit_day = np.maximum(exit_day, np.maximum(targets, t_c + 1)[np.newaxis, :])
+        out[start:start + n] = exit_day - targets
+    return out
+
+
+class QueueSimulationModel(BaseModel):
+    """File d'attente FIFO simulée : débit des dépôts contre capacité de traitement.
+
+    Les débits journaliers (en unités de l'échantillon) sont estimés sur les `window` derniers
+    jours de CAA (arrivées) et de CAE complètes (traitements : CAE que l'échantillon couvre
+    entièrement, entre la première CAA + le plus long délai et la dernière CAA + le plus
+    court). La file simulée est servie à partir de la position de service courante : date
+    de sortie FIFO du dernier dossier connu, prolongée depuis la dernière CAE couverte au
+    débit de traitement (et non la CAE maximale, isolée). Pour une CAA postérieure aux données,
+    `n_scenarios` trajectoires Monte Carlo de la file sont simulées d'un bloc
+    (scénarios × jours), éventuellement réparties sur `n_jobs` processus ; le délai prédit
+    est la médiane de la distribution simulée, renvoyée dans `delay_samples`.
+    Sur l'historique, le délai observé (moyenne par jour, interpolée) est utilisé.
+    """
+
+    _cache_attrs = ('n_scenarios', 'window', 'capacity_sd', 'max_horizon', 'n_jobs', 'random_state')
+
+    def __init__(self, confidence_level=0.95, n_scenarios=2000, window=90, capacity_sd=0.1,
+                 max_horizon=1460, n_jobs=1, random_state=42):
+        super().__init__(confidence_level)
+        self.n_scenarios = n_scenarios
+        self.window = window
+        self.capacity_sd = capacity_sd
+        self.max_horizon = max_horizon
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, df):
+        """Débits d'arrivée et de traitement récents, position de service, délais observés par jour."""
+        caa = np.floor(df["t"].to_numpy().astype(float)).astype(np.int64)
+        y = df["delay_days"].to_numpy().astype(float)
+        if len(caa) < 2:
+            raise ValueError("Au moins 2 observations sont nécessaires")
+        cae = caa + np.floor(y).astype(np.int64)
+
+        last_caa = int(caa.max())
+        # Nombre d'évènements sur la fenêtre (+0.5, a priori de Jeffreys) -> loi Gamma du débit ;
+        # fenêtres limitées à la période observée
+        lam_window = min(self.window, last_caa - int(caa.min()) + 1)
+        lam_shape = np.sum(caa > last_caa - lam_window) + 0.5
+        start, end = int(caa.min() + y.max()), int(last_caa + y.min())
+        mu_window = min(self.window, end - start + 1)
+        if mu_window < MIN_RATE_DAYS:
+            mu_window, mu_shape = lam_window, lam_shape
+        else:
+            mu_shape = np.sum((cae > end - mu_window) & (cae <= end)) + 0.5
+
+        # FIFO : tous les dossiers connus sont traités une fois la file avancée de la dernière
+        # CAE couverte au rang du dernier dossier
+        covered = np.sort(cae[cae <= end])
+        t_c = int(np.ceil(covered[-1] + (len(cae) - len(covered)) * mu_window / mu_shape))
+        self.params['last_caa'] = last_caa
+        self.params['t_c'] = t_c
+        self.params['lam_window'] = lam_window
+        self.params['lam_shape'] = lam_shape
+        self.params['mu_window'] = mu_window
+        self.params['mu_shape'] = mu_shape
+
+        days, inverse = np.unique(caa, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        mean = np.bincount(inverse, weights=y) / np.bincount(inverse)
+        self.params['hist_t'] = days.astype(float)
+        self.params['hist_delay'] = mean
+        self.params['resid_q'] = np.quantile(y - mean[inverse], QUANTILE_GRID)  # tous niveaux
+        self.params['n'] = len(y)
+
+    def _simulate(self, targets):
+        """Délais simulés (scénarios × cibles), répartis sur n_jobs processus si demandé."""
+        seeds = np.random.SeedSequence(self.random_state).spawn(max(self.n_jobs, 1))
+        sizes = [len(c) for c in np.array_split(np.arange(self.n_scenarios), len(seeds))]
+        kwargs = {'capacity_sd': self.capacity_sd, 'max_horizon': self.max_horizon}
+        if len(seeds) == 1:
+            return simulate_delays(targets, self.params, sizes[0], seeds[0], **kwargs)
+        with ProcessPoolExecutor(max_workers=len(seeds)) as pool:
+            parts = [pool.submit(simulate_delays, targets, self.params, size, seed, **kwargs)
+                     for size, seed in zip(sizes, seeds)]
+            return np.vstack([p.result() for p in parts])
+
+    def _quantiles(self, t, probs):
+        """Délai central (t), quantiles (probabilités × t) et délais simulés (None sur l'historique)."""
+        t = np.floor(np.asarray(t, dtype=float)).astype(np.int64)
+        probs = np.asarray(probs, dtype=float)
+        central = np.interp(t, self.params['hist_t'], self.params['hist_delay'])
+        resid = np.interp(probs, QUANTILE_GRID, self.params['resid_q'])
+        bounds = central[np.newaxis, :] + resid[:, np.newaxis]
+
+        future = t > self.params['last_caa']
+        samples = None
+        if future.any():
+            samples = self._simulate(t[future])
+            q = np.quantile(samples, np.concatenate([[0.5], probs]), axis=0)
+            central[future] = q[0]
+            bounds[:, future] = q[1:]
+        return central, bounds, samples
+
+    def _interval_curve(self, t, levels):
+        """Une seule simulation pour tous les niveaux."""
+        lo, hi = interval_probs(levels)
+        central, bounds, _ = self._quantiles(t, np.concatenate([lo, hi]))
+        return {'delay_central': central, 'pi_lo': bounds[:len(lo)], 'pi_hi': bounds[len(lo):]}
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible (médiane et quantiles des délais simulés)."""
+        t0 = dates.offset(target_date, origin)
+        central, bounds, samples = self._quantiles([t0], interval_probs(self.confidence_level))
+        pred_delay, lo_delay, hi_delay = float(central[0]), float(bounds[0, 0]), float(bounds[1, 0])
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay,
+            'delay_samples': samples[:, 0] if samples is not None else np.array([pred_delay])
+        }
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps (une seule simulation pour tous les points futurs)."""
+        date_grid = dates.date_grid(origin, t_grid)
+        central, bounds, _ = self._quantiles(t_grid, interval_probs(self.confidence_level))
+
+        return {
+            'delay_central': central,
+            'pi_lo': bounds[0],
+            'pi_hi': bounds[1],
+            'date_grid': date_grid
+        }
@@ -0,0 +1,180 @@
+import numpy as np
+import math
+from .base import BaseModel, critical_values
+from . import dates
+
+
+class RecursiveLeastSquaresModel(BaseModel):
+    """Tendance linéaire délai ~ CAA par moindres carrés récursifs avec oubli exponentiel.
+
+    Chaque nouvelle observation met à jour l'estimation en O(1) sans conserver l'historique :
+    seules les statistiques pondérées XᵀWX (2×2), XᵀWy et yᵀWy, l'effectif effectif et le
+    dernier jour CAA sont gardés (forme information : sommes et produits par des poids
+    positifs, numériquement stables) ; coefficients, P et SSE en découlent. L'oubli porte
+    sur le temps écoulé, pas sur le nombre de lignes : le poids d'une observation déposée
+    k jours avant la plus récente est forgetting**k (les dépôts d'un même jour pèsent
+    autant). Tout est exprimé en x = (1, t - t_last) : niveau au dernier jour CAA `t_last`
+    et pente. L'a priori (variance `delta`) n'est pas oublié : P reste bornée par delta,
+    sans dépassement ni sous-dépassement pour un long historique.
+    """
+
+    _cache_attrs = ('forgetting', 'delta')
+
+    def __init__(self, confidence_level=0.95, forgetting=0.98, delta=1e6):
+        super().__init__(confidence_level)
+        self.forgetting = forgetting
+        self.delta = delta  # variance a priori des coefficients
+        self.info = None  # XᵀWX
+        self.xy = None  # XᵀWy
+        self.yy = 0.0  # yᵀWy
+        self.coef = None
+        self.P = None
+        self.sse = 0.0
+        self.n_eff = 0.0
+        self.n_obs = 0
+        self.t_last = None
+
+    def reset(self):
+        """Revenir à l'état a priori (aucune observation)."""
+        self.info = np.zeros((2, 2))
+        self.xy = np.zeros(2)
+        self.yy = 0.0
+        self.n_eff = 0.0
+        self.n_obs = 0
+        self.t_last = None
+        self._solve()
+
+    def _solve(self):
+        """Coefficients, P = (XᵀWX + I / delta)⁻¹ et SSE pondéré des données."""
+        self.P = np.linalg.inv(self.info + np.eye(2) / self.delta)
+        self.coef = self.P @ self.xy
+        self.sse = float(self.yy - 2 * self.coef @ self.xy + self.coef @ self.info @ self.coef)
+
+    def fit(self, df):
+        """Fit initial, équivalent à la suite des mises à jour, calculé en forme close.
+
+        L'estimation RLS est le LSQ pondéré par forgetting**(t_last - t_i), régularisé par
+        l'a priori (information I / delta).
+        """
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        lam = self.forgetting
+
+        self.t_last = float(t_arr.max())
+        w = lam ** (self.t_last - t_arr)
+        X = self._design(t_arr)
+        self.info = (X * w[:, np.newaxis]).T @ X
+        self.xy = X.T @ (w * y)
+        self.yy = float(np.sum(w * y**2))
+        self.n_eff = float(w.sum())
+        self.n_obs = len(t_arr)
+        self._solve()
+
+    def update(self, t, delay_days):
+        """Intégrer une observation (t en jours depuis l'origine) en O(1).
+
+        Le passé est escompté de forgetting**Δt (Δt : jours depuis la dernière CAA) ; une
+        observation antérieure à la dernière CAA entre avec le poids de son ancienneté.
+        """
+        if self.info is None:
+            self.reset()
+        lam = self.forgetting
+        t = float(t)
+        y = float(delay_days)
+        if self.t_last is None:
+            self.t_last = t
+        gap = max(t - self.t_last, 0.0)
+
+        # Recentrage sur le nouveau dernier jour (x' = x·S) et oubli du passé
+        if gap > 0:
+            discount = lam ** gap
+            shift = np.array([[1.0, -gap], [0.0, 1.0]])
+            self.info = discount * shift.T @ self.info @ shift
+            self.xy = discount * shift.T @ self.xy
+            self.yy *= discount
+            self.n_eff *= discount
+            self.t_last = t
+
+        weight = lam ** (self.t_last - t)
+        x = np.array([1.0, t - self.t_last])
+        self.info += weight * np.outer(x, x)
+        self.xy += weight * y * x
+        self.yy += weight * y**2
+        self.n_eff += weight
+        self.n_obs += 1
+        self._solve()
+
+    def _design(self, t):
+        """Lignes x = (1, t - t_last) pour des temps t (jours depuis l'origine)."""
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        return np.column_stack([np.ones(len(t)), t - self.t_last])
+
+    def _sigma_dof(self):
+        """Écart-type résiduel courant et degrés de liberté (effectif effectif - 2)."""
+        dof = max(self.n_eff - 2, 1)
+        return math.sqrt(max(self.sse, 0.0) / dof), dof
+
+    def _sigma_tcrit(self):
+        """Écart-type résiduel courant et valeur critique t au niveau courant."""
+        sigma, dof = self._sigma_dof()
+        return sigma, critical_values(self.confidence_level, dof)
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible."""
+        t0 = dates.offset(target_date, origin)
+        x = self._design(t0)[0]
+
+        pred_delay = float(x @ self.coef)
+
+        sigma, tcrit = self._sigma_tcrit()
+        se_pred = sigma * math.sqrt(1 + x @ self.P @ x)
+        lo_delay = pred_delay - tcrit * se_pred
+        hi_delay = pred_delay + tcrit * se_pred
+
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def _inverse_form(self, bound):
+        """Droite courante, intervalle en sqrt(1 + x'Px) avec x = (1, t - t_last), développés en t."""
+        sigma, tcrit = self._sigma_tcrit()
+        P, s = self.P, self.t_last
+        cross = P[0, 1] + P[1, 0]
+        return {
+            'a': self.coef[0] - self.coef[1] * s,
+            'b': self.coef[1],
+            'c': tcrit * sigma,
+            'q': (1 + P[0, 0] - cross * s + P[1, 1] * s**2, cross - 2 * P[1, 1] * s, P[1, 1])
+        }
+
+    def _spread(self, t):
+        """Droite courante et écart-type de prédiction sigma·sqrt(1 + x'Px)."""
+        X = self._design(t)
+        sigma, dof = self._sigma_dof()
+        return X @ self.coef, sigma * np.sqrt(1 + np.einsum('ij,jk,ik->i', X, self.P, X)), dof
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        X = self._design(t_grid)
+
+        delay_central = X @ self.coef
+
+        sigma, tcrit = self._sigma_tcrit()
+        se_grid = sigma * np.sqrt(1 + np.einsum('ij,jk,ik->i', X, self.P, X))
+        pi_lo = delay_central - tcrit * se_grid
+        pi_hi = delay_central + tcrit * se_grid
+
+        return {
+            'delay_central': delay_central,
+            'pi_lo': pi_lo,
+            'pi_hi': pi_hi,
+            'date_grid': date_grid
+        }
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import math
+from .piecewise_linear import PiecewiseLinearModel
+from .prefix_stats import PrefixStats
+from .profiling import span
+from . import dates
+
+
+def count_inversions(a):
+    """Nombre de paires i < j avec a[j] <= a[i] (a entiers dans [0, n)), vectorisé.
+
+    Tri fusion ascendant : à chaque niveau, les blocs gauches sont déjà triés et chaque
+    élément d'un bloc droit compte, par recherche dichotomique, les éléments du bloc
+    gauche voisin qui lui sont >=. La fusion est un tri stable de deux suites déjà triées.
+    """
+    n = len(a)
+    cur = np.asarray(a, dtype=np.int64)
+    idx = np.arange(n, dtype=np.int64)
+    total = 0
+    width = 1
+    while width < n:
+        block = idx // width
+        pair = block // 2
+        right = (block % 2) == 1
+        keys = pair * n + cur
+        left_keys = keys[~right]
+        pr = pair[right]
+        total += int(np.sum(np.searchsorted(left_keys, pr * n + n, side='left')
+                            - np.searchsorted(left_keys, keys[right], side='left')))
+        cur = np.sort(keys, kind='stable') % n
+        width *= 2
+    return total
+
+
+def _count_slopes_le(t, y, s, tie_pairs):
+    """Nombre de paires (t_i < t_j) de pente <= s.
+
+    pente_ij <= s  <=>  z_j <= z_i avec z = y - s·t : c'est un comptage d'inversions
+    sur z dans l'ordre des t. Les paires de même t (exclues) sont triées par z
+    décroissant, donc toutes comptées, puis retranchées.
+    """
+    z = y - s * t
+    order = np.lexsort((-z, t))
+    ranks = np.unique(z[order], return_inverse=True)[1].reshape(-1)
+    return count_inversions(ranks) - tie_pairs
+
+
+def theil_sen(t, y, tol=1e-7, n_sample=20000, random_state=0):
+    """Pente de Theil–Sen (médiane des pentes deux à deux) sans énumérer les O(n²) paires.
+
+    Un échantillon aléatoire de paires donne un encadrement étroit de la médiane,
+    affiné par interpolation sur les comptes ; chaque étape compte les pentes <= s en O(n log² n).
+    L'ordonnée à l'origine est la médiane de y - pente·t.
+
+    Returns:
+        (a, b) : ordonnée à l'origine et pente
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(t)
+    _, tie_counts = np.unique(t, return_counts=True)
+    tie_pairs = int(np.sum(tie_counts * (tie_counts - 1) // 2))
+    n_pairs = n * (n - 1) // 2 - tie_pairs
+    if n_pairs == 0:
+        return float(np.median(y)), 0.0
+    k = (n_pairs + 1) // 2  # rang de la médiane (basse)
+
+    # Encadrement par échantillonnage de paires
+    rng = np.random.default_rng(random_state)
+    i = rng.integers(0, n, n_sample)
+    j = rng.integers(0, n, n_sample)
+    keep = t[i] != t[j]
+    slopes = (y[j][keep] - y[i][keep]) / (t[j][keep] - t[i][keep])
+    if len(slopes) == 0:
+        slopes = np.array([0.0])
+    spread = 3 * math.sqrt(0.25 / len(slopes))
+    lo, hi = np.quantile(slopes, [max(0.5 - spread, 0.0), min(0.5 + spread, 1.0)])
+    width = max(hi - lo, 1e-6)
+    c_lo = _count_slopes_le(t, y, lo, tie_pairs)
+    while c_lo >= k:
+        lo -= width
+        width *= 2
+        c_lo = _count_slopes_le(t, y, lo, tie_pairs)
+    c_hi = _count_slopes_le(t, y, hi, tie_pairs)
+    while c_hi < k:
+        hi += width
+        width *= 2
+        c_hi = _count_slopes_le(t, y, hi, tie_pairs)
+
+    # Plus petite pente s telle que #{pentes <= s} >= k : interpolation sur les comptes
+    # (quasi linéaires près de la médiane), bornée à [10 %, 90 %] de l'encadrement
+    while hi - lo > tol * max(1.0, abs(hi)):
+        frac = min(max((k - c_lo) / (c_hi - c_lo), 0.1), 0.9)
+        mid = lo + frac * (hi - lo)
+        c_mid = _count_slopes_le(t, y, mid, tie_pairs)
+        if c_mid >= k:
+            hi, c_hi = mid, c_mid
+        else:
+            lo, c_lo = mid, c_mid
+    b = hi
+    return float(np.median(y - b * t)), float(b)
+
+
+def _mad_scale(residuals):
+    """Écart-type robuste (MAD normalisée)."""
+    return 1.4826 * float(np.median(np.abs(residuals - np.median(residuals))))
+
+
+class RobustPiecewiseLinearModel(PiecewiseLinearModel):
+    """Variante robuste de PiecewiseLinearModel (Theil–Sen ou Huber).
+
+    Le point de rupture est choisi par IRLS de Huber : à chaque itération, les poids des
+    observations aberrantes sont réduits et tout le balayage des ruptures est refait
+    en O(n) sur des sommes cumulées pondérées. Les segments sont ensuite estimés par
+    Theil–Sen (`method='theil_sen'`, défaut) ou conservés du fit de Huber (`'huber'`).
+    L'intervalle utilise un écart-type robuste (MAD) du segment final.
+    """
+
+    _cache_attrs = ('min_samples', 'method', 'huber_k', 'max_iter')
+
+    def __init__(self, confidence_level=0.95, min_samples=8, method='theil_sen',
+                 huber_k=1.345, max_iter=20):
+        super().__init__(confidence_level, min_samples)
+        self.method = method
+        self.huber_k = huber_k
+        self.max_iter = max_iter
+
+    def _residuals(self, t_arr, y):
+        coef = np.where(np.arange(len(t_arr))[:, np.newaxis] < self.breakpoint, self.c1, self.c2)
+        return y - coef[:, 0] - coef[:, 1] * t_arr
+
+    def _huber_weights(self, t_arr, y):
+        """Poids de Huber des résidus du fit courant (échelle MAD)."""
+        r = self._residuals(t_arr, y)
+        scale = _mad_scale(r) or 1.0
+        return np.minimum(1.0, self.huber_k * scale / np.maximum(np.abs(r), 1e-12))
+
+    def _weighted_fit(self, t_arr, y, w):
+        """Balayage des ruptures sur sommes cumulées pondérées (effectifs réels pour min_samples)."""
+        stats = PrefixStats(t_arr, w, w * y, w * y**2)
+        profile = self.sse_profile(stats)
+        profile['n1'] = profile['bps'].astype(float)
+        profile['n2'] = len(t_arr) - profile['n1']
+        profile['seg2'] = dict(profile['seg2'], n=profile['n2'])
+        self.fit_stats(stats, profile=profile)
+
+    def fit(self, df):
+        """IRLS de Huber pour la rupture, puis segments robustes."""
+        if self.method not in ('theil_sen', 'huber'):
+            raise ValueError(f"Méthode inconnue: {self.method}. Choix: ['theil_sen', 'huber']")
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+
+        w = np.ones(len(y))
+        self._weighted_fit(t_arr, y, w)
+        with span("huber_irls"):
+            for _ in range(self.max_iter):
+                w_new = self._huber_weights(t_arr, y)
+                previous = (self.breakpoint, self.c1, self.c2)
+                self._weighted_fit(t_arr, y, w_new)
+                w = w_new
+                if (self.breakpoint == previous[0] and np.allclose(self.c1, previous[1], rtol=1e-6)
+                        and np.allclose(self.c2, previous[2], rtol=1e-6)):
+                    break
+
+        bp = self.breakpoint
+        if self.method == 'theil_sen':
+            with span("theil_sen"):
+                self.c1 = np.array(theil_sen(t_arr[:bp], y[:bp]))
+                self.c2 = np.array(theil_sen(t_arr[bp:], y[bp:]))
+
+        # Intervalle : écart-type robuste et géométrie du segment final (effectifs réels)
+        t2 = t_arr[bp:]
+        n = len(t2)
+        self.sigma = _mad_scale(self._residuals(t_arr, y)[bp:])
+        self.dof = max(n - 2, 1)
+        self.params['n'] = n
+        self.params['x_mean'] = t2.mean()
+        self.params['Sxx'] = np.sum((t2 - t2.mean())**2)
+        self._keep(t_arr=t_arr, y=y, weights=w)
+        self.break_date = pd.Timestamp(dates.shift(dates.day_number(df["CAA"].min()), t_arr[bp]))
+
+    @property
+    def supports_influence(self):
+        """Forme close pour Huber seulement : elle ne décrit pas les segments de Theil–Sen."""
+        return self.method == 'huber'
+
+    def influence(self, df, target_date, origin):
+        """Influence par segment avec la matrice chapeau pondérée des poids de Huber finaux.
+
+        Moindres carrés pondérés à poids et rupture fixés : exact pour `method='huber'`
+        à la convergence de l'IRLS. Non disponible pour Theil–Sen.
+        """
+        if not self.supports_influence:
+            raise NotImplementedError("Influence en forme close non disponible pour method='theil_sen'")
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        return self._segment_influence(t_arr, y, dates.offset(target_date, origin),
+                                       self._huber_weights(t_arr, y))
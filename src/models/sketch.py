@@ -0,0 +1,113 @@
+"""
+Esquisse de quantiles fusionnable (t-digest) pour des intervalles empiriques en mémoire bornée
+Les valeurs sont résumées en centroïdes (moyenne, poids) ; l'échelle k = δ/2π·arcsin(2q - 1)
+limite la taille des centroïdes, d'autant plus petits que q est proche de 0 ou 1 : les
+queues de distribution restent précises. La compression est vectorisée (un tri, un
+bincount) et deux esquisses se fusionnent en concaténant puis recompressant leurs centroïdes
+"""
+
+import numpy as np
+
+
+class TDigest:
+    """t-digest : au plus ~compression/2 centroïdes, quelle que soit la taille du flux."""
+
+    def __init__(self, compression=200, means=None, weights=None, vmin=np.inf, vmax=-np.inf):
+        self.compression = compression
+        self.means = np.zeros(0) if means is None else np.asarray(means, dtype=float)
+        self.weights = np.zeros(0) if weights is None else np.asarray(weights, dtype=float)
+        self.min = float(vmin)
+        self.max = float(vmax)
+        self._buffer = []  # lots (valeurs, poids) en attente de compression
+        self._buffered = 0
+
+    def update(self, values, weights=None):
+        """Ajouter des valeurs (scalaire ou tableau), éventuellement pondérées ; renvoie self."""
+        values = np.atleast_1d(np.asarray(values, dtype=float)).ravel()
+        weights = np.ones(len(values)) if weights is None else np.broadcast_to(
+            np.asarray(weights, dtype=float), values.shape)
+        keep = np.isfinite(values) & (weights > 0)
+        if keep.any():
+            self._buffer.append((values[keep], weights[keep]))
+            self._buffered += int(keep.sum())
+            if self._buffered >= 5 * self.compression:
+                self._compress()
+        return self
+
+    def _compress(self):
+        """Fusionner centroïdes et valeurs en attente selon l'échelle k."""
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [v for v, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        self.min = min(self.min, means[0])
+        self.max = max(self.max, means[-1])
+
+        # Chaque centroïde couvre au plus une unité de k (au centre de son poids cumulé)
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        _, cluster = np.unique(np.floor(k), return_inverse=True)
+        cluster = cluster.reshape(-1)
+        self.weights = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=weights * means) / self.weights
+
+    @property
+    def count(self):
+        """Poids total résumé."""
+        return float(self.weights.sum()) + sum(float(w.sum()) for _, w in self._buffer)
+
+    def __len__(self):
+        """Nombre de centroïdes (mémoire occupée)."""
+        self._compress()
+        return len(self.means)
+
+    def quantile(self, q):
+        """Quantile(s) approché(s), interpolés entre centres des centroïdes (bornes exactes)."""
+        self._compress()
+        q = np.asarray(q, dtype=float)
+        if len(self.means) == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        mid = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[0.0], mid, [total]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.clip(q, 0, 1) * total, x, y)
+
+    def merge(self, other):
+        """Nouvelle esquisse résumant les deux flux."""
+        return TDigest.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, digests):
+        """Fusion d'esquisses (plis, morceaux de données ou processus) en une seule compression."""
+        digests = [d for d in digests if d is not None]
+        out = cls(max([d.compression for d in digests] or [200]))
+        for d in digests:
+            d._compress()
+            if len(d.means):
+                out._buffer.append((d.means, d.weights))
+                out.min = min(out.min, d.min)
+                out.max = max(out.max, d.max)
+        out._compress()
+        return out
+
+    def to_dict(self):
+        """Forme sérialisable (JSON)."""
+        self._compress()
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['compression'], data['means'], data['weights'], data['min'], data['max'])
@@ -0,0 +1,166 @@
+import numpy as np
+import scipy.stats as st
+from scipy.linalg import cho_factor, cho_solve, cholesky, solve_triangular
+from scipy.optimize import minimize
+from .base import BaseModel
+from . import dates
+
+
+class SparseGPModel(BaseModel):
+    """Processus gaussien parcimonieux (points d'induction, borne variationnelle VFE).
+
+    délai = tendance linéaire (MCO) + f(t) + bruit, f ~ GP(0, s²·exp(-(t-t')²/(2ℓ²))).
+    Les m points d'induction sont répartis uniformément sur la plage observée :
+    entraînement en O(n·m²), prédiction en O(m²) par point. Les hyperparamètres
+    (s², ℓ, σ²) maximisent la borne de Titsias, avec gradient analytique.
+    Loin des données, f revient à 0 et la variance prédictive remonte vers s² + σ².
+    """
+
+    _cache_attrs = ('n_inducing', 'jitter')
+
+    def __init__(self, confidence_level=0.95, n_inducing=30, jitter=1e-6):
+        super().__init__(confidence_level)
+        self.n_inducing = n_inducing
+        self.jitter = jitter
+        self.hyper = None  # (s², ℓ, σ²), ℓ en unités de t réduit
+        self.Z = None
+        self.trend = None
+
+    @staticmethod
+    def _kernel(a, b, s2, ell):
+        """Noyau gaussien et distances au carré réduites r²/ℓ² (pour le gradient en ℓ)."""
+        r2 = (a[:, np.newaxis] - b[np.newaxis, :])**2 / ell**2
+        return s2 * np.exp(-0.5 * r2), r2
+
+    def _factors(self, u, s2, ell, noise):
+        """Facteurs blanchis : K = L·Lᵀ, A = L⁻¹·K_mn/σ, B = I + A·Aᵀ (bien conditionnée)."""
+        m = len(self.Z)
+        K, r2_mm = self._kernel(self.Z, self.Z, s2, ell)
+        K = K + self.jitter * s2 * np.eye(m)
+        U, r2_mn = self._kernel(self.Z, u, s2, ell)
+        L = cholesky(K, lower=True)
+        A = solve_triangular(L, U, lower=True) / np.sqrt(noise)
+        B = np.eye(m) + A @ A.T
+        return K, U, r2_mm, r2_mn, L, A, B
+
+    def _bound(self, theta, u, y):
+        """Borne VFE (log-vraisemblance approchée) et gradient en theta = log(s², ℓ, σ²)."""
+        s2, ell, noise = np.exp(theta)
+        sigma = np.sqrt(noise)
+        n, m = len(u), len(self.Z)
+        K, U, r2_mm, r2_mn, L, A, B = self._factors(u, s2, ell, noise)
+
+        B_cho = cho_factor(B, lower=True)
+        B_inv = cho_solve(B_cho, np.eye(m))
+        Ay = A @ y
+        alpha = (y - A.T @ (B_inv @ Ay)) / noise  # Σ⁻¹y, Σ = Q_nn + σ²I
+        b = A @ alpha * sigma  # L⁻¹·K_mn·alpha
+        trace_AA = np.sum(A * A)
+        logdet = 2 * np.sum(np.log(np.diag(B_cho[0]))) + n * np.log(noise)
+        trace = (n * s2 - noise * trace_AA) / (2 * noise)
+        bound = -0.5 * (y @ alpha) - 0.5 * logdet - trace - 0.5 * n * np.log(2 * np.pi)
+
+        # Gradients en coordonnées blanchies : dF = Σ G̃∘(L⁻¹·dK_mn) + tr(H·L⁻¹·dK_mm·L⁻ᵀ)
+        G = np.outer(b, alpha) + (A - B_inv @ A) / sigma
+        H = -0.5 * np.outer(b, b) + 0.5 * (np.eye(m) - B_inv) - 0.5 * (A @ A.T)
+        g_noise = 0.5 * (alpha @ alpha) - 0.5 * (n - m + np.trace(B_inv)) / noise + trace / noise
+
+        def dot(dU, dK):
+            LdU = solve_triangular(L, dU, lower=True)
+            LdK = solve_triangular(L, solve_triangular(L, dK, lower=True).T, lower=True)
+            return np.sum(G * LdU) + np.sum(H * LdK)
+
+        # Règle de chaîne vers log s², log ℓ (dk/dlog s² = k, dk/dlog ℓ = k·r²/ℓ²)
+        grad = np.array([
+            dot(U, K) - n * s2 / (2 * noise),
+            dot(U * r2_mn, K * r2_mm),
+            g_noise * noise
+        ])
+        return bound, grad
+
+    def fit(self, df):
+        """Tendance linéaire, puis hyperparamètres du GP sur les résidus (gradient analytique)."""
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        if len(t_arr) < 3:
+            raise ValueError("Au moins 3 observations sont nécessaires")
+
+        shift = (t_arr.min() + t_arr.max()) / 2
+        scale = (t_arr.max() - t_arr.min()) / 2 or 1.0
+        u = (t_arr - shift) / scale
+        self.trend = np.polyfit(u, y, 1)
+        resid = y - np.polyval(self.trend, u)
+
+        m = min(self.n_inducing, len(np.unique(u)))
+        self.Z = np.linspace(u.min(), u.max(), m)
+
+        s2 = max(np.var(resid), 1e-3)
+        theta0 = np.log([s2, 0.3, s2 / 4])
+        bounds = [(np.log(s2) - 10, np.log(s2) + 5), (np.log(0.02), np.log(10.0)), (np.log(s2) - 12, np.log(s2) + 2)]
+
+        def objective(theta):
+            value, grad = self._bound(theta, u, resid)
+            return -value, -grad
+
+        result = minimize(objective, theta0, jac=True, method='L-BFGS-B', bounds=bounds)
+        s2, ell, noise = self.hyper = np.exp(result.x)
+
+        # Quantités de prédiction (m × m) : poids et réduction de variance blanchis
+        K, U, _, _, L, A, B = self._factors(u, s2, ell, noise)
+        B_cho = cho_factor(B, lower=True)
+        self.params['L'] = L
+        self.params['weights'] = cho_solve(B_cho, A @ resid) / np.sqrt(noise)
+        self.params['reduction'] = np.eye(m) - cho_solve(B_cho, np.eye(m))
+        self.params['shift'] = shift
+        self.params['scale'] = scale
+        self.params['n'] = len(y)
+        self.params['bound'] = -result.fun
+
+    def _posterior(self, t):
+        """Moyenne et variance prédictive d'une nouvelle observation (vectorisé, O(m²) par point)."""
+        s2, ell, noise = self.hyper
+        u = (np.asarray(t, dtype=float) - self.params['shift']) / self.params['scale']
+        V = solve_triangular(self.params['L'], self._kernel(self.Z, u, s2, ell)[0], lower=True)
+        mean = np.polyval(self.trend, u) + V.T @ self.params['weights']
+        var = s2 - np.einsum('ip,ij,jp->p', V, self.params['reduction'], V) + noise
+        return mean, np.maximum(var, noise)
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible."""
+        t0 = dates.offset(target_date, origin)
+        mean, var = self._posterior([t0])
+
+        pred_delay = float(mean[0])
+        z = st.norm.ppf(0.5 + self.confidence_level/2)
+        half = z * float(np.sqrt(var[0]))
+        lo_delay = pred_delay - half
+        hi_delay = pred_delay + half
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def _spread(self, t):
+        """Moyenne et écart-type prédictifs (loi normale)."""
+        mean, var = self._posterior(t)
+        return mean, np.sqrt(var), np.inf
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        mean, var = self._posterior(t_grid)
+        z = st.norm.ppf(0.5 + self.confidence_level/2)
+        half = z * np.sqrt(var)
+
+        return {
+            'delay_central': mean,
+            'pi_lo': mean - half,
+            'pi_hi': mean + half,
+            'date_grid': date_grid
+        }
@@ -1,9 +1,9 @@
 import numpy as np
-import pandas as pd
 from scipy.interpolate import CubicSpline
-from scipy import stats
 import math
 from .base import BaseModel
+from . import dates
+from .profiling import span
 
 
 class SplineCubicModel(BaseModel):
@@ -14,7 +14,7 @@ class SplineCubicModel(BaseModel):
         self.spline = None
         self.residuals = None
         self.sigma = None
-        self.tcrit = None
+        self.dof = None
     
     def fit(self, df):
         """Fit le modèle spline cubique."""
@@ -27,32 +27,37 @@ class SplineCubicModel(BaseModel):
                 t_arr[i] = t_arr[i-1] + 0.0001
         
         # Fit spline
-        self.spline = CubicSpline(t_arr, y, bc_type='not-a-knot')
+        with span("CubicSpline"):
+            self.spline = CubicSpline(t_arr, y, bc_type='not-a-knot')
         
         # Calcul des résidus pour l'intervalle de prédiction
         y_pred = self.spline(t_arr)
-        self.residuals = y - y_pred
+        residuals = y - y_pred
+        self.residuals = residuals if self.keep_data else None
         
         # Erreur standard
         n = len(t_arr)
         dof = n - 4  # 4 paramètres pour spline cubique
-        sigma2 = np.sum(self.residuals**2) / max(dof, 1)
+        sigma2 = np.sum(residuals**2) / max(dof, 1)
         self.sigma = math.sqrt(sigma2)
         
-        # Valeur critique t
-        self.tcrit = stats.t.ppf(0.5 + self.confidence_level/2, max(dof, 1))
+        self.dof = max(dof, 1)
         
-        self.params['t_arr'] = t_arr
-        self.params['y'] = y
+        # Extrapolation : seuls les 3 derniers points servent
+        self.params['t_max'] = max(t_arr)
+        self.params['t_tail'] = t_arr[-3:].copy()
+        self.params['y_tail'] = y[-3:].copy()
         self.params['n'] = n
+        self._keep(t_arr=t_arr, y=y)
     
     def predict(self, target_date, origin):
         """Prédire pour une date CAA cible."""
-        t0 = float((target_date - origin).days)
+        t0 = dates.offset(target_date, origin)
         
         # Prédiction ponctuelle
-        t_max = max(self.params['t_arr'])
-        y_arr = self.params['y']
+        t_max = self.params['t_max']
+        t_tail = self.params['t_tail']
+        y_arr = self.params['y_tail']
         
         if t0 <= t_max:
             # Interpolation : utiliser la spline
@@ -60,14 +65,14 @@ class SplineCubicModel(BaseModel):
                 pred_delay = float(self.spline(t0))
                 # Vérifier si le résultat est raisonnable
                 if abs(pred_delay) > 1000:  # Valeur déraisonnable
-                    slope = np.mean(np.diff(y_arr[-3:]) / np.diff(np.diff(self.params['t_arr'][-3:])))
+                    slope = np.mean(np.diff(y_arr[-3:]) / np.diff(np.diff(t_tail)))
                     pred_delay = y_arr[-1] + slope * (t0 - t_max)
             except:
                 pred_delay = y_arr[-1]
         else:
             # Extrapolation linéaire simple (pente des 3 derniers points)
             diff_y = np.diff(y_arr[-3:])
-            diff_t = np.diff(self.params['t_arr'][-3:])
+            diff_t = np.diff(t_tail)
             if len(diff_t) > 0 and np.sum(diff_t) > 0:
                 slope = np.mean(diff_y / diff_t)
             else:
@@ -77,15 +82,12 @@ class SplineCubicModel(BaseModel):
         # Limiter les valeurs extrêmes
         pred_delay = np.clip(pred_delay, -30, 500)
         
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
-        
         # Intervalle de prédiction (simplifié)
         se_pred = self.sigma * math.sqrt(1 + 1/self.params['n'])
         lo_delay = np.clip(pred_delay - self.tcrit * se_pred, -30, 500)
         hi_delay = np.clip(pred_delay + self.tcrit * se_pred, -30, 500)
         
-        lo_cae = target_date + pd.to_timedelta(lo_delay, unit="D")
-        hi_cae = target_date + pd.to_timedelta(hi_delay, unit="D")
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -96,9 +98,22 @@ class SplineCubicModel(BaseModel):
             'hi_delay': hi_delay
         }
     
+    def _spread(self, t):
+        """Spline (bornée) et écart-type de prédiction constant."""
+        delay_central = np.clip(self.spline(t), -30, 500)
+        se = np.full(len(delay_central), self.sigma * math.sqrt(1 + 1/self.params['n']))
+        return delay_central, se, self.dof
+    
+    def _interval_curve(self, t, levels):
+        """Bornes limitées comme celles de get_grid_predictions."""
+        curve = super()._interval_curve(t, levels)
+        curve['pi_lo'] = np.clip(curve['pi_lo'], -30, 500)
+        curve['pi_hi'] = np.clip(curve['pi_hi'], -30, 500)
+        return curve
+    
     def get_grid_predictions(self, t_grid, origin):
         """Prédictions sur une grille de temps."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
+        date_grid = dates.date_grid(origin, t_grid)
         
         # Interpoation spline
         delay_central = self.spline(t_grid)
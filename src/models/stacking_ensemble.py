@@ -1,24 +1,34 @@
+import math
 import numpy as np
-import pandas as pd
 from .base import BaseModel
+from .influence import combine
+from . import dates
 
 
 class StackingEnsembleModel(BaseModel):
-    """Stacking : méta-modèle qui combine prédictions de plusieurs modèles."""
+    """Stacking : méta-modèle qui combine prédictions de plusieurs modèles.
     
-    def __init__(self, confidence_level=0.95):
+    `members` choisit les membres parmi model_classes (défaut : piecewise, spline, quantile).
+    """
+    
+    _cache_attrs = ('members',)
+    
+    def __init__(self, confidence_level=0.95, members=None):
         super().__init__(confidence_level)
+        self.members = list(members or ('piecewise_linear', 'spline_cubic', 'quantile_regression'))
         self.base_models = {}
         self.meta_model = None
         
         from .piecewise_linear import PiecewiseLinearModel
         from .spline_cubic import SplineCubicModel
         from .quantile_regression import QuantileRegressionModel
+        from .queue_position import QueuePositionModel
         
         self.model_classes = {
             'piecewise_linear': PiecewiseLinearModel,
             'spline_cubic': SplineCubicModel,
-            'quantile_regression': QuantileRegressionModel
+            'quantile_regression': QuantileRegressionModel,
+            'queue_position': QueuePositionModel
         }
     
     def _fit_linear_meta(self, X, y):
@@ -27,11 +37,15 @@ class StackingEnsembleModel(BaseModel):
         coef = np.linalg.lstsq(A, y, rcond=None)[0]
         return coef
     
+    def _members(self):
+        return self.base_models.values()
+    
     def fit(self, df):
         """Entraîner tous les modèles et méta-modèle."""
         # Entraîner tous les modèles de base
-        for name, cls in self.model_classes.items():
-            model = cls(self.confidence_level)
+        for name in self.members:
+            model = self.model_classes[name](self.confidence_level)
+            model.keep_data = self.keep_data
             if name == 'piecewise_linear':
                 model.min_samples = 8
             model.fit(df)
@@ -61,33 +75,24 @@ class StackingEnsembleModel(BaseModel):
         # Fit méta-modèle
         self.meta_model = self._fit_linear_meta(X_meta, y_true)
         
-        self.params['y_train'] = y_true
-        self.params['t_train'] = t_arr
+        self._keep(y_train=y_true, t_train=t_arr)
     
     def predict(self, target_date, origin):
         """Prédiction final via méta-modèle."""
-        t0 = float((target_date - origin).days)
-        
-        # Prédictions des base models
-        base_preds = []
-        for name, model in self.base_models.items():
-            pred = model.predict(target_date, origin)
-            base_preds.append(pred['pred_delay'])
+        # Prédictions des base models (une seule fois : délai central et intervalle)
+        intervals = [model.predict(target_date, origin) for model in self.base_models.values()]
+        base_preds = [p['pred_delay'] for p in intervals]
         
         # Méta-prédiction
         X = np.array(base_preds)
         meta_features = np.concatenate([[1], X])  # Bias + features
         pred_delay = np.dot(self.meta_model, meta_features)
         
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
-        
-        # Intervalle = moyenne des modèles
-        intervals = [model.predict(target_date, origin) for model in self.base_models.values()]
-        lo_cae = min(p['lo_cae'] for p in intervals)
-        hi_cae = max(p['hi_cae'] for p in intervals)
+        # Intervalle = enveloppe des modèles (en jours entiers, comme les dates CAE)
+        lo_delay = math.floor(min(p['lo_delay'] for p in intervals))
+        hi_delay = math.floor(max(p['hi_delay'] for p in intervals))
         
-        lo_delay = (lo_cae - target_date).days
-        hi_delay = (hi_cae - target_date).days
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -99,28 +104,36 @@ class StackingEnsembleModel(BaseModel):
         }
     
     def get_grid_predictions(self, t_grid, origin):
-        """Grille de prédictions via stacking."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
-        
-        # Prédictions des base models sur la grille
-        grid_preds = []
-        for name, model in self.base_models.items():
-            grid = model.get_grid_predictions(t_grid, origin)
-            grid_preds.append(grid['delay_central'])
+        """Grille de prédictions via stacking (bornes : enveloppe des intervalles des modèles de base)."""
+        date_grid = dates.date_grid(origin, t_grid)
+        curve = self._interval_curve(np.asarray(t_grid, dtype=float), np.array([self.confidence_level]))
         
-        # Application du méta-modèle
-        grid_preds = np.array(grid_preds)
+        return {
+            'delay_central': curve['delay_central'],
+            'pi_lo': curve['pi_lo'][0],
+            'pi_hi': curve['pi_hi'][0],
+            'date_grid': date_grid
+        }
+    
+    @property
+    def supports_influence(self):
+        return any(model.supports_influence for model in self.base_models.values())
+    
+    def influence(self, df, target_date, origin):
+        """Influence des modèles de base à travers les coefficients du méta-modèle (fixés)."""
+        weights = dict(zip(self.base_models, self.meta_model[1:]))
+        return combine(self.base_models, weights, df, target_date, origin)
+    
+    def _interval_curve(self, t, levels):
+        """Méta-prédiction ; bornes = enveloppe des intervalles des modèles de base à chaque niveau."""
+        curves = [model._interval_curve(t, levels) for model in self.base_models.values()]
+        grid_preds = np.array([c['delay_central'] for c in curves])
         delay_central = self.meta_model[0] + np.sum(
             self.meta_model[1:, np.newaxis] * grid_preds, axis=0
         )
         
-        # Intervalle conservateur
-        pi_lo = np.min(grid_preds, axis=0) - 30
-        pi_hi = np.max(grid_preds, axis=0) + 30
-        
         return {
             'delay_central': delay_central,
-            'pi_lo': pi_lo,
-            'pi_hi': pi_hi,
-            'date_grid': date_grid
+            'pi_lo': np.min([c['pi_lo'] for c in curves], axis=0),
+            'pi_hi': np.max([c['pi_hi'] for c in curves], axis=0)
         }
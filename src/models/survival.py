@@ -0,0 +1,236 @@
+import numpy as np
+import scipy.stats as st
+from scipy.optimize import minimize
+from scipy.special import ndtri
+from .base import BaseModel, QUANTILE_GRID, interval_probs
+from . import dates
+
+
+def kaplan_meier_strata(strata, time, event):
+    """Kaplan–Meier vectorisé par strate, en O(n log n) (un tri lexicographique).
+
+    Aux temps égaux, les évènements précèdent les censures (convention usuelle).
+
+    Returns:
+        dict avec keys: 'strata', 'start', 'stop' (bornes des strates dans les tableaux
+        par temps distinct), 'time', 'survival', 'n_at_risk', 'n_events'
+    """
+    order = np.lexsort((time, strata))
+    s, tm, ev = strata[order], time[order], event[order]
+    n = len(s)
+
+    # Temps distincts par strate
+    new_key = np.ones(n, dtype=bool)
+    new_key[1:] = (s[1:] != s[:-1]) | (tm[1:] != tm[:-1])
+    key_start = np.flatnonzero(new_key)
+    d = np.add.reduceat(ev.astype(float), key_start)
+    key_strata = s[key_start]
+
+    # Effectif à risque : lignes de la strate non encore sorties
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = s[1:] != s[:-1]
+    group_start = np.flatnonzero(new_group)
+    group_end = np.append(group_start[1:], n)
+    group_of_key = np.searchsorted(group_start, key_start, side='right') - 1
+    at_risk = (group_end[group_of_key] - key_start).astype(float)
+
+    # Produit de Kaplan–Meier cumulé par strate (somme de logs remise à zéro par strate)
+    # Pas bornés : une strate entièrement sortie (S = 0) ne contamine pas la suivante
+    with np.errstate(divide='ignore'):
+        log_step = np.maximum(np.log1p(-d / at_risk), -1e3)
+    cum = np.cumsum(log_step)
+    key_group_start = np.flatnonzero(np.r_[True, key_strata[1:] != key_strata[:-1]])
+    offset = np.r_[0.0, cum][key_group_start]
+    survival = np.exp(cum - np.repeat(offset, np.diff(np.r_[key_group_start, len(key_start)])))
+
+    return {
+        'strata': key_strata[key_group_start],
+        'start': key_group_start,
+        'stop': np.r_[key_group_start[1:], len(key_start)],
+        'time': tm[key_start],
+        'survival': survival,
+        'n_at_risk': at_risk,
+        'n_events': d
+    }
+
+
+def km_quantiles(km, probs):
+    """Quantiles du délai par strate (strates × probabilités) : premier temps où S(t) <= 1 - p.
+
+    Une seule recherche dichotomique pour toutes les strates et probabilités : -S croît dans
+    chaque strate, et un décalage de 2 par strate rend les clés croissantes globalement.
+    Si la courbe ne descend pas jusque-là (censure), le dernier temps observé est renvoyé.
+    """
+    probs = np.asarray(probs, dtype=float)
+    n_strata = len(km['strata'])
+    group = np.repeat(np.arange(n_strata), km['stop'] - km['start'])
+    keys = 2.0 * group - km['survival']
+    goal = 2.0 * np.arange(n_strata)[:, np.newaxis] - (1 - probs[np.newaxis, :] + 1e-12)
+    first = np.searchsorted(keys, goal.ravel()).reshape(goal.shape)
+    stop = km['stop'][:, np.newaxis]
+    return km['time'][np.where(first < stop, first, stop - 1)]
+
+
+def _interp_columns(grid, table, probs):
+    """Interpoler chaque ligne de `table` (colonnes aux probabilités `grid`) en `probs`."""
+    j = np.clip(np.searchsorted(grid, probs), 1, len(grid) - 1)
+    w = np.clip((probs - grid[j - 1]) / (grid[j] - grid[j - 1]), 0, 1)
+    return table[:, j - 1] * (1 - w) + table[:, j] * w
+
+
+class SurvivalModel(BaseModel):
+    """Modèle de survie : les demandes sans CAE sont des observations censurées à droite.
+
+    - Kaplan–Meier vectorisé par période de CAA (`period_days`) : quantiles empiriques
+      du délai, sans biais vers les délais courts.
+    - Optionnellement (`parametric` = 'weibull' ou 'lognormal', défaut 'weibull') :
+      log(délai) = b0 + b1·t + sigma·W, ajusté par maximum de vraisemblance censurée
+      avec gradient analytique ; c'est lui qui extrapole vers la date cible.
+    Avec `parametric=None`, la prédiction utilise la strate Kaplan–Meier la plus proche.
+
+    La colonne `event` (1 = CAE connue, 0 = en attente, cf. `load_data(keep_pending=True)`)
+    est optionnelle : sans elle, toutes les observations sont complètes.
+    """
+
+    _cache_attrs = ('period_days', 'parametric')
+
+    def __init__(self, confidence_level=0.95, period_days=14, parametric='weibull'):
+        super().__init__(confidence_level)
+        self.period_days = period_days
+        self.parametric = parametric
+        self.km = None
+        self.km_table = None
+        self.coef = None  # (b0, b1) sur t réduit, log(sigma)
+
+    def _probs(self):
+        alpha = 1 - self.confidence_level
+        return np.array([0.5, alpha / 2, 1 - alpha / 2])
+
+    def _neg_loglik(self, theta, u, log_y, event):
+        """Opposé de la log-vraisemblance censurée (échelle log) et son gradient."""
+        b0, b1, log_sigma = theta
+        sigma = np.exp(log_sigma)
+        z = (log_y - b0 - b1 * u) / sigma
+
+        if self.parametric == 'weibull':
+            # Valeur extrême (minimum) : log f = z - e^z - log sigma, log S = -e^z
+            ez = np.exp(z)
+            loglik = np.sum(event * (z - log_sigma) - ez)
+            dz = event - ez
+        else:
+            # Log-normale : log f = log phi(z) - log sigma, log S = log(1 - Phi(z))
+            log_sf = st.norm.logsf(z)
+            loglik = np.sum(np.where(event, st.norm.logpdf(z) - log_sigma, log_sf))
+            hazard = np.exp(st.norm.logpdf(z) - log_sf)
+            dz = np.where(event, -z, -hazard)
+
+        grad = np.array([
+            -np.sum(dz) / sigma,
+            -np.sum(dz * u) / sigma,
+            -np.sum(dz * z) - np.sum(event)
+        ])
+        return -loglik, -grad
+
+    def fit(self, df):
+        """Kaplan–Meier stratifié, puis (optionnel) fit paramétrique censuré."""
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        try:
+            event = df["event"].to_numpy().astype(float)
+        except KeyError:
+            event = np.ones(len(y))
+        if event.sum() < 2:
+            raise ValueError("Au moins 2 délais complets sont nécessaires")
+
+        strata = np.floor(t_arr / self.period_days).astype(np.int64)
+        self.km = kaplan_meier_strata(strata, y, event)
+        # Quantiles tabulés à toutes les probabilités : intervalles à tout niveau sans refit
+        probs = np.union1d(QUANTILE_GRID, self._probs())
+        self.km_table = {
+            'stratum': self.km['strata'],
+            't_start': self.km['strata'] * float(self.period_days),
+            'probs': probs,
+            'quantiles': km_quantiles(self.km, probs),
+        }
+
+        if self.parametric is not None:
+            if self.parametric not in ('weibull', 'lognormal'):
+                raise ValueError(f"Loi inconnue: {self.parametric}. Choix: ['weibull', 'lognormal']")
+            shift = (t_arr.min() + t_arr.max()) / 2
+            scale = (t_arr.max() - t_arr.min()) / 2 or 1.0
+            u = (t_arr - shift) / scale
+            log_y = np.log(np.maximum(y, 0.5))
+
+            # Départ : moindres carrés sur les délais complets
+            done = event > 0
+            b1, b0 = np.polyfit(u[done], log_y[done], 1) if done.sum() > 2 else (0.0, log_y[done].mean())
+            resid = log_y[done] - b0 - b1 * u[done]
+            theta0 = np.array([b0, b1, np.log(max(resid.std(), 1e-3))])
+
+            result = minimize(self._neg_loglik, theta0, args=(u, log_y, event), jac=True, method='L-BFGS-B')
+            self.coef = result.x
+            self.params['shift'] = shift
+            self.params['scale'] = scale
+            self.params['loglik'] = -result.fun
+
+        self.params['n'] = len(y)
+        self.params['n_pending'] = int(len(y) - event.sum())
+        if not self.keep_data:
+            self.km = None  # courbes complètes : seule la table des quantiles sert à prédire
+
+    def _quantiles(self, t, probs=None):
+        """Quantiles du délai en chaque t (n × probabilités), vectorisé.
+
+        Par défaut : médiane, borne basse et haute au niveau courant.
+        """
+        t = np.asarray(t, dtype=float)
+        probs = self._probs() if probs is None else np.asarray(probs, dtype=float)
+        if self.parametric is None:
+            stratum = np.floor(t / self.period_days)
+            idx = np.clip(np.searchsorted(self.km_table['stratum'], stratum), 0, len(self.km_table['stratum']) - 1)
+            left = np.clip(idx - 1, 0, None)
+            closer = np.abs(self.km_table['stratum'][left] - stratum) < np.abs(self.km_table['stratum'][idx] - stratum)
+            idx = np.where(closer, left, idx)
+            return _interp_columns(self.km_table['probs'], self.km_table['quantiles'][idx], probs)
+
+        b0, b1, log_sigma = self.coef
+        u = (t - self.params['shift']) / self.params['scale']
+        if self.parametric == 'weibull':
+            w = np.log(-np.log1p(-probs))
+        else:
+            w = ndtri(probs)
+        return np.exp(b0 + b1 * u[:, np.newaxis] + np.exp(log_sigma) * w[np.newaxis, :])
+
+    def _interval_curve(self, t, levels):
+        """Médiane et quantiles des bornes de chaque niveau, en un seul calcul."""
+        lo, hi = interval_probs(levels)
+        q = self._quantiles(t, np.concatenate([[0.5], lo, hi]))
+        k = len(lo)
+        return {'delay_central': q[:, 0], 'pi_lo': q[:, 1:k + 1].T, 'pi_hi': q[:, k + 1:].T}
+
+    def predict(self, target_date, origin):
+        """Prédire pour une date CAA cible (médiane et quantiles du délai)."""
+        t0 = dates.offset(target_date, origin)
+        pred_delay, lo_delay, hi_delay = (float(x) for x in self._quantiles([t0])[0])
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
+
+        return {
+            'pred_delay': pred_delay,
+            'pred_cae': pred_cae,
+            'lo_cae': lo_cae,
+            'hi_cae': hi_cae,
+            'lo_delay': lo_delay,
+            'hi_delay': hi_delay
+        }
+
+    def get_grid_predictions(self, t_grid, origin):
+        """Prédictions sur une grille de temps."""
+        date_grid = dates.date_grid(origin, t_grid)
+        q = self._quantiles(t_grid)
+
+        return {
+            'delay_central': q[:, 0],
+            'pi_lo': q[:, 1],
+            'pi_hi': q[:, 2],
+            'date_grid': date_grid
+        }
@@ -1,65 +1,166 @@
 import numpy as np
-import pandas as pd
-from .base import BaseModel
+from .base import BaseModel, QUANTILE_GRID, interval_probs
+from .influence import combine
+from . import dates
+
+
+def project_simplex(V):
+    """Projection euclidienne de chaque ligne de V sur le simplexe {w >= 0, sum(w) = 1}."""
+    V = np.atleast_2d(V)
+    U = -np.sort(-V, axis=1)
+    css = np.cumsum(U, axis=1) - 1
+    k = np.arange(1, V.shape[1] + 1)
+    rho = np.count_nonzero(U - css / k > 0, axis=1)
+    theta = css[np.arange(len(V)), rho - 1] / rho
+    return np.maximum(V - theta[:, np.newaxis], 0)
+
+
+def simplex_least_squares(P, y, max_iter=5000, tol=1e-10):
+    """min ||P w - y||² sous w >= 0, sum(w) = 1 (gradient projeté accéléré).
+    
+    Seuls PᵀP et Pᵀy (m × m et m) sont utilisés pendant les itérations.
+    """
+    G = P.T @ P
+    b = P.T @ y
+    step = 1 / max(np.linalg.eigvalsh(G)[-1], 1e-12)
+    
+    m = G.shape[0]
+    w = np.full(m, 1 / m)
+    z, t = w.copy(), 1.0
+    for _ in range(max_iter):
+        w_next = project_simplex(z - step * (G @ z - b))[0]
+        t_next = (1 + np.sqrt(1 + 4 * t**2)) / 2
+        z = w_next + (t - 1) / t_next * (w_next - w)
+        if np.max(np.abs(w_next - w)) < tol:
+            w = w_next
+            break
+        w, t = w_next, t_next
+    return w
 
 
 class VotingEnsembleModel(BaseModel):
-    """Ensemble voting : moyenne pondérée de plusieurs modèles."""
+    """Ensemble voting : moyenne pondérée de plusieurs modèles.
+    
+    Avec learn_weights=True, les poids sont appris sur une matrice de prédictions
+    hors échantillon (plis ordonnés dans le temps) et l'intervalle provient des
+    quantiles des résidus pondérés hors échantillon ; sinon, les bornes sont la moyenne
+    pondérée de celles des membres. predict, la grille et les intervalles multi-niveaux
+    viennent tous de `_interval_curve`.
+    `members` choisit les membres parmi model_classes (défaut : piecewise, spline, quantile ;
+    'queue_position' est un membre peu coûteux).
+    """
+    
+    _cache_attrs = ('weights', 'members', 'min_samples', 'learn_weights', 'n_folds', 'min_train')
     
-    def __init__(self, confidence_level=0.95, weights=None):
+    def __init__(self, confidence_level=0.95, weights=None, min_samples=8,
+                 learn_weights=False, n_folds=4, min_train=20, members=None):
         super().__init__(confidence_level)
         self.models = {}
-        self.weights = weights or {'piecewise_linear': 0.4, 'spline_cubic': 0.3, 'quantile_regression': 0.3}
+        self.min_samples = min_samples
+        self.learn_weights = learn_weights
+        self.n_folds = n_folds
+        self.min_train = min_train
+        self.members = list(members or ('piecewise_linear', 'spline_cubic', 'quantile_regression'))
+        self.weights = weights or {'piecewise_linear': 0.4, 'spline_cubic': 0.3, 'quantile_regression': 0.3,
+                                   'queue_position': 0.2}
         # Import local pour éviter dépendances circulaires
         from .piecewise_linear import PiecewiseLinearModel
         from .spline_cubic import SplineCubicModel
         from .quantile_regression import QuantileRegressionModel
+        from .queue_position import QueuePositionModel
         
         self.model_classes = {
             'piecewise_linear': PiecewiseLinearModel,
             'spline_cubic': SplineCubicModel,
-            'quantile_regression': QuantileRegressionModel
+            'quantile_regression': QuantileRegressionModel,
+            'queue_position': QueuePositionModel
         }
     
+    def _make_model(self, name):
+        model = self.model_classes[name](self.confidence_level)
+        model.keep_data = self.keep_data
+        if name == 'piecewise_linear':
+            model.min_samples = self.min_samples
+        return model
+    
+    def _members(self):
+        return self.models.values()
+    
+    def _member_weights(self):
+        """Poids des membres ajustés, normalisés à 1 (1/membres pour un membre sans poids)."""
+        weights = {name: self.weights.get(name, 1/len(self.models)) for name in self.models}
+        total_weight = sum(weights.values())
+        return {name: w / total_weight for name, w in weights.items()}
+    
     def fit(self, df):
         """Entraîner tous les modèles."""
-        for name, cls in self.model_classes.items():
-            model = cls(self.confidence_level)
-            if name == 'piecewise_linear':
-                model.min_samples = 8
+        self.params.pop('residual_quantiles', None)
+        if self.learn_weights:
+            self._learn_weights(df)
+        
+        for name in self.members:
+            model = self._make_model(name)
             model.fit(df)
             self.models[name] = model
         
         self.params['origin'] = None
     
-    def predict(self, target_date, origin):
-        """Prédictions pondérées de tous les modèles."""
-        predictions_delay = []
-        predictions_cae = []
-        predictions_lo = []
-        predictions_hi = []
+    def holdout_matrix(self, df):
+        """Prédictions hors échantillon (n × membres) sur des plis ordonnés dans le temps.
         
-        total_weight = 0
-        for name, model in self.models.items():
-            pred = model.predict(target_date, origin)
-            w = self.weights.get(name, 1/len(self.models))
-            
-            predictions_delay.append(pred['pred_delay'] * w)
-            predictions_cae.append(pred['pred_cae'])
-            predictions_lo.append(pred['lo_cae'])
-            predictions_hi.append(pred['hi_cae'])
-            total_weight += w
+        Chaque pli entraîne les membres sur les observations antérieures et prédit le bloc suivant.
+        """
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        origin = df["CAA"].min()
+        edges = np.linspace(min(self.min_train, len(df) - 1), len(df), self.n_folds + 1).astype(int)
         
-        # Moyenne pondérée du délai
-        pred_delay = sum(predictions_delay) / total_weight
-        pred_cae = target_date + pd.to_timedelta(pred_delay, unit="D")
+        blocks, rows = [], []
+        for start, stop in zip(edges[:-1], edges[1:]):
+            if stop <= start:
+                continue
+            preds = []
+            for name in self.members:
+                model = self._make_model(name)
+                try:
+                    model.fit(df.head(start))
+                except ValueError:
+                    break
+                preds.append(model.get_grid_predictions(t_arr[start:stop], origin)['delay_central'])
+            else:
+                blocks.append(np.column_stack(preds))
+                rows.append(np.arange(start, stop))
         
-        # Intervalle = moyenne des extrêmes
-        lo_cae = min(predictions_lo)
-        hi_cae = max(predictions_hi)
+        if not blocks:
+            raise ValueError("Pas assez d'observations pour apprendre les poids du voting")
+        rows = np.concatenate(rows)
+        return np.vstack(blocks), y[rows]
+    
+    def _learn_weights(self, df):
+        """Poids optimaux sur le simplexe et quantiles des résidus pondérés hors échantillon."""
+        P, y = self.holdout_matrix(df)
+        w = simplex_least_squares(P, y)
+        self.weights = {name: float(x) for name, x in zip(self.members, w)}
+        
+        residuals = y - P @ w
+        self.params['residual_quantiles'] = np.quantile(residuals, QUANTILE_GRID)  # tous niveaux
+        self.params['holdout_mae'] = float(np.mean(np.abs(residuals)))
+    
+    def _residual_bounds(self, levels):
+        """Quantiles des résidus hors échantillon des bornes de chaque niveau."""
+        lo, hi = interval_probs(levels)
+        table = self.params['residual_quantiles']
+        return np.interp(lo, QUANTILE_GRID, table), np.interp(hi, QUANTILE_GRID, table)
+    
+    def predict(self, target_date, origin):
+        """Prédictions pondérées de tous les modèles (bornes de `_interval_curve` à la date cible)."""
+        t0 = dates.offset(target_date, origin)
+        curve = self._interval_curve(np.array([t0]), np.array([self.confidence_level]))
+        pred_delay = float(curve['delay_central'][0])
+        lo_delay = float(curve['pi_lo'][0, 0])
+        hi_delay = float(curve['pi_hi'][0, 0])
         
-        lo_delay = (lo_cae - target_date).days
-        hi_delay = (hi_cae - target_date).days
+        pred_cae, lo_cae, hi_cae = dates.cae_dates(target_date, (pred_delay, lo_delay, hi_delay))
         
         return {
             'pred_delay': pred_delay,
@@ -71,24 +172,44 @@ class VotingEnsembleModel(BaseModel):
         }
     
     def get_grid_predictions(self, t_grid, origin):
-        """Grille de prédictions pondérées."""
-        date_grid = origin + pd.to_timedelta(t_grid, unit="D")
+        """Grille de prédictions pondérées (bornes de `_interval_curve` au niveau courant)."""
+        date_grid = dates.date_grid(origin, t_grid)
+        curve = self._interval_curve(np.asarray(t_grid, dtype=float), np.array([self.confidence_level]))
         
-        delay_central = np.zeros_like(t_grid, dtype=float)
-        pi_lo = np.zeros_like(t_grid, dtype=float)
-        pi_hi = np.zeros_like(t_grid, dtype=float)
+        return {
+            'delay_central': curve['delay_central'],
+            'pi_lo': curve['pi_lo'][0],
+            'pi_hi': curve['pi_hi'][0],
+            'date_grid': date_grid
+        }
+    
+    @property
+    def supports_influence(self):
+        return any(model.supports_influence for model in self.models.values())
+    
+    def influence(self, df, target_date, origin):
+        """Influence via les membres qui en fournissent une, pondérée comme predict (poids fixés)."""
+        return combine(self.models, self._member_weights(), df, target_date, origin)
+    
+    def _interval_curve(self, t, levels):
+        """Bornes de chaque niveau : pondération des intervalles des membres (un appel chacun),
+        ou quantiles des résidus hors échantillon si les poids ont été appris."""
+        delay_central = np.zeros(len(t))
+        pi_lo = np.zeros((len(levels), len(t)))
+        pi_hi = np.zeros((len(levels), len(t)))
         
+        weights = self._member_weights()
         for name, model in self.models.items():
-            grid_pred = model.get_grid_predictions(t_grid, origin)
-            w = self.weights.get(name, 1/len(self.models))
+            curve = model._interval_curve(t, levels)
+            w = weights[name]
             
-            delay_central += grid_pred['delay_central'] * w
-            pi_lo += grid_pred['pi_lo'] * w
-            pi_hi += grid_pred['pi_hi'] * w
+            delay_central += curve['delay_central'] * w
+            pi_lo += curve['pi_lo'] * w
+            pi_hi += curve['pi_hi'] * w
         
-        return {
-            'delay_central': delay_central,
-            'pi_lo': pi_lo,
-            'pi_hi': pi_hi,
-            'date_grid': date_grid
-        }
+        if 'residual_quantiles' in self.params:
+            q_lo, q_hi = self._residual_bounds(levels)
+            pi_lo = delay_central[np.newaxis, :] + q_lo[:, np.newaxis]
+            pi_hi = delay_central[np.newaxis, :] + q_hi[:, np.newaxis]
+        
+        return {'delay_central': delay_central, 'pi_lo': pi_lo, 'pi_hi': pi_hi}
@@ -0,0 +1,208 @@
+"""
+Stockage des résultats de prédiction dans une base SQLite locale
+Tables indexées : runs, models, targets, intervals, data_hashes
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import data_hash
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS data_hashes (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    n_obs INTEGER NOT NULL,
+    caa_min TEXT NOT NULL,
+    caa_max TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS targets (
+    id INTEGER PRIMARY KEY,
+    target_date TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    model_id INTEGER NOT NULL REFERENCES models(id),
+    data_hash_id INTEGER NOT NULL REFERENCES data_hashes(id),
+    confidence_level REAL NOT NULL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    target_id INTEGER NOT NULL REFERENCES targets(id),
+    pred_delay REAL NOT NULL,
+    lo_delay REAL NOT NULL,
+    hi_delay REAL NOT NULL,
+    pred_cae TEXT NOT NULL,
+    lo_cae TEXT NOT NULL,
+    hi_cae TEXT NOT NULL,
+    PRIMARY KEY (run_id, target_id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_model_created ON runs(model_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_data_hash ON runs(data_hash_id);
+CREATE INDEX IF NOT EXISTS idx_intervals_target_run ON intervals(target_id, run_id);
+"""
+
+# Requête commune : une ligne par (run, cible) avec toutes les métadonnées
+_SELECT = """
+SELECT r.id AS run_id, r.created_at, m.name AS model, r.confidence_level,
+       d.hash AS data_hash, d.n_obs, d.caa_min, d.caa_max,
+       t.target_date, i.pred_delay, i.lo_delay, i.hi_delay,
+       i.pred_cae, i.lo_cae, i.hi_cae
+FROM intervals i
+JOIN runs r ON r.id = i.run_id
+JOIN models m ON m.id = r.model_id
+JOIN data_hashes d ON d.id = r.data_hash_id
+JOIN targets t ON t.id = i.target_id
+"""
+
+
+def _iso(date):
+    """Date au format ISO (YYYY-MM-DD)."""
+    return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+class ResultsStore:
+    """Base SQLite des prédictions (insertion par lots, requêtes d'historique)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _get_or_create(self, table, column, value, extra=None):
+        """Identifiant d'une ligne de référence (modèle, cible, empreinte), créée si absente."""
+        row = self.conn.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()
+        if row is not None:
+            return row['id']
+        columns = [column] + list((extra or {}).keys())
+        values = [value] + list((extra or {}).values())
+        placeholders = ", ".join("?" * len(columns))
+        cur = self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+        return cur.lastrowid
+
+    def _target_ids(self, dates, chunk=500):
+        """Identifiants des cibles, par paquets de requêtes IN (...)."""
+        ids = {}
+        for i in range(0, len(dates), chunk):
+            part = dates[i:i + chunk]
+            placeholders = ", ".join("?" * len(part))
+            ids.update(self.conn.execute(
+                f"SELECT target_date, id FROM targets WHERE target_date IN ({placeholders})",
+                part).fetchall())
+        return ids
+
+    def _create_run(self, model_name, config, df):
+        model_id = self._get_or_create('models', 'name', model_name)
+        hash_id = self._get_or_create('data_hashes', 'hash', data_hash(df), {
+            'n_obs': len(df),
+            'caa_min': _iso(df['CAA'].min()),
+            'caa_max': _iso(df['CAA'].max()),
+        })
+        cur = self.conn.execute(
+            "INSERT INTO runs (created_at, model_id, data_hash_id, confidence_level, config) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (datetime.now().isoformat(timespec='microseconds'), model_id, hash_id,
+             float(config.get('confidence_level', 0.95)), json.dumps(config, sort_keys=True)))
+        return cur.lastrowid
+
+    def record_run(self, model_name, config, df, target, prediction):
+        """Enregistrer une prédiction unique. Retourne l'identifiant du run."""
+        return self.record_batch(model_name, config, df, [target], [prediction])
+
+    def record_batch(self, model_name, config, df, targets, predictions):
+        """Enregistrer un lot de prédictions en une seule transaction.
+
+        Args:
+            targets: séquence de dates CAA cibles
+            predictions: liste de dicts `predict`, ou dict de tableaux
+                'pred_delay', 'lo_delay', 'hi_delay' alignés sur targets
+        """
+        targets = pd.DatetimeIndex(targets)
+        if isinstance(predictions, dict):
+            pred_delay = np.asarray(predictions['pred_delay'], dtype=float)
+            lo_delay = np.asarray(predictions['lo_delay'], dtype=float)
+            hi_delay = np.asarray(predictions['hi_delay'], dtype=float)
+        else:
+            pred_delay = np.array([p['pred_delay'] for p in predictions], dtype=float)
+            lo_delay = np.array([p['lo_delay'] for p in predictions], dtype=float)
+            hi_delay = np.array([p['hi_delay'] for p in predictions], dtype=float)
+
+        target_iso = targets.strftime('%Y-%m-%d')
+        cae_iso = [(targets + pd.to_timedelta(d, unit="D")).strftime('%Y-%m-%d')
+                   for d in (pred_delay, lo_delay, hi_delay)]
+
+        with self.conn:
+            run_id = self._create_run(model_name, config, df)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO targets (target_date) VALUES (?)",
+                ((d,) for d in np.unique(target_iso)))
+            target_ids = self._target_ids(np.unique(target_iso).tolist())
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO intervals (run_id, target_id, pred_delay, lo_delay, hi_delay, "
+                "pred_cae, lo_cae, hi_cae) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([run_id] * len(targets), [target_ids[d] for d in target_iso],
+                    pred_delay.tolist(), lo_delay.tolist(), hi_delay.tolist(), *cae_iso))
+        return run_id
+
+    def get_prediction(self, run_id, target_date=None):
+        """Ligne stockée (dict) pour un run, éventuellement restreinte à une cible."""
+        query = _SELECT + " WHERE i.run_id = ?"
+        params = [run_id]
+        if target_date is not None:
+            query += " AND t.target_date = ?"
+            params.append(_iso(target_date))
+        row = self.conn.execute(query + " ORDER BY t.target_date LIMIT 1", params).fetchone()
+        return dict(row) if row is not None else None
+
+    def latest_per_model(self, target_date):
+        """Dernière prédiction de chaque modèle pour une date CAA cible."""
+        query = _SELECT + """
+        WHERE t.target_date = ? AND r.id = (
+            SELECT MAX(r2.id) FROM runs r2
+            JOIN intervals i2 ON i2.run_id = r2.id
+            WHERE r2.model_id = r.model_id AND i2.target_id = t.id
+        )
+        ORDER BY m.name
+        """
+        return pd.read_sql_query(query, self.conn, params=[_iso(target_date)])
+
+    def drift(self, target_date, model_name=None):
+        """Évolution de l'estimation pour une cible au fil des runs (écart au premier run)."""
+        query = _SELECT + " WHERE t.target_date = ?"
+        params = [_iso(target_date)]
+        if model_name is not None:
+            query += " AND m.name = ?"
+            params.append(model_name)
+        history = pd.read_sql_query(query + " ORDER BY m.name, r.id", self.conn, params=params)
+        history['drift_days'] = (history['pred_delay']
+                                 - history.groupby('model')['pred_delay'].transform('first'))
+        return history
@@ -0,0 +1,130 @@
+"""
+Jeu de données en mémoire partagée pour le fit multi-processus
+Tableaux contigus (t, délai, jour CAA) partagés sans copie entre processus
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+# En-tête : nombre d'observations (int64), puis les colonnes les unes après les autres
+_HEADER = 8
+_COLUMNS = (('t', np.float64), ('delay_days', np.float64), ('caa_days', np.int64))
+
+
+def _attach(name):
+    """Ouvrir un segment existant sans l'enregistrer pour destruction à la sortie du processus."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedDataset:
+    """Observations (t, delay_days, jours CAA) dans un segment `multiprocessing.shared_memory`.
+
+    Se comporte comme le DataFrame de `load_data` pour les modèles : `ds["t"]`,
+    `ds["delay_days"]` et `ds["CAA"]` renvoient des Series, `len(ds)` et `ds.head(n)`
+    sont disponibles. Sérialisé (pickle) sous la forme du seul nom du segment : un worker
+    s'y rattache et lit les mêmes pages mémoire, sans copie.
+
+    Le processus créateur est propriétaire du segment et le libère à `close()`.
+    """
+
+    def __init__(self, shm, stop=None, owner=False):
+        self._shm = shm
+        self._owner = owner
+        n = int(np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0])
+        self.n_total = n
+        self.stop = n if stop is None else min(int(stop), n)
+
+        offset = _HEADER
+        self._arrays = {}
+        for column, dtype in _COLUMNS:
+            arr = np.ndarray((n,), dtype=dtype, buffer=shm.buf, offset=offset)
+            self._arrays[column] = arr[:self.stop]
+            offset += n * np.dtype(dtype).itemsize
+        self.origin = pd.Timestamp(np.datetime64(int(self._arrays['caa_days'].min()), 'D')) if self.stop else None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Copier une fois le DataFrame de `load_data` dans un nouveau segment."""
+        n = len(df)
+        size = _HEADER + n * sum(np.dtype(dtype).itemsize for _, dtype in _COLUMNS)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0] = n
+
+        values = {
+            't': df["t"].to_numpy(dtype=float),
+            'delay_days': df["delay_days"].to_numpy(dtype=float),
+            'caa_days': df["CAA"].to_numpy().astype('datetime64[D]').astype(np.int64),
+        }
+        offset = _HEADER
+        for column, dtype in _COLUMNS:
+            np.ndarray((n,), dtype=dtype, buffer=shm.buf, offset=offset)[:] = values[column]
+            offset += n * np.dtype(dtype).itemsize
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name, stop=None):
+        """Se rattacher à un segment existant par son nom."""
+        return cls(_attach(name), stop=stop)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __reduce__(self):
+        return (SharedDataset.attach, (self.name, self.stop))
+
+    def __len__(self):
+        return self.stop
+
+    @property
+    def columns(self):
+        """Colonnes lisibles par `ds[...]`, comme `DataFrame.columns`."""
+        return ['CAA', 't', 'delay_days']
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def __getitem__(self, column):
+        if column == 'CAA':
+            return pd.Series(self._arrays['caa_days'].astype('datetime64[D]').astype('datetime64[s]'),
+                             name='CAA')
+        return pd.Series(self._arrays[column], name=column, copy=False)
+
+    def array(self, column):
+        """Vue numpy (lecture seule) sur une colonne."""
+        view = self._arrays[column].view()
+        view.flags.writeable = False
+        return view
+
+    def head(self, n):
+        """Vue sur les n premières observations (même segment, aucune copie)."""
+        return SharedDataset(self._shm, stop=min(max(int(n), 0), self.stop))
+
+    def to_frame(self):
+        """DataFrame équivalent à celui de `load_data` (copie)."""
+        return pd.DataFrame({'CAA': self['CAA'], 't': self.array('t').copy(),
+                             'delay_days': self.array('delay_days').copy()})
+
+    def close(self):
+        """Détacher le segment ; le créateur le détruit."""
+        self._arrays = {}
+        try:
+            self._shm.close()
+        except BufferError:  # vues encore référencées : libérées avec elles
+            pass
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,269 @@
+"""
+Recherche d'hyperparamètres — breakpoint_min_samples, polynomial_degree et poids du voting
+Validation ordonnée dans le temps, calculs partagés entre tous les points de la grille
+"""
+
+import os
+import sys
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, src_dir)
+
+from utils import load_config, load_data
+from models import PiecewiseLinearModel, PolynomialRegressionModel, SplineCubicModel, QuantileRegressionModel
+from models.prefix_stats import PrefixStats
+from shared_dataset import SharedDataset
+
+
+VOTING_MEMBERS = ('piecewise_linear', 'spline_cubic', 'quantile_regression')
+
+
+def simplex_grid(step=0.1, members=VOTING_MEMBERS):
+    """Toutes les combinaisons de poids (pas `step`) positifs ou nuls de somme 1."""
+    k = int(round(1 / step))
+    weights = []
+    for combo in itertools.product(range(k + 1), repeat=len(members) - 1):
+        if sum(combo) <= k:
+            w = list(combo) + [k - sum(combo)]
+            weights.append({name: round(x / k, 6) for name, x in zip(members, w)})
+    return weights
+
+
+def _member_grid(name, confidence_level, df_train, t_val):
+    """Worker : fit d'un membre non linéaire du voting et prédictions de validation.
+
+    `df_train` est un DataFrame ou une vue `SharedDataset` (rattachée par nom, sans copie).
+    """
+    model = {'spline_cubic': SplineCubicModel,
+             'quantile_regression': QuantileRegressionModel}[name](confidence_level)
+    model.fit(df_train)
+    grid = model.get_grid_predictions(t_val, df_train["CAA"].min())
+    return grid['delay_central'], grid['pi_lo'], grid['pi_hi']
+
+
+def _scores(y, central, lo, hi):
+    """MAE et couverture, vectorisés sur les colonnes (un point de la grille par colonne)."""
+    y = y[:, np.newaxis]
+    mae = np.abs(central - y).mean(axis=0)
+    coverage = ((y >= lo) & (y <= hi)).mean(axis=0)
+    return mae, coverage
+
+
+class SweepRunner:
+    """Évalue un espace de recherche sur des plis ordonnés dans le temps.
+
+    Chaque pli entraîne sur les observations antérieures à une coupure et valide
+    sur le bloc suivant. Par pli :
+    - un seul profil SSE piecewise répond à toutes les valeurs de min_samples ;
+    - une seule QR de la matrice de Vandermonde répond à tous les degrés ;
+    - les membres non linéaires du voting sont ajustés une fois (pool de processus),
+      puis tous les vecteurs de poids sont évalués par un produit matriciel.
+    """
+
+    def __init__(self, space, confidence_level=0.95, n_folds=4, min_train=20, n_jobs=None,
+                 search='grid', n_points=None, random_state=None):
+        self.space = space
+        self.confidence_level = confidence_level
+        self.n_folds = n_folds
+        self.min_train = min_train
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.search = search
+        self.n_points = n_points
+        self.random_state = random_state
+
+    def _points(self):
+        """Points à évaluer : (modèle, paramètres) — grille complète ou tirage aléatoire."""
+        min_samples = list(self.space.get('breakpoint_min_samples', [8]))
+        degrees = list(self.space.get('polynomial_degree', []))
+        weights = list(self.space.get('voting_weights', []))
+
+        points = [('piecewise_linear', {'breakpoint_min_samples': m}) for m in min_samples]
+        points += [('polynomial_regression', {'polynomial_degree': d}) for d in degrees]
+        points += [('voting_ensemble', {'breakpoint_min_samples': m, 'voting_weights': w})
+                   for m in min_samples for w in weights]
+
+        if self.search == 'random' and self.n_points is not None and self.n_points < len(points):
+            rng = np.random.default_rng(self.random_state)
+            idx = np.sort(rng.choice(len(points), size=self.n_points, replace=False))
+            points = [points[i] for i in idx]
+        return points
+
+    def folds(self, n):
+        """Coupures ordonnées : (début validation, fin validation) pour chaque pli."""
+        edges = np.linspace(self.min_train, n, self.n_folds + 1).astype(int)
+        return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    def run(self, df):
+        """Lancer la recherche. Retourne le tableau classé (meilleur MAE en tête)."""
+        points = self._points()
+        t_arr = df["t"].to_numpy().astype(float)
+        y = df["delay_days"].to_numpy().astype(float)
+        origin = df["CAA"].min()
+        folds = self.folds(len(df))
+
+        min_samples = sorted({p['breakpoint_min_samples'] for _, p in points if 'breakpoint_min_samples' in p})
+        degrees = sorted({p['polynomial_degree'] for _, p in points if 'polynomial_degree' in p})
+        weight_points = [p for name, p in points if name == 'voting_ensemble']
+        stats = PrefixStats.from_arrays(t_arr, y, degree=1)
+
+        # Membres non linéaires du voting : un fit par pli, répartis sur le pool
+        member_preds = {}
+        if weight_points:
+            tasks = [(name, k) for k in range(len(folds)) for name in VOTING_MEMBERS[1:]]
+            if self.n_jobs == 1:
+                results = [_member_grid(name, self.confidence_level, df.iloc[:folds[k][0]],
+                                        t_arr[folds[k][0]:folds[k][1]]) for name, k in tasks]
+            else:
+                with SharedDataset.from_frame(df) as data, \
+                        ProcessPoolExecutor(max_workers=min(self.n_jobs, len(tasks))) as pool:
+                    args = [(name, self.confidence_level, data.head(folds[k][0]),
+                             t_arr[folds[k][0]:folds[k][1]]) for name, k in tasks]
+                    results = list(pool.map(_member_grid, *zip(*args)))
+            member_preds = dict(zip(tasks, results))
+
+        # Accumulateurs (somme des erreurs absolues, observations couvertes) par point
+        totals = {}
+
+        def accumulate(key, mae, coverage, n_val):
+            acc = totals.setdefault(key, [0.0, 0.0, 0])
+            acc[0] += mae * n_val
+            acc[1] += coverage * n_val
+            acc[2] += n_val
+
+        for k, (start, stop) in enumerate(folds):
+            t_val, y_val = t_arr[start:stop], y[start:stop]
+            n_val = stop - start
+
+            # Piecewise : un profil SSE pour toutes les valeurs de min_samples
+            piecewise = {}
+            if min_samples:
+                profile = PiecewiseLinearModel().sse_profile(stats, start)
+                for m in min_samples:
+                    model = PiecewiseLinearModel(self.confidence_level, min_samples=m)
+                    try:
+                        model.fit_stats(stats, start, profile=profile)
+                    except ValueError:
+                        continue
+                    grid = model.get_grid_predictions(t_val, origin)
+                    piecewise[m] = (grid['delay_central'], grid['pi_lo'], grid['pi_hi'])
+                    mae, coverage = _scores(y_val, *(g[:, np.newaxis] for g in piecewise[m]))
+                    accumulate(('piecewise_linear', m), mae[0], coverage[0], n_val)
+
+            # Polynomial : une QR de la Vandermonde (degré max) pour tous les degrés
+            if degrees:
+                for d, fit in self._polynomial_fits(t_arr[:start], y[:start], degrees).items():
+                    model = PolynomialRegressionModel(self.confidence_level, degree=d)
+                    model.set_solution(*fit)
+                    grid = model.get_grid_predictions(t_val, origin)
+                    mae, coverage = _scores(y_val, grid['delay_central'][:, np.newaxis],
+                                            grid['pi_lo'][:, np.newaxis], grid['pi_hi'][:, np.newaxis])
+                    accumulate(('polynomial_regression', d), mae[0], coverage[0], n_val)
+
+            # Voting : tous les vecteurs de poids d'un coup (n_val × membres) @ (membres × points)
+            if weight_points:
+                by_m = {}
+                for p in weight_points:
+                    by_m.setdefault(p['breakpoint_min_samples'], []).append(p['voting_weights'])
+                for m, ws in by_m.items():
+                    if m not in piecewise:
+                        continue
+                    W = np.array([[w.get(name, 0.0) for name in VOTING_MEMBERS] for w in ws]).T
+                    W = W / W.sum(axis=0, keepdims=True)
+                    members = [piecewise[m]] + [member_preds[(name, k)] for name in VOTING_MEMBERS[1:]]
+                    central, lo, hi = (np.column_stack([mp[i] for mp in members]) @ W for i in range(3))
+                    mae, coverage = _scores(y_val, central, lo, hi)
+                    for j, w in enumerate(ws):
+                        accumulate(('voting_ensemble', m, _weights_key(w)), mae[j], coverage[j], n_val)
+
+        rows = []
+        for name, params in points:
+            if name == 'piecewise_linear':
+                key = (name, params['breakpoint_min_samples'])
+            elif name == 'polynomial_regression':
+                key = (name, params['polynomial_degree'])
+            else:
+                key = (name, params['breakpoint_min_samples'], _weights_key(params['voting_weights']))
+            acc = totals.get(key)
+            rows.append({
+                'model': name,
+                'params': params,
+                'mae_days': acc[0] / acc[2] if acc else np.nan,
+                'coverage': acc[1] / acc[2] if acc else np.nan,
+                'n_val': acc[2] if acc else 0
+            })
+
+        table = pd.DataFrame(rows).sort_values('mae_days', na_position='last').reset_index(drop=True)
+        table.index += 1
+        table.index.name = 'rank'
+        return table
+
+    def _polynomial_fits(self, t, y, degrees):
+        """QR unique de la Vandermonde (u = t recentré/réduit) : solution de chaque degré.
+
+        Les colonnes 1, u, ..., u^d engendrent des sous-espaces emboîtés : les d+1 premières
+        colonnes de Q et le bloc R[:d+1, :d+1] donnent directement le fit de degré d.
+        """
+        shift = (t.min() + t.max()) / 2
+        scale = (t.max() - t.min()) / 2 or 1.0
+        u = (t - shift) / scale
+        V = u[:, np.newaxis] ** np.arange(max(degrees) + 1)
+        Q, R = np.linalg.qr(V)
+        qty = Q.T @ y
+        yy = y @ y
+
+        u_of_t = np.poly1d([1 / scale, -shift / scale])
+        t_mean = t.mean()
+        Sxx = np.sum((t - t_mean)**2)
+        fits = {}
+        for d in degrees:
+            if d + 1 > len(t):
+                continue
+            coef_u = np.linalg.lstsq(R[:d + 1, :d + 1], qty[:d + 1], rcond=None)[0]
+            sse = max(yy - qty[:d + 1] @ qty[:d + 1], 0.0)
+            fits[d] = (np.poly1d(coef_u[::-1])(u_of_t), sse, len(t), t_mean, Sxx)
+        return fits
+
+
+def _weights_key(weights):
+    return tuple(round(float(weights.get(name, 0.0)), 6) for name in VOTING_MEMBERS)
+
+
+def best_params(table):
+    """Meilleurs paramètres par modèle (clés de configuration)."""
+    best = {}
+    for name, group in table.dropna(subset=['mae_days']).groupby('model', sort=False):
+        best[name] = group.iloc[0]['params']
+    return best
+
+
+def main():
+    """Recherche par défaut sur la configuration du projet."""
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+    config = load_config(config_path)
+    data_path = os.path.join(os.path.dirname(__file__), '..', config['data_path'])
+    df, origin = load_data(data_path)
+
+    space = {
+        'breakpoint_min_samples': range(3, 16),
+        'polynomial_degree': range(1, 7),
+        'voting_weights': simplex_grid(0.05),
+    }
+    runner = SweepRunner(space, confidence_level=config['confidence_level'])
+
+    print("🔍 Recherche d'hyperparamètres...")
+    table = runner.run(df)
+    print(f"   {len(table)} points évalués sur {len(runner.folds(len(df)))} plis\n")
+    with pd.option_context('display.max_colwidth', 120, 'display.width', 200):
+        print(table.head(20).to_string(float_format=lambda x: f"{x:.2f}"))
+    print("\n💡 Meilleurs paramètres par modèle :")
+    for name, params in best_params(table).items():
+        print(f"   {name}: {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ Utilitaires pour le projet Naturalisation CAE Prediction
 """
 
 import json
+import hashlib
+import numpy as np
 import pandas as pd
 import sys
 import os
@@ -17,8 +19,17 @@ from models import (
     PolynomialRegressionModel,
     VotingEnsembleModel,
     StackingEnsembleModel,
-    AdaptiveEnsembleModel
+    AdaptiveEnsembleModel,
+    RecursiveLeastSquaresModel,
+    LocalLinearTrendModel,
+    SurvivalModel,
+    SparseGPModel,
+    RobustPiecewiseLinearModel,
+    QueueSimulationModel,
+    LocalLinearModel,
+    QueuePositionModel
 )
+from models.profiling import instrument, span
 
 
 def load_config(config_path):
@@ -27,13 +38,28 @@ def load_config(config_path):
         return json.load(f)
 
 
-def load_data(data_path):
-    """Charger et préparer les données depuis CSV."""
-    df = pd.read_csv(data_path)
+@instrument("load_data")
+def load_data(data_path, keep_pending=False, as_of=None):
+    """Charger et préparer les données depuis CSV.
+    
+    Les demandes sans CAE (en attente) sont écartées, sauf si `keep_pending` : elles sont
+    alors gardées comme observations censurées, avec `delay_days` = jours écoulés depuis
+    la CAA jusqu'à `as_of` (défaut : aujourd'hui) et `event` = 0 (1 si CAE connue).
+    """
+    with span("read_csv"):
+        df = pd.read_csv(data_path)
     df["CAA"] = pd.to_datetime(df["CAA"], dayfirst=True)
     df["CAE"] = pd.to_datetime(df["CAE"], dayfirst=True)
+    pending = df["CAE"].isna()
+    if not keep_pending:
+        df = df[~pending]
     df = df.sort_values("CAA").reset_index(drop=True)
-    df["delay_days"] = (df["CAE"] - df["CAA"]).dt.days
+    if keep_pending:
+        as_of = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+        df["event"] = df["CAE"].notna().astype(int)
+        df["delay_days"] = (df["CAE"].fillna(as_of) - df["CAA"]).dt.days
+    else:
+        df["delay_days"] = (df["CAE"] - df["CAA"]).dt.days
     
     origin = df["CAA"].min()
     df["t"] = (df["CAA"] - origin).dt.days.astype(float)
@@ -41,22 +67,41 @@ def load_data(data_path):
     return df, origin
 
 
+def data_hash(df):
+    """Empreinte SHA-256 des données (t, délai, origine)."""
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(df["t"].to_numpy(dtype=float)).tobytes())
+    h.update(np.ascontiguousarray(df["delay_days"].to_numpy(dtype=float)).tobytes())
+    h.update(str(df["CAA"].min()).encode())
+    return h.hexdigest()
+
+
+# Registre des modèles : nom de configuration -> classe
+MODELS = {
+    'piecewise_linear': PiecewiseLinearModel,
+    'spline_cubic': SplineCubicModel,
+    'quantile_regression': QuantileRegressionModel,
+    'polynomial_regression': PolynomialRegressionModel,
+    'voting_ensemble': VotingEnsembleModel,
+    'stacking_ensemble': StackingEnsembleModel,
+    'adaptive_ensemble': AdaptiveEnsembleModel,
+    'recursive_least_squares': RecursiveLeastSquaresModel,
+    'local_linear_trend': LocalLinearTrendModel,
+    'survival': SurvivalModel,
+    'sparse_gp': SparseGPModel,
+    'robust_piecewise': RobustPiecewiseLinearModel,
+    'queue_simulation': QueueSimulationModel,
+    'local_linear': LocalLinearModel,
+    'queue_position': QueuePositionModel
+}
+
+
 def get_model(model_name, **kwargs):
     """Factory pour créer le modèle approprié."""
-    models = {
-        'piecewise_linear': PiecewiseLinearModel,
-        'spline_cubic': SplineCubicModel,
-        'quantile_regression': QuantileRegressionModel,
-        'polynomial_regression': PolynomialRegressionModel,
-        'voting_ensemble': VotingEnsembleModel,
-        'stacking_ensemble': StackingEnsembleModel,
-        'adaptive_ensemble': AdaptiveEnsembleModel
-    }
-    
-    if model_name not in models:
-        raise ValueError(f"Modèle inconnu: {model_name}. Choix: {list(models.keys())}")
+    if model_name not in MODELS:
+        raise ValueError(f"Modèle inconnu: {model_name}. Choix: {list(MODELS.keys())}")
     
-    return models[model_name](**kwargs)
+    return MODELS[model_name](**kwargs)
 
 
 def format_result(pred_dict, target_date):
@@ -0,0 +1,38 @@
+"""Configuration pytest : sources dans le chemin d'import, séries synthétiques partagées."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+ORIGIN = pd.Timestamp('2024-01-01')
+
+
+def make_series(n, span, mean_delay, sd, seed=0):
+    """Série stationnaire : n CAA uniformes sur `span` jours, délais normaux (jours entiers)."""
+    rng = np.random.default_rng(seed)
+    t = np.sort(np.round(rng.uniform(0, span, n)))
+    y = np.round(rng.normal(mean_delay, sd, n))
+    return pd.DataFrame({
+        'CAA': ORIGIN + pd.to_timedelta(t, unit='D'),
+        'CAE': ORIGIN + pd.to_timedelta(t + y, unit='D'),
+        't': t,
+        'delay_days': y,
+    })
+
+
+@pytest.fixture
+def stationary():
+    """Série stationnaire bruitée : délai moyen 300 jours, écart-type 30."""
+    return make_series(2000, 365, 300, 30)
+
+
+@pytest.fixture(scope='session')
+def real_data():
+    """Données du dépôt (data/raw/data.csv) et leur origine."""
+    from utils import load_data
+    return load_data(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'raw', 'data.csv'))
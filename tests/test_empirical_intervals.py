@@ -0,0 +1,46 @@
+"""Intervalles empiriques : esquisse des résidus alimentée par fit/update."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import ORIGIN, make_series
+from models import RecursiveLeastSquaresModel, LocalLinearTrendModel, SurvivalModel
+
+
+def test_update_without_fit_reaches_model():
+    model = LocalLinearTrendModel()
+    model.intervals = 'empirical'
+    with pytest.raises(TypeError):
+        model.update(10.0, 300.0)
+    assert model.residual_sketch is None
+
+
+def test_updates_from_prior_keep_model_bounds_until_residuals():
+    model = RecursiveLeastSquaresModel()
+    model.intervals = 'empirical'
+    df = make_series(50, 60, 300, 30)
+    model.update(df['t'].iloc[0], df['delay_days'].iloc[0])
+    assert model.residual_sketch.count == 0
+    levels = model.predict_intervals(ORIGIN + pd.Timedelta(days=90), ORIGIN, [0.95])
+    assert np.isfinite(levels['lo_delay'][0])
+    for t, y in zip(df['t'].iloc[1:], df['delay_days'].iloc[1:]):
+        model.update(t, y)
+    assert model.residual_sketch.count == len(df) - 1
+    target = ORIGIN + pd.Timedelta(days=90)
+    pred = model.predict(target, ORIGIN)
+    levels = model.predict_intervals(target, ORIGIN, [0.5, 0.95])
+    assert np.all(np.isfinite(levels['lo_delay'])) and np.all(np.isfinite(levels['hi_delay']))
+    assert pred['lo_delay'] == pytest.approx(levels['lo_delay'][1])
+
+
+def test_censored_rows_not_recorded():
+    df = make_series(200, 120, 300, 30)
+    df['event'] = 1
+    pending = df.tail(20).index
+    df.loc[pending, 'event'] = 0
+    df.loc[pending, 'delay_days'] = 5.0
+    model = SurvivalModel()
+    model.intervals = 'empirical'
+    model.fit(df)
+    assert model.residual_sketch.count == 180
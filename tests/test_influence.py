@@ -0,0 +1,74 @@
+"""Influence en forme close : égale aux refits sans chaque ligne."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models import PolynomialRegressionModel, PiecewiseLinearModel, RobustPiecewiseLinearModel
+
+TARGET = pd.Timestamp('2025-08-14')
+
+
+def _wls_pred(t, y, w, t0):
+    X = np.column_stack([np.ones(len(t)), t]) * np.sqrt(w)[:, np.newaxis]
+    beta = np.linalg.lstsq(X, y * np.sqrt(w), rcond=None)[0]
+    return beta[0] + beta[1] * t0
+
+
+def _segment_refits(model, df, origin, weights):
+    """Prédiction sans chaque ligne du segment final (rupture et poids fixés) - prédiction complète."""
+    t = df['t'].to_numpy(dtype=float)
+    y = df['delay_days'].to_numpy(dtype=float)
+    t0 = (TARGET - origin).days
+    bp = model.breakpoint
+    full = _wls_pred(t[bp:], y[bp:], weights[bp:], t0)
+    keep = np.ones(len(t), dtype=bool)
+    deltas = np.zeros(len(t))
+    for i in range(bp, len(t)):
+        keep[i] = False
+        deltas[i] = _wls_pred(t[keep][bp:], y[keep][bp:], weights[keep][bp:], t0) - full
+        keep[i] = True
+    return deltas
+
+
+def test_polynomial_matches_refits(real_data):
+    df, origin = real_data
+    model = PolynomialRegressionModel()
+    model.fit(df)
+    influence = model.influence(df, TARGET, origin)
+    base = model.predict(TARGET, origin)['pred_delay']
+    for i in range(len(df)):
+        refit = PolynomialRegressionModel()
+        refit.fit(df.drop(df.index[i]))
+        assert influence['delta_pred'][i] == pytest.approx(
+            refit.predict(TARGET, origin)['pred_delay'] - base, abs=1e-6)
+
+
+def test_piecewise_matches_refits(real_data):
+    df, origin = real_data
+    model = PiecewiseLinearModel()
+    model.fit(df)
+    influence = model.influence(df, TARGET, origin)
+    expected = _segment_refits(model, df, origin, np.ones(len(df)))
+    np.testing.assert_allclose(influence['delta_pred'], expected, atol=1e-6)
+
+
+def test_robust_huber_matches_weighted_refits(real_data):
+    df, origin = real_data
+    model = RobustPiecewiseLinearModel(method='huber')
+    model.fit(df)
+    assert model.supports_influence
+    influence = model.influence(df, TARGET, origin)
+    t = df['t'].to_numpy(dtype=float)
+    y = df['delay_days'].to_numpy(dtype=float)
+    expected = _segment_refits(model, df, origin, model._huber_weights(t, y))
+    np.testing.assert_allclose(influence['delta_pred'], expected, atol=1e-6)
+
+
+def test_robust_theil_sen_has_no_closed_form(real_data):
+    df, origin = real_data
+    model = RobustPiecewiseLinearModel()
+    model.fit(df)
+    assert not model.supports_influence
+    with pytest.raises(NotImplementedError):
+        model.influence(df, TARGET, origin)
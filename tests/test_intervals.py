@@ -0,0 +1,25 @@
+"""Intervalles : predict, grille et intervalles multi-niveaux concordent au même niveau."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import MODELS, get_model
+
+TARGET = pd.Timestamp('2025-08-14')
+
+
+@pytest.mark.parametrize('name', sorted(MODELS))
+def test_predict_matches_intervals(real_data, name):
+    df, origin = real_data
+    model = get_model(name)
+    model.fit(df)
+    pred = model.predict(TARGET, origin)
+    levels = model.predict_intervals(TARGET, origin, [model.confidence_level])
+    t0 = np.array([float((TARGET - origin).days)])
+    grid = model.get_grid_predictions(t0, origin)
+    assert pred['pred_delay'] == pytest.approx(levels['pred_delay'], abs=1e-6)
+    assert pred['lo_delay'] == pytest.approx(levels['lo_delay'][0], abs=1)
+    assert pred['hi_delay'] == pytest.approx(levels['hi_delay'][0], abs=1)
+    assert grid['pi_lo'][0] == pytest.approx(levels['lo_delay'][0], abs=1e-6)
+    assert grid['pi_hi'][0] == pytest.approx(levels['hi_delay'][0], abs=1e-6)
@@ -0,0 +1,25 @@
+"""Tendance locale linéaire : ajouts en O(1) amorti, historique lissé conservé."""
+
+import numpy as np
+
+from tests.conftest import ORIGIN, make_series
+from models import LocalLinearTrendModel
+
+
+def test_update_appends_in_place():
+    df = make_series(1500, 300, 300, 30)
+    model = LocalLinearTrendModel()
+    model.fit(df.head(500))
+    history = np.arange(0, df['t'].iloc[499], 5.0)
+    before = model.get_grid_predictions(history, ORIGIN)['delay_central']
+    buffers = set()
+    for t, y in zip(df['t'].iloc[500:], df['delay_days'].iloc[500:]):
+        model.update(t, y)
+        buffers.add(id(model._days))
+    n_days = len(np.unique(df['t']))
+    assert len(model.days) == len(model.state_mean) == len(model.state_cov) == n_days
+    assert np.array_equal(model.days, np.unique(df['t']))
+    # Capacité doublée : quelques réallocations seulement
+    assert len(buffers) <= int(np.log2(n_days)) + 1
+    after = model.get_grid_predictions(history, ORIGIN)['delay_central']
+    np.testing.assert_allclose(after[:-1], before[:-1])
@@ -0,0 +1,26 @@
+"""fit_stats (sommes cumulées) : même solution que fit sur les premières entrées."""
+
+import numpy as np
+import pytest
+
+from tests.conftest import ORIGIN, make_series
+from models.prefix_stats import PrefixStats
+from utils import get_model
+
+
+@pytest.mark.parametrize('name, degree', [('piecewise_linear', 1), ('polynomial_regression', 3)])
+@pytest.mark.parametrize('end', [120, 400])
+def test_fit_stats_matches_fit(name, degree, end):
+    df = make_series(400, 365, 300, 30)
+    stats = PrefixStats.from_arrays(df['t'].to_numpy(), df['delay_days'].to_numpy().astype(float),
+                                    degree=degree)
+    from_stats = get_model(name)
+    from_stats.fit_stats(stats, end)
+    from_frame = get_model(name)
+    from_frame.fit(df.head(end))
+
+    assert from_stats.sigma == pytest.approx(from_frame.sigma, rel=1e-6)
+    for target in ORIGIN + np.array([30, 200, 500]) * np.timedelta64(1, 'D'):
+        got, want = from_stats.predict(target, ORIGIN), from_frame.predict(target, ORIGIN)
+        for key in ('pred_delay', 'lo_delay', 'hi_delay'):
+            assert got[key] == pytest.approx(want[key], rel=1e-6, abs=1e-6)
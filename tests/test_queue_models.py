@@ -0,0 +1,38 @@
+"""Modèles de file : une série stationnaire bruitée redonne son délai moyen."""
+
+import pandas as pd
+import pytest
+
+from tests.conftest import ORIGIN, make_series
+from models import QueuePositionModel, QueueSimulationModel
+
+
+@pytest.mark.parametrize('horizon', [0, 120])
+def test_queue_position_stationary_delay(stationary, horizon):
+    model = QueuePositionModel()
+    model.fit(stationary)
+    target = stationary['CAA'].iloc[-1] + pd.Timedelta(days=horizon)
+    pred = model.predict(target, ORIGIN)
+    assert pred['pred_delay'] == pytest.approx(300, abs=10)
+    assert pred['lo_delay'] < 300 < pred['hi_delay']
+
+
+def test_queue_position_short_history():
+    # Historique plus court que l'étendue des délais : débit de traitement = débit d'arrivée
+    preds = []
+    for seed in range(10):
+        df = make_series(54, 74, 300, 30, seed)
+        model = QueuePositionModel()
+        model.fit(df)
+        preds.append(model.predict(df['CAA'].iloc[-1], ORIGIN)['pred_delay'])
+    assert sum(preds) / len(preds) == pytest.approx(300, abs=20)
+
+
+@pytest.mark.parametrize('n, span', [(54, 74), (2000, 365)])
+def test_queue_simulation_stationary_delay(n, span):
+    df = make_series(n, span, 300, 30)
+    model = QueueSimulationModel(n_scenarios=500)
+    model.fit(df)
+    pred = model.predict(df['CAA'].iloc[-1] + pd.Timedelta(days=120), ORIGIN)
+    assert pred['pred_delay'] == pytest.approx(300, abs=20)
+    assert pred['lo_delay'] < 300 < pred['hi_delay']
@@ -0,0 +1,43 @@
+"""Moindres carrés récursifs : oubli par jour écoulé, fit en forme close = mises à jour."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import ORIGIN, make_series
+from models import RecursiveLeastSquaresModel
+
+
+def test_fit_matches_updates():
+    df = make_series(3000, 730, 380, 30, seed=1)
+    fitted = RecursiveLeastSquaresModel()
+    fitted.fit(df)
+    updated = RecursiveLeastSquaresModel()
+    updated.fit(df.head(1000))
+    for t, y in zip(df['t'].iloc[1000:], df['delay_days'].iloc[1000:]):
+        updated.update(t, y)
+    np.testing.assert_allclose(updated.coef, fitted.coef, rtol=1e-9)
+    np.testing.assert_allclose(updated.P, fitted.P, rtol=1e-9)
+    assert updated.sse == pytest.approx(fitted.sse, rel=1e-9)
+    assert updated.n_eff == pytest.approx(fitted.n_eff, rel=1e-12)
+
+
+def test_many_rows_per_day():
+    # ~140 dépôts par jour : l'oubli par ligne ne garderait qu'une fraction de jour
+    df = make_series(100_000, 730, 380, 30)
+    model = RecursiveLeastSquaresModel()
+    model.fit(df)
+    pred = model.predict(df['CAA'].iloc[-1] + pd.Timedelta(days=30), ORIGIN)
+    assert pred['pred_delay'] == pytest.approx(380, abs=5)
+    assert pred['hi_delay'] - pred['lo_delay'] < 4 * 1.96 * 30
+
+
+def test_long_gap_keeps_prior():
+    df = make_series(500, 100, 300, 30, seed=2)
+    model = RecursiveLeastSquaresModel(forgetting=0.9)
+    model.fit(df)
+    for t, y in ((5000.0, 310.0), (5000.0, 290.0), (4999.0, 305.0)):
+        model.update(t, y)
+    assert np.all(np.isfinite(model.P))
+    pred = model.predict(ORIGIN + pd.Timedelta(days=5000), ORIGIN)
+    assert pred['pred_delay'] == pytest.approx(300, abs=1e-3)
@@ -0,0 +1,36 @@
+"""ResultsStore : insertion par lots et dernière prédiction par modèle."""
+
+import pandas as pd
+import pytest
+
+from tests.conftest import make_series
+from results_store import ResultsStore
+
+TARGETS = pd.date_range('2025-01-01', periods=3, freq='D')
+
+
+def _batch(pred):
+    return [{'pred_delay': pred + i, 'lo_delay': pred + i - 20, 'hi_delay': pred + i + 20}
+            for i in range(len(TARGETS))]
+
+
+def test_record_batch_and_latest_per_model(tmp_path):
+    df = make_series(100, 365, 300, 30)
+    config = {'confidence_level': 0.9}
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        first = store.record_batch('piecewise_linear', config, df, TARGETS, _batch(300))
+        store.record_batch('kalman_trend', config, df, TARGETS, _batch(280))
+        arrays = {'pred_delay': [310, 311, 312], 'lo_delay': [290, 291, 292],
+                  'hi_delay': [330, 331, 332]}
+        latest = store.record_batch('piecewise_linear', config, df, TARGETS, arrays)
+
+        row = store.get_prediction(first, TARGETS[1])
+        assert row['model'] == 'piecewise_linear' and row['pred_delay'] == 301
+        assert row['confidence_level'] == pytest.approx(0.9) and row['n_obs'] == len(df)
+        assert row['pred_cae'] == (TARGETS[1] + pd.Timedelta(days=301)).strftime('%Y-%m-%d')
+
+        table = store.latest_per_model(TARGETS[2])
+        assert list(table['model']) == ['kalman_trend', 'piecewise_linear']
+        assert list(table['pred_delay']) == [282, 312]
+        assert table.set_index('model').loc['piecewise_linear', 'run_id'] == latest
+        assert store.latest_per_model('2030-01-01').empty
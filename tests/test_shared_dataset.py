@@ -0,0 +1,47 @@
+"""SharedDataset : fit des modèles sur la vue en mémoire partagée."""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from tests.conftest import make_series
+from shared_dataset import SharedDataset
+from utils import get_model
+
+
+@pytest.mark.parametrize('name', ['piecewise_linear', 'polynomial_regression', 'queue_position'])
+def test_empirical_fit_on_shared_dataset(name):
+    df = make_series(300, 365, 300, 30)
+    with SharedDataset.from_frame(df) as data:
+        assert 'delay_days' in data and 'event' not in data
+        shared = get_model(name)
+        shared.intervals = 'empirical'
+        shared.fit(data)
+        frame = get_model(name)
+        frame.intervals = 'empirical'
+        frame.fit(df)
+        t = df['t'].to_numpy()
+        assert shared.residual_sketch.count == len(df)
+        np.testing.assert_allclose(shared._central(t), frame._central(t))
+
+
+def test_pickle_round_trip_and_fit():
+    df = make_series(300, 365, 300, 30)
+    with SharedDataset.from_frame(df) as data:
+        view = pickle.loads(pickle.dumps(data.head(200)))
+        try:
+            assert view.name == data.name and len(view) == 200
+            assert view.origin == df['CAA'].min()
+            for column in ('t', 'delay_days'):
+                np.testing.assert_array_equal(view.array(column), df[column].to_numpy()[:200])
+            assert (view['CAA'] == df['CAA'].head(200)).all()
+
+            shared = get_model('piecewise_linear')
+            shared.fit(view)
+            frame = get_model('piecewise_linear')
+            frame.fit(df.head(200))
+            assert shared.breakpoint == frame.breakpoint
+            np.testing.assert_allclose(np.r_[shared.c1, shared.c2], np.r_[frame.c1, frame.c2])
+        finally:
+            view.close()
@@ -0,0 +1,30 @@
+"""TDigest : quantiles après fusion de sketches partiels."""
+
+import numpy as np
+
+from models.sketch import TDigest
+
+QUANTILES = [0.01, 0.025, 0.1, 0.5, 0.9, 0.975, 0.99]
+
+
+def test_quantiles_after_merge():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 30, 20000), rng.exponential(50, 20000)])
+    parts = np.array_split(rng.permutation(values), 4)
+    merged = TDigest().update(parts[0]).merge(TDigest().update(parts[1]))
+    merged = TDigest.merge_all([merged, TDigest().update(parts[2]), TDigest().update(parts[3])])
+
+    assert merged.count == len(values)
+    spread = np.quantile(values, 0.99) - np.quantile(values, 0.01)
+    for q in QUANTILES:
+        assert abs(merged.quantile(q) - np.quantile(values, q)) < 0.01 * spread
+    assert merged.quantile(0) == values.min() and merged.quantile(1) == values.max()
+
+
+def test_dict_round_trip():
+    digest = TDigest().update(np.random.default_rng(1).normal(size=5000))
+    restored = TDigest.from_dict(digest.to_dict())
+    assert restored.count == digest.count
+    np.testing.assert_allclose([restored.quantile(q) for q in QUANTILES],
+                               [digest.quantile(q) for q in QUANTILES])
+    assert np.isnan(TDigest().quantile(0.5))